@@ -1,5 +1,49 @@
 from django.contrib import admin
-from .models import StudentData
+from .models import Class, ClassStudentSummary, Enrollment, Session, Student, StudentData
+
+
+@admin.register(Student)
+class StudentAdmin(admin.ModelAdmin):
+    """
+    Admin interface for the Student dimension
+    """
+    list_display = ('studentID', 'name', 'created_at')
+    search_fields = ('studentID', 'name')
+    readonly_fields = ('created_at',)
+
+
+class EnrollmentInline(admin.TabularInline):
+    """Roster of a class"""
+    model = Enrollment
+    raw_id_fields = ('studentID',)
+    readonly_fields = ('created_at',)
+    extra = 0
+
+
+@admin.register(Class)
+class ClassAdmin(admin.ModelAdmin):
+    """
+    Admin interface for the Class dimension and its roster
+    """
+    list_display = ('ClassID', 'name', 'created_at')
+    search_fields = ('ClassID', 'name')
+    readonly_fields = ('created_at',)
+    inlines = (EnrollmentInline,)
+
+
+@admin.register(Session)
+class SessionAdmin(admin.ModelAdmin):
+    """
+    Read-only admin interface for processed recordings
+    """
+    list_display = ('ClassID', 'video_path', 'frames_inserted', 'frames_skipped', 'started_at', 'finished_at')
+    list_filter = ('ClassID',)
+    readonly_fields = ('ClassID', 'video_path', 'frames_inserted', 'frames_skipped', 'started_at', 'finished_at')
+    ordering = ('-started_at',)
+    
+    def has_add_permission(self, request):
+        """Sessions are recorded by add_class_data"""
+        return False
 
 
 @admin.register(StudentData)
@@ -7,9 +51,10 @@ class StudentDataAdmin(admin.ModelAdmin):
     """
     Admin interface for StudentData model
     """
-    list_display = ('studentID', 'ClassID', 'FramID', 'created_at', 'updated_at')
+    list_display = ('studentID', 'ClassID', 'FramID', 'dominant_emotion', 'created_at', 'updated_at')
     list_filter = ('ClassID', 'studentID', 'created_at')
-    search_fields = ('studentID', 'ClassID')
+    search_fields = ('studentID__studentID', 'ClassID__ClassID')
+    raw_id_fields = ('studentID', 'ClassID')
     readonly_fields = ('created_at', 'updated_at')
     ordering = ('-created_at',)
     
@@ -18,7 +63,7 @@ class StudentDataAdmin(admin.ModelAdmin):
             'fields': ('studentID', 'ClassID', 'FramID')
         }),
         ('Emotion Data', {
-            'fields': ('Emotion',),
+            'fields': ('dominant_emotion', 'angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral'),
             'classes': ('collapse',)
         }),
         ('Timestamps', {
@@ -30,3 +75,20 @@ class StudentDataAdmin(admin.ModelAdmin):
     def get_queryset(self, request):
         """Optimize queryset for admin"""
         return super().get_queryset(request).select_related()
+
+
+
+@admin.register(ClassStudentSummary)
+class ClassStudentSummaryAdmin(admin.ModelAdmin):
+    """
+    Read-only admin interface for the ClassStudentSummary rollup
+    """
+    list_display = ('ClassID', 'studentID', 'frame_count', 'updated_at')
+    list_filter = ('ClassID',)
+    search_fields = ('studentID', 'ClassID')
+    readonly_fields = ('ClassID', 'studentID', 'frame_count', 'emotion_sums', 'updated_at')
+    ordering = ('ClassID', 'studentID')
+    
+    def has_add_permission(self, request):
+        """The rollup is derived from StudentData and rebuilt by command"""
+        return False
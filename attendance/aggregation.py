@@ -0,0 +1,497 @@
+"""
+Grouped aggregation helpers shared by the attendance API views
+
+The views read per-(class, student) frame counts and emotion sums from the
+ClassStudentSummary rollup, so their cost depends on the number of students
+and classes rather than the number of frames. The raw-table helpers compute
+the same totals from student_data with a fixed number of grouped queries,
+summing the emotion columns in SQL; they are used to build and check the
+rollup. SQL sums are not added up in frame order, so they may differ from a
+Python sum of the same scores in the last bits. Roster sizes are read from
+the Enrollment dimension table.
+
+The read helpers used by the views have async counterparts (prefixed with
+a) built on the same querysets, for the async views. fan_out awaits several
+of them, concurrently on separate connections with ASYNC_CONCURRENT_QUERIES.
+"""
+import asyncio
+from itertools import groupby
+from operator import itemgetter
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Count, Exists, OuterRef, Q, Sum, Value
+from django.db.models.functions import Cast
+from .emotions import EMOTIONS, SUM_FIELDS, emotion_dict
+from .models import Class, ClassStudentSummary, Enrollment, Student, StudentData
+
+
+def get_frame_counts(by_student=False):
+    """
+    Count frames per (class, student)
+
+    Args:
+        by_student: Nest the result by student first instead of by class
+
+    Returns:
+        dict: {class_id: {student_id: frames}}, or {student_id: {class_id: frames}}
+        when by_student is set, ordered by the outer and then the inner key
+    """
+    order = ('studentID', 'ClassID') if by_student else ('ClassID', 'studentID')
+    rows = (
+        StudentData.objects
+        .values_list(*order)
+        .annotate(frames=Count('id'))
+        .order_by(*order)
+    )
+
+    frame_counts = {}
+    for outer_key, inner_key, frames in rows:
+        frame_counts.setdefault(outer_key, {})[inner_key] = frames
+    return frame_counts
+
+
+def get_emotion_sums(class_totals=True):
+    """
+    Sum emotion scores per class and per (class, student) with SQL SUMs over
+    the emotion columns
+
+    Args:
+        class_totals: Also compute the per-class sums
+
+    Returns:
+        tuple: ({class_id: emotion_sums},
+                {class_id: {student_id: emotion_sums}})
+    """
+    sums = {field: Sum(emotion) for field, emotion in zip(SUM_FIELDS, EMOTIONS)}
+
+    class_sums = {}
+    if class_totals:
+        rows = (
+            StudentData.objects
+            .values_list('ClassID')
+            .annotate(**sums)
+            .order_by('ClassID')
+        )
+        for class_id, *values in rows:
+            class_sums[class_id] = emotion_dict(values)
+
+    student_sums = {}
+    rows = (
+        StudentData.objects
+        .values_list('ClassID', 'studentID')
+        .annotate(**sums)
+        .order_by('ClassID', 'studentID')
+    )
+    for class_id, student_id, *values in rows:
+        student_sums.setdefault(class_id, {})[student_id] = emotion_dict(values)
+    return class_sums, student_sums
+
+
+def iter_class_student_summary(class_ids=None, emotions=True, chunk_size=None, enrolled=False):
+    """
+    Frame counts and emotion sums per class and per (class, student), read
+    from the rollup in one query and yielded one class at a time
+
+    Args:
+        class_ids: Only summarize these classes (a list or a values queryset)
+        emotions: Include the emotion sums; without them the emotion columns
+            are not read at all
+        chunk_size: Read the rows through a server-side cursor in chunks of
+            this size instead of loading them all at once
+        enrolled: Also yield classes with a roster but no frames, with no
+            students and no emotions
+
+    Yields:
+        tuple: (class_id, {
+            'framesAttended': int,
+            'emotionSummary': dict,
+            'students': {student_id: {'framesAttended': int, 'emotionSummary': dict}}
+        }) ordered by class ID, students ordered by student ID; the
+        emotionSummary keys are left out without emotions
+    """
+    rows = _summary_rows('ClassID', 'studentID', class_ids, emotions, enrolled=enrolled)
+    if chunk_size is not None:
+        rows = rows.iterator(chunk_size=chunk_size)
+
+    for class_id, class_rows in groupby(rows, key=itemgetter(0)):
+        yield class_id, _class_data(class_rows, emotions)
+
+
+def get_class_student_summary(class_ids=None, emotions=True, enrolled=False):
+    """
+    Frame counts and emotion sums per class and per (class, student)
+
+    Returns:
+        dict: {class_id: class_data} as yielded by iter_class_student_summary
+    """
+    return dict(iter_class_student_summary(class_ids, emotions, enrolled=enrolled))
+
+
+def iter_student_class_summary(student_ids=None, emotions=True, chunk_size=None, class_ids=None,
+                               enrolled=False):
+    """
+    Frame counts and emotion sums per (student, class), read from the rollup
+    in one query and yielded one student at a time
+
+    Args:
+        student_ids: Only summarize these students (a list or a values queryset)
+        emotions: Include the emotion sums
+        chunk_size: Read the rows through a server-side cursor in chunks of
+            this size
+        class_ids: Only include these classes in each student's breakdown
+        enrolled: Also yield students enrolled in a class (of class_ids) who
+            have no frames in any, with an empty breakdown
+
+    Yields:
+        tuple: (student_id, {class_id: {'framesAttended': int, 'emotionSummary': dict}})
+        ordered by student ID, classes ordered by class ID; emotionSummary is
+        left out without emotions
+    """
+    rows = _summary_rows('studentID', 'ClassID', student_ids, emotions, inner_ids=class_ids, enrolled=enrolled)
+    if chunk_size is not None:
+        rows = rows.iterator(chunk_size=chunk_size)
+
+    for student_id, student_rows in groupby(rows, key=itemgetter(0)):
+        yield student_id, _class_breakdown(student_rows, emotions)
+
+
+def get_student_class_summary(student_ids=None, emotions=True, class_ids=None, enrolled=False):
+    """
+    Frame counts and emotion sums per (student, class)
+
+    Returns:
+        dict: {student_id: class_breakdown} as yielded by iter_student_class_summary
+    """
+    return dict(iter_student_class_summary(student_ids, emotions, class_ids=class_ids, enrolled=enrolled))
+
+
+def get_summary_keys(key_field, class_ids=None, student_ids=None, since=None, until=None):
+    """
+    Class or student IDs matching the detail filters, from the rollup and
+    the rosters
+
+    A class or student is kept if one of its rollup rows or enrollments
+    passes the filters, so classes with a roster but no frames and enrolled
+    students never seen are selected too.
+
+    Args:
+        key_field: 'ClassID' or 'studentID'
+        class_ids: Keep rows of these classes
+        student_ids: Keep rows of these students
+        since, until: Keep rows of classes held in [since, until)
+
+    Returns:
+        QuerySet: {key_field: id} dicts ordered by ID, usable as a subquery
+    """
+    filters = Q()
+    if class_ids is not None:
+        filters &= Q(ClassID__in=class_ids)
+    if student_ids is not None:
+        filters &= Q(studentID__in=student_ids)
+    held = get_held_classes(since, until)
+    if held is not None:
+        filters &= Q(ClassID__in=held)
+
+    model = Class if key_field == 'ClassID' else Student
+    key = {key_field: OuterRef(key_field)}
+    return (
+        model.objects
+        .filter(
+            Exists(ClassStudentSummary.objects.filter(filters, **key))
+            | Exists(Enrollment.objects.filter(filters, **key))
+        )
+        .values(key_field)
+        .order_by(key_field)
+    )
+
+
+def get_held_classes(since=None, until=None):
+    """
+    Classes held in [since, until), by Class.held_at
+
+    Returns:
+        QuerySet: {'ClassID': id} dicts usable as a subquery, or None without
+        a range
+    """
+    if since is None and until is None:
+        return None
+    classes = Class.objects.all()
+    if since is not None:
+        classes = classes.filter(held_at__gte=since)
+    if until is not None:
+        classes = classes.filter(held_at__lt=until)
+    return classes.values('ClassID')
+
+
+def count_known(field, class_ids=None):
+    """
+    Number of classes ('ClassID') or students ('studentID') with frames
+    recorded, read from the rollup
+
+    This is what attendance is measured against without a roster. Students
+    and classes that are only on a roster are not counted.
+
+    Args:
+        class_ids: Only count frames of these classes
+    """
+    return _known(field, class_ids).count()
+
+
+def get_rosters(key_field, class_ids=None):
+    """
+    Roster size and attendance of each class or student with enrollments
+
+    One grouped query over the enrollments; whether an enrolled student
+    attended a class is a lookup on the rollup's unique (class, student)
+    index.
+
+    Args:
+        key_field: 'ClassID' for the students enrolled in each class,
+            'studentID' for the classes each student is enrolled in
+        class_ids: Only count enrollments in these classes
+
+    Returns:
+        dict: {id: (enrolled, attended)} where attended is how many of the
+        enrollments have frames recorded, ordered by ID; classes and students
+        without enrollments are left out
+    """
+    return {key: (enrolled, attended) for key, enrolled, attended in _roster_rows(key_field, class_ids)}
+
+
+def attendance_rate(attended, total):
+    """Percentage of total, rounded to two decimals (0.0 if total is 0)"""
+    if total <= 0:
+        return 0.0
+    return round((attended / total) * 100, 2)
+
+
+def get_class_student_counts():
+    """
+    Number of students seen in each class, read from the rollup
+
+    Returns:
+        dict: {class_id: students} ordered by class ID
+    """
+    return dict(_count_rows('ClassID'))
+
+
+def get_student_class_counts():
+    """
+    Number of classes each student attended, read from the rollup
+
+    Returns:
+        dict: {student_id: classes} ordered by student ID
+    """
+    return dict(_count_rows('studentID'))
+
+
+def _summary_rows(outer_key, inner_key, outer_ids, emotions, named=False, inner_ids=None, enrolled=False):
+    """
+    Rollup rows (outer ID, inner ID, frames[, emotion sums...]) ordered by both IDs
+
+    With enrolled, each outer ID with enrollments also gets a row with a NULL
+    inner ID and no frames. Both come from one
+    statement, so the IDs with only a roster are merged in the database's
+    order and from the same snapshot.
+    """
+    columns = [outer_key, inner_key, 'frame_count']
+    if emotions:
+        columns.extend(SUM_FIELDS)
+    filters = {}
+    if outer_ids is not None:
+        filters[f'{outer_key}__in'] = outer_ids
+    if inner_ids is not None:
+        filters[f'{inner_key}__in'] = inner_ids
+    rows = ClassStudentSummary.objects.filter(**filters).values_list(*columns, named=named)
+    if enrolled:
+        # NULL is untyped in SQL, so the UNION needs it cast to each column's type
+        field = ClassStudentSummary._meta.get_field
+        empty = {'no_id': Cast(Value(None), field(inner_key)), 'no_frames': Value(0, field('frame_count'))}
+        if emotions:
+            empty.update({f'no_{name}': Cast(Value(None), field(name)) for name in SUM_FIELDS})
+        rosters = (
+            Enrollment.objects.filter(**filters)
+            .annotate(**empty)
+            .values_list(outer_key, *empty)
+            .distinct()
+            .order_by()
+        )
+        rows = rows.order_by().union(rosters, all=True)
+    return rows.order_by(outer_key, inner_key)
+
+
+def _class_data(class_rows, emotions):
+    """Summary of one class from its rollup rows"""
+    class_data = {'framesAttended': 0, 'students': {}}
+    if emotions:
+        class_data['emotionSummary'] = {}
+    for _, student_id, frames, *sums in class_rows:
+        if student_id is None:
+            continue
+        class_data['framesAttended'] += frames
+        student_data = class_data['students'][student_id] = {'framesAttended': frames}
+        if emotions:
+            emotion_sums = emotion_dict(sums)
+            class_emotions = class_data['emotionSummary']
+            for emotion, value in emotion_sums.items():
+                class_emotions[emotion] = class_emotions.get(emotion, 0) + value
+            student_data['emotionSummary'] = emotion_sums
+    return class_data
+
+
+def _class_breakdown(student_rows, emotions):
+    """Class breakdown of one student from their rollup rows"""
+    class_breakdown = {}
+    for _, class_id, frames, *sums in student_rows:
+        if class_id is None:
+            continue
+        class_data = class_breakdown[class_id] = {'framesAttended': frames}
+        if emotions:
+            class_data['emotionSummary'] = emotion_dict(sums)
+    return class_breakdown
+
+
+def _known(field, class_ids=None):
+    rows = ClassStudentSummary.objects.all()
+    if class_ids is not None:
+        rows = rows.filter(ClassID__in=class_ids)
+    return rows.values(field).distinct()
+
+
+def _roster_rows(key_field, class_ids=None):
+    attended = ClassStudentSummary.objects.filter(ClassID=OuterRef('ClassID'), studentID=OuterRef('studentID'))
+    enrollments = Enrollment.objects.all()
+    if class_ids is not None:
+        enrollments = enrollments.filter(ClassID__in=class_ids)
+    return (
+        enrollments
+        .values_list(key_field)
+        .annotate(enrolled=Count('id'), attended=Count('id', filter=Exists(attended)))
+        .order_by(key_field)
+    )
+
+
+def _count_rows(key_field):
+    return (
+        ClassStudentSummary.objects
+        .values_list(key_field)
+        .annotate(count=Count('id'))
+        .order_by(key_field)
+    )
+
+
+async def _agroupby(rows):
+    """groupby on the first column for an async iterable of rows, yielding (key, rows) with rows as a list"""
+    key = group = None
+    async for row in rows:
+        if group and row[0] != key:
+            yield key, group
+            group = None
+        if not group:
+            key, group = row[0], []
+        group.append(row)
+    if group:
+        yield key, group
+
+
+async def aiter_class_student_summary(class_ids=None, emotions=True, chunk_size=None, enrolled=False):
+    """
+    Async iter_class_student_summary; chunk_size reads through aiterator
+
+    aiterator calls the queryset's row iterable on the event loop and only
+    advances the result in a thread. For plain values_list rows that call
+    already executes the query (ValuesListIterable.__iter__ is not a
+    generator), which raises SynchronousOnlyOperation; the named tuple
+    iterable's is a generator and runs its query in the thread. The chunked
+    rows are therefore read as named tuples, which unpack like plain ones.
+    """
+    rows = _summary_rows(
+        'ClassID', 'studentID', class_ids, emotions, named=chunk_size is not None, enrolled=enrolled
+    )
+    if chunk_size is not None:
+        rows = rows.aiterator(chunk_size=chunk_size)
+    async for class_id, class_rows in _agroupby(rows):
+        yield class_id, _class_data(class_rows, emotions)
+
+
+async def aget_class_student_summary(class_ids=None, emotions=True, enrolled=False):
+    """Async get_class_student_summary"""
+    return {
+        class_id: class_data
+        async for class_id, class_data in aiter_class_student_summary(class_ids, emotions, enrolled=enrolled)
+    }
+
+
+async def aiter_student_class_summary(student_ids=None, emotions=True, chunk_size=None, class_ids=None,
+                                      enrolled=False):
+    """Async iter_student_class_summary; see aiter_class_student_summary"""
+    rows = _summary_rows(
+        'studentID', 'ClassID', student_ids, emotions,
+        named=chunk_size is not None, inner_ids=class_ids, enrolled=enrolled
+    )
+    if chunk_size is not None:
+        rows = rows.aiterator(chunk_size=chunk_size)
+    async for student_id, student_rows in _agroupby(rows):
+        yield student_id, _class_breakdown(student_rows, emotions)
+
+
+async def aget_student_class_summary(student_ids=None, emotions=True, class_ids=None, enrolled=False):
+    """Async get_student_class_summary"""
+    return {
+        student_id: class_breakdown
+        async for student_id, class_breakdown in aiter_student_class_summary(
+            student_ids, emotions, class_ids=class_ids, enrolled=enrolled
+        )
+    }
+
+
+async def acount_known(field, class_ids=None):
+    """Async count_known"""
+    return await _known(field, class_ids).acount()
+
+
+async def aget_rosters(key_field, class_ids=None):
+    """Async get_rosters"""
+    return {key: (enrolled, attended) async for key, enrolled, attended in _roster_rows(key_field, class_ids)}
+
+
+async def aget_class_student_counts():
+    """Async get_class_student_counts"""
+    return {class_id: students async for class_id, students in _count_rows('ClassID')}
+
+
+async def aget_student_class_counts():
+    """Async get_student_class_counts"""
+    return {student_id: classes async for student_id, classes in _count_rows('studentID')}
+
+
+async def _await(coroutine):
+    return await coroutine
+
+
+def _run_on_own_connection(coroutine):
+    try:
+        return async_to_sync(_await)(coroutine)
+    finally:
+        close_old_connections()
+
+
+async def fan_out(*coroutines):
+    """
+    Await independent async ORM calls, concurrently if ASYNC_CONCURRENT_QUERIES is set
+
+    The async ORM runs every query of a request in one thread, on one
+    connection, so gathering its calls would still run them one after the
+    other. Concurrently, each call runs in a thread of its own, on that
+    thread's connection; connections past CONN_MAX_AGE are closed, or
+    returned to the pool with DB_POOL, after the call. The calls then run
+    outside the request's transaction, if any.
+
+    Returns:
+        list: The results in the order of the calls
+    """
+    if not getattr(settings, 'ASYNC_CONCURRENT_QUERIES', False) or len(coroutines) < 2:
+        return [await coroutine for coroutine in coroutines]
+    run = sync_to_async(_run_on_own_connection, thread_sensitive=False)
+    return list(await asyncio.gather(*(run(coroutine) for coroutine in coroutines)))
@@ -0,0 +1,214 @@
+"""
+Async versions of the read endpoints, for ASGI deployments
+
+Each view returns the same data as its counterpart in views.py, whose
+data-building methods it reuses, but reads it through the async ORM, so a
+worker's event loop keeps serving other requests while the queries run.
+The independent queries of a request go through aggregation.fan_out and
+run concurrently when ASYNC_CONCURRENT_QUERIES is set.
+
+They are plain Django views rather than DRF APIViews, which do not support
+async handlers: the responses are rendered with TimedJSONRenderer, and
+cursor pagination runs DRF's paginator on a wrapped request.
+
+They are served under async/ and, with ASYNC_VIEWS set, in place of the
+sync views on the main routes.
+"""
+from asgiref.sync import sync_to_async
+from django.http import HttpResponse
+from django.views import View
+from rest_framework import status
+from rest_framework.request import Request
+from . import views
+from .aggregation import (
+    acount_known,
+    aget_class_student_counts,
+    aget_class_student_summary,
+    aget_rosters,
+    aget_student_class_counts,
+    aget_student_class_summary,
+    aiter_class_student_summary,
+    aiter_student_class_summary,
+    fan_out,
+    get_held_classes,
+    get_summary_keys,
+)
+from .database import AsyncStatementTimeoutMixin
+from .instrumentation import TimedJSONRenderer
+from .query_params import (
+    InvalidQuery,
+    SummaryCursorPagination,
+    filters_of,
+    is_filtered,
+    parse_detail_query,
+)
+from .response_cache import AsyncVersionedCacheMixin
+from .streaming import STREAM_CHUNK_SIZE, astreaming_response
+
+
+def json_response(data, status_code=status.HTTP_200_OK):
+    """Response rendered like DRF's JSONRenderer does for the sync views"""
+    return HttpResponse(TimedJSONRenderer().render(data), status=status_code, content_type='application/json')
+
+
+async def aselect_keys(key_field, request, query, view):
+    """
+    IDs a detail request selects, and its paginator
+
+    Returns:
+        tuple: (list or values queryset of IDs, or None for all of them;
+        SummaryCursorPagination, or None without pagination)
+    """
+    if query['paginate']:
+        paginator = SummaryCursorPagination(key_field)
+        keys = get_summary_keys(key_field, **filters_of(query))
+        page = await sync_to_async(paginator.paginate_queryset)(keys, Request(request), view=view)
+        return [row[key_field] for row in page], paginator
+    if is_filtered(query):
+        return get_summary_keys(key_field, **filters_of(query)), None
+    return None, None
+
+
+class AsyncGetAttendanceStatus(AsyncVersionedCacheMixin, AsyncStatementTimeoutMixin, View):
+    """
+    Async GetAttendanceStatus
+    """
+    get_data = views.GetAttendanceStatus.get_data
+
+    async def get(self, request):
+        try:
+            class_student_counts, rosters = await fan_out(aget_class_student_counts(), aget_rosters('ClassID'))
+            return json_response(self.get_data(class_student_counts, rosters))
+        except Exception as e:
+            return json_response(
+                {'error': f'Error retrieving attendance status: {str(e)}'},
+                status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class AsyncGetEmotionsStatus(AsyncVersionedCacheMixin, AsyncStatementTimeoutMixin, View):
+    """
+    Async GetEmotionsStatus
+    """
+    get_data = views.GetEmotionsStatus.get_data
+
+    async def get(self, request):
+        try:
+            return json_response(self.get_data(await aget_class_student_summary()))
+        except Exception as e:
+            return json_response(
+                {'error': f'Error retrieving emotions status: {str(e)}'},
+                status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class AsyncGetStudentOverallStatus(AsyncVersionedCacheMixin, AsyncStatementTimeoutMixin, View):
+    """
+    Async GetStudentOverallStatus
+    """
+    get_data = views.GetStudentOverallStatus.get_data
+
+    async def get(self, request):
+        try:
+            student_class_counts, rosters, total_classes = await fan_out(
+                aget_student_class_counts(), aget_rosters('studentID'), acount_known('ClassID')
+            )
+            return json_response(self.get_data(student_class_counts, rosters, total_classes))
+        except Exception as e:
+            return json_response(
+                {'error': f'Error retrieving student overall status: {str(e)}'},
+                status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class AsyncGetStudentsDetailStatus(AsyncVersionedCacheMixin, AsyncStatementTimeoutMixin, View):
+    """
+    Async GetStudentsDetailStatus
+    """
+    fields = views.GetStudentsDetailStatus.fields
+    needs_emotions = views.GetStudentsDetailStatus.needs_emotions
+    get_data = views.GetStudentsDetailStatus.get_data
+    get_entry = views.GetStudentsDetailStatus.get_entry
+
+    async def get(self, request):
+        try:
+            query = parse_detail_query(request.GET, self.fields)
+            student_ids, paginator = await aselect_keys('studentID', request, query, self)
+            emotions = self.needs_emotions(query)
+            class_ids = get_held_classes(query['since'], query['until'])
+
+            if query['stream']:
+                rosters, total_classes = await fan_out(
+                    aget_rosters('studentID', class_ids), acount_known('ClassID', class_ids)
+                )
+                entries = (
+                    (student_id, self.get_entry(class_breakdown, rosters.get(student_id), total_classes, query))
+                    async for student_id, class_breakdown in aiter_student_class_summary(
+                        student_ids, emotions, chunk_size=STREAM_CHUNK_SIZE, class_ids=class_ids, enrolled=True
+                    )
+                )
+                return astreaming_response(entries, query['stream'], 'studentID')
+
+            rosters, total_classes, summary = await fan_out(
+                aget_rosters('studentID', class_ids),
+                acount_known('ClassID', class_ids),
+                aget_student_class_summary(student_ids, emotions, class_ids, enrolled=True)
+            )
+            students_detail = self.get_data(summary, rosters, total_classes, query)
+
+            if paginator is not None:
+                return json_response(paginator.get_paginated_response(students_detail).data)
+            return json_response(students_detail)
+
+        except InvalidQuery as e:
+            return json_response({'error': str(e)}, status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return json_response(
+                {'error': f'Error retrieving students detail status: {str(e)}'},
+                status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+class AsyncGetClassDetailStatus(AsyncVersionedCacheMixin, AsyncStatementTimeoutMixin, View):
+    """
+    Async GetClassDetailStatus
+    """
+    fields = views.GetClassDetailStatus.fields
+    needs_emotions = views.GetClassDetailStatus.needs_emotions
+    get_data = views.GetClassDetailStatus.get_data
+    get_entry = views.GetClassDetailStatus.get_entry
+
+    async def get(self, request):
+        try:
+            query = parse_detail_query(request.GET, self.fields)
+            class_ids, paginator = await aselect_keys('ClassID', request, query, self)
+            emotions = self.needs_emotions(query)
+
+            if query['stream']:
+                rosters, total_students = await fan_out(aget_rosters('ClassID'), acount_known('studentID'))
+                entries = (
+                    (class_id, self.get_entry(class_data, rosters.get(class_id), total_students, query))
+                    async for class_id, class_data in aiter_class_student_summary(
+                        class_ids, emotions, chunk_size=STREAM_CHUNK_SIZE, enrolled=True
+                    )
+                )
+                return astreaming_response(entries, query['stream'], 'classID')
+
+            rosters, total_students, summary = await fan_out(
+                aget_rosters('ClassID'),
+                acount_known('studentID'),
+                aget_class_student_summary(class_ids, emotions, enrolled=True)
+            )
+            class_detail = self.get_data(summary, rosters, total_students, query)
+
+            if paginator is not None:
+                return json_response(paginator.get_paginated_response(class_detail).data)
+            return json_response(class_detail)
+
+        except InvalidQuery as e:
+            return json_response({'error': str(e)}, status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            return json_response(
+                {'error': f'Error retrieving class detail status: {str(e)}'},
+                status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
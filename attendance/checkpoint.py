@@ -0,0 +1,228 @@
+"""
+Resumable ingestion state for add_class_data
+
+Student identities are decided per track from the votes of its faces (see
+identity.py). IngestionState holds the vote tallies and pending rows of the
+tracks still open. A track whose leader is confident is locked to that
+student: its pending rows are written right away and its later faces go
+straight through. A track that has not been seen for a number of sampled
+frames is closed, and any rows it still holds are resolved and written.
+Memory stays bounded by the undecided tracks rather than by the video.
+
+Every so often the state is saved to a JSON file next to the video: the next
+sampled frame to process, the open tracks' votes and pending rows, and the
+session's counts. Rows of closed tracks are written before each save. An
+interrupted run started again with --resume picks up from the last
+checkpoint. The tracker itself cannot be saved, so the tracks open at the
+checkpoint are resolved with the votes they had. Rows written after the
+last checkpoint are written again on resume and skipped as already present.
+"""
+import json
+import os
+from .identity import add_vote, confident_match
+
+STATE_VERSION = 2
+
+
+def checkpoint_path(video_path, class_id):
+    """Default state file of a video's ingestion into a class"""
+    return f'{video_path}.{class_id}.checkpoint.json'
+
+
+class IngestionState:
+    """
+    Progress of one video's ingestion
+
+    Attributes:
+        next_frame: First sampled frame not fully processed yet
+        session_id: Session the rows are recorded under
+        inserted, skipped: Rows written so far
+        votes: Vote tallies of the undecided tracks, {track_id: {student_id: [votes, distance_sum]}}
+        rows: Pending rows of the undecided tracks, {track_id: [(frame_id, emotions)]}
+        locked: Student of each track locked early, {track_id: student_id}
+        last_seen: Last sampled frame each open track was seen in
+    """
+
+    def __init__(self, video_path, class_id, frame_interval, sampling, session_id=None):
+        self.video_path = video_path
+        self.class_id = class_id
+        self.frame_interval = frame_interval
+        self.sampling = sampling
+        self.session_id = session_id
+        self.next_frame = 0
+        self.inserted = 0
+        self.skipped = 0
+        self.votes = {}
+        self.rows = {}
+        self.locked = {}
+        self.last_seen = {}
+
+    def add(self, faces, results):
+        """
+        Add an analyzed batch of the pipeline
+
+        Args:
+            faces: (track_id, frame_id) of each face
+            results: (emotions, top_match) of each face
+
+        Returns:
+            list: (student_id, frame_id, emotions) rows of locked tracks,
+            ready to be written
+        """
+        ready = []
+        for (track_id, frame_id), (emotions, top_match) in zip(faces, results):
+            self.last_seen[track_id] = frame_id
+            student_id = self.locked.get(track_id)
+            if student_id is not None:
+                ready.append((student_id, frame_id, emotions))
+                continue
+
+            self.rows.setdefault(track_id, []).append((frame_id, emotions))
+            track_votes = self.votes.setdefault(track_id, {})
+            for match, distance in top_match:
+                add_vote(track_votes, match, distance)
+
+        # Batches end on frame boundaries
+        if faces:
+            self.next_frame = max(self.next_frame, faces[-1][1] + 1)
+        return ready
+
+    def lock_confident(self, min_votes, margin):
+        """
+        Lock the undecided tracks whose leader is confident (see
+        identity.confident_match)
+
+        Returns:
+            tuple: (tracks locked, their pending rows as
+            (student_id, frame_id, emotions), ready to be written)
+        """
+        locked = 0
+        ready = []
+        for track_id, track_votes in list(self.votes.items()):
+            student_id = confident_match(track_votes, min_votes, margin)
+            if student_id is None:
+                continue
+            locked += 1
+            self.locked[track_id] = student_id
+            del self.votes[track_id]
+            ready.extend((student_id, frame_id, emotions) for frame_id, emotions in self.rows.pop(track_id, []))
+        return locked, ready
+
+    def stale_tracks(self, timeout):
+        """Open tracks not seen in the last timeout sampled frames"""
+        return [
+            track_id for track_id, frame_id in self.last_seen.items()
+            if self.next_frame - frame_id > timeout
+        ]
+
+    def pop_tracks(self, track_ids):
+        """
+        Close tracks; locked ones have nothing left to resolve
+
+        Returns:
+            tuple: ({track_id: votes} of the undecided tracks,
+            [(track_id, frame_id, emotions)] of their pending rows)
+        """
+        track_votes = {}
+        rows = []
+        for track_id in track_ids:
+            self.last_seen.pop(track_id, None)
+            if self.locked.pop(track_id, None) is not None:
+                continue
+            track_votes[track_id] = self.votes.pop(track_id, {})
+            rows.extend((track_id, frame_id, emotions) for frame_id, emotions in self.rows.pop(track_id, []))
+        return track_votes, rows
+
+    def check(self, video_path, class_id, frame_interval, sampling):
+        """
+        Make sure a loaded state belongs to the run being resumed
+
+        Raises:
+            ValueError: If the video, class or sampling differ
+        """
+        expected = {
+            'video': (self.video_path, video_path),
+            'class ID': (self.class_id, class_id),
+            'frame interval': (self.frame_interval, frame_interval),
+            'sampling': (self.sampling, sampling),
+        }
+        for name, (saved, given) in expected.items():
+            if saved != given:
+                raise ValueError(f'Checkpoint was taken with {name} {saved}, not {given}')
+
+    def to_dict(self):
+        return {
+            'version': STATE_VERSION,
+            'video_path': self.video_path,
+            'class_id': self.class_id,
+            'frame_interval': self.frame_interval,
+            'sampling': self.sampling,
+            'session_id': self.session_id,
+            'next_frame': self.next_frame,
+            'inserted': self.inserted,
+            'skipped': self.skipped,
+            'tracks': [
+                {
+                    'track_id': track_id,
+                    'last_seen': self.last_seen[track_id],
+                    'locked': self.locked.get(track_id),
+                    'votes': self.votes.get(track_id, {}),
+                    'rows': self.rows.get(track_id, []),
+                }
+                for track_id in self.last_seen
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """
+        Raises:
+            ValueError: If data is not a state of this version
+        """
+        if data.get('version') != STATE_VERSION:
+            raise ValueError(f'Unsupported checkpoint version: {data.get("version")}')
+        state = cls(
+            data['video_path'], data['class_id'], data['frame_interval'], data['sampling'],
+            data['session_id']
+        )
+        state.next_frame = data['next_frame']
+        state.inserted = data['inserted']
+        state.skipped = data['skipped']
+        for track in data['tracks']:
+            track_id = track['track_id']
+            state.last_seen[track_id] = track['last_seen']
+            if track['locked'] is not None:
+                state.locked[track_id] = track['locked']
+                continue
+            state.votes[track_id] = track['votes']
+            state.rows[track_id] = [(frame_id, emotions) for frame_id, emotions in track['rows']]
+        return state
+
+    def save(self, path):
+        """Write the state to path atomically; a crash mid-write keeps the previous checkpoint"""
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.to_dict(), f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        """
+        State saved at path, or None if there is no checkpoint
+
+        Raises:
+            ValueError: If the file is not a readable checkpoint
+        """
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            raise ValueError(f'Cannot read checkpoint {path}: {e}')
+        try:
+            return cls.from_dict(data)
+        except (KeyError, TypeError, AttributeError) as e:
+            raise ValueError(f'Invalid checkpoint {path}: {e}')
@@ -0,0 +1,87 @@
+"""
+Per-endpoint statement timeouts
+
+DB_STATEMENT_TIMEOUT_MS sets a default statement timeout on every
+connection. DB_VIEW_STATEMENT_TIMEOUTS overrides it per endpoint, by URL
+name; the async/ routes share the timeout of their sync endpoint.
+
+The sync views run their queries in a transaction with a local
+statement_timeout (SET LOCAL), which ends with the transaction and so is
+also safe behind PgBouncer's transaction pooling. Async views cannot hold a
+transaction across the async ORM's calls, so they set the timeout on their
+connection for the request and restore it afterwards; behind PgBouncer,
+where session settings leak to other clients, they keep the default.
+
+Only the queries run before the view returns are covered: the rows of a
+streamed export are read after that and fall under the default timeout, as
+do the queries fan_out runs on other connections.
+"""
+from contextlib import contextmanager
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+ASYNC_ROUTE_PREFIX = 'async-'
+
+
+def get_statement_timeout(request):
+    """Statement timeout of the request's endpoint in milliseconds, 0 for the connection default"""
+    match = request.resolver_match
+    if match is None:
+        return 0
+    url_name = match.url_name.removeprefix(ASYNC_ROUTE_PREFIX)
+    return getattr(settings, 'DB_VIEW_STATEMENT_TIMEOUTS', {}).get(url_name, 0)
+
+
+def _set_statement_timeout(milliseconds, local, using):
+    with connections[using].cursor() as cursor:
+        cursor.execute("SELECT set_config('statement_timeout', %s, %s)", [f'{milliseconds}ms', local])
+
+
+def _reset_statement_timeout(using):
+    """Back to the connection's default, from its startup options or role"""
+    with connections[using].cursor() as cursor:
+        cursor.execute('RESET statement_timeout')
+
+
+@contextmanager
+def statement_timeout(milliseconds, using=DEFAULT_DB_ALIAS):
+    """
+    Run a read-only block in a transaction whose statements time out after
+    milliseconds
+
+    The transaction is rolled back, which also ends it cleanly after a
+    cancelled statement.
+    """
+    with transaction.atomic(using=using):
+        _set_statement_timeout(milliseconds, True, using)
+        try:
+            yield
+        finally:
+            transaction.set_rollback(True, using=using)
+
+
+class StatementTimeoutMixin:
+    """Run an APIView's handler under its endpoint's statement timeout, if any"""
+
+    def dispatch(self, request, *args, **kwargs):
+        milliseconds = get_statement_timeout(request)
+        if not milliseconds:
+            return super().dispatch(request, *args, **kwargs)
+        with statement_timeout(milliseconds):
+            return super().dispatch(request, *args, **kwargs)
+
+
+class AsyncStatementTimeoutMixin:
+    """StatementTimeoutMixin for async views, on the request's connection"""
+
+    async def dispatch(self, request, *args, **kwargs):
+        milliseconds = get_statement_timeout(request)
+        if not milliseconds or getattr(settings, 'DB_PGBOUNCER', False):
+            return await super().dispatch(request, *args, **kwargs)
+
+        await sync_to_async(_set_statement_timeout)(milliseconds, False, DEFAULT_DB_ALIAS)
+        try:
+            return await super().dispatch(request, *args, **kwargs)
+        finally:
+            await sync_to_async(_reset_statement_timeout)(DEFAULT_DB_ALIAS)
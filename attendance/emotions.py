@@ -0,0 +1,67 @@
+"""
+Fixed emotion set of the emotion model
+
+DeepFace always scores the same seven emotions, so frames store them as one
+float column each (plus the index of the dominant one) instead of a JSON
+document. Sums and averages are then plain SQL aggregates over those columns.
+The helpers here convert between the columns and the {emotion: score} dicts
+used by the pipeline and the API.
+"""
+from django.db import models
+
+# DeepFace's emotion classes, in the order of its model's outputs
+EMOTIONS = ('angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral')
+
+# Columns of the per-(class, student) rollup holding each emotion's sum
+SUM_FIELDS = tuple(f'{emotion}_sum' for emotion in EMOTIONS)
+
+
+class DominantEmotion(models.IntegerChoices):
+    """Small-int code of a frame's highest scoring emotion"""
+    ANGRY = 0, 'angry'
+    DISGUST = 1, 'disgust'
+    FEAR = 2, 'fear'
+    HAPPY = 3, 'happy'
+    SAD = 4, 'sad'
+    SURPRISE = 5, 'surprise'
+    NEUTRAL = 6, 'neutral'
+
+
+def emotion_values(emotions):
+    """
+    Column values of an {emotion: score} dict
+
+    Emotions outside EMOTIONS, non-numeric scores and non-dict input are
+    dropped, matching the checks the JSON aggregation used to do.
+
+    Returns:
+        tuple: One float or None per emotion, in EMOTIONS order
+    """
+    if not isinstance(emotions, dict):
+        return (None,) * len(EMOTIONS)
+    values = []
+    for emotion in EMOTIONS:
+        value = emotions.get(emotion)
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            value = None
+        values.append(None if value is None else float(value))
+    return tuple(values)
+
+
+def emotion_dict(values):
+    """{emotion: value} of the emotions that have a value, in EMOTIONS order"""
+    return {emotion: value for emotion, value in zip(EMOTIONS, values) if value is not None}
+
+
+def dominant_emotion(values):
+    """
+    Index of the highest value, the first one on ties
+
+    Returns:
+        int: A DominantEmotion value, or None if no emotion has a value
+    """
+    dominant = None
+    for index, value in enumerate(values):
+        if value is not None and (dominant is None or value > values[dominant]):
+            dominant = index
+    return dominant
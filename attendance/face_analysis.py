@@ -0,0 +1,109 @@
+"""
+Per-detection face analysis for the video pipeline
+
+Each YOLO box is cropped once and the same crop feeds both the emotion model
+and the ArcFace embedding used for identification. YOLO has already located
+the face, so DeepFace is told to skip its own detector instead of running
+another detection (MTCNN for recognition, OpenCV for emotion) on the crop.
+
+Crops are analyzed in batches: all faces of a frame, or of a window of
+frames, go through the emotion and ArcFace models as one batch.
+"""
+import numpy as np
+from .face_index import DETECTOR_BACKEND, MODEL_NAME
+
+
+def crop_face(frame, box):
+    """
+    Cut a face out of a frame
+
+    Args:
+        frame: BGR image array
+        box: (x_center, y_center, width, height) as returned by YOLO
+
+    Returns:
+        numpy.ndarray: The face crop, clipped to the frame
+    """
+    x, y, w, h = box
+
+    x1 = max(x - w // 2, 0)
+    y1 = max(y - h // 2, 0)
+    x2 = min(x + w // 2, frame.shape[1])
+    y2 = min(y + h // 2, frame.shape[0])
+    return frame[y1:y2, x1:x2]
+
+
+class FaceAnalyzer:
+    """
+    Emotion scores and gallery matches for detected faces
+    """
+
+    def __init__(self, face_index, top_k=3, detector_backend=DETECTOR_BACKEND):
+        self.face_index = face_index
+        self.top_k = top_k
+        self.detector_backend = detector_backend
+
+    def get_emotions(self, face_crops):
+        """
+        Emotion scores of several face crops, predicted as one batch
+
+        Returns:
+            list: One {emotion: score} dict per crop
+        """
+        from deepface import DeepFace
+
+        if not face_crops:
+            return []
+
+        analysis = DeepFace.analyze(
+            list(face_crops),
+            actions=['emotion'],
+            detector_backend=self.detector_backend,
+            enforce_detection=False,
+            silent=True
+        )
+        return [
+            {emotion: float(value) for emotion, value in first_face(result)['emotion'].items()}
+            for result in analysis
+        ]
+
+    def get_embeddings(self, face_crops):
+        """
+        ArcFace embeddings of several face crops, computed as one batch
+
+        Returns:
+            numpy.ndarray: (len(face_crops), d) float32 matrix
+        """
+        from deepface import DeepFace
+
+        representations = DeepFace.represent(
+            img_path=list(face_crops),
+            model_name=MODEL_NAME,
+            detector_backend=self.detector_backend,
+            enforce_detection=False
+        )
+        return np.asarray(
+            [first_face(result)['embedding'] for result in representations],
+            dtype=np.float32
+        )
+
+    def get_top_matches(self, face_crops):
+        """
+        Closest gallery students to each of several face crops
+
+        Returns:
+            list: For each crop, up to top_k (student_id, distance) tuples
+        """
+        if not face_crops:
+            return []
+        return self.face_index.search_batch(self.get_embeddings(face_crops), k=self.top_k)
+
+
+def first_face(result):
+    """
+    The analysis of a single input of a DeepFace batch call
+
+    With batch input DeepFace returns one list of faces per image; with the
+    "skip" detector that list holds exactly the crop itself.
+    """
+    return result[0] if isinstance(result, list) else result
@@ -0,0 +1,284 @@
+"""
+Precomputed ArcFace embedding index for the student face gallery
+
+DeepFace.find rebuilds or rescans its representations of the whole gallery
+for every query. The index instead stores one L2-normalized embedding per
+gallery image in a .npy matrix (loaded memory-mapped), with a JSON sidecar of
+student labels and a manifest of each image's mtime, size and SHA-256 (plus
+the model and detector used) that tells when the index has to be rebuilt.
+Identifying a face is then one embedding plus one matrix-vector product.
+"""
+import hashlib
+import json
+import os
+import numpy as np
+
+DB_PATH = "attendance/management/commands/db"
+INDEX_PATH = "attendance/management/commands/face_index"
+
+EMBEDDINGS_FILE = "embeddings.npy"
+LABELS_FILE = "labels.json"
+MANIFEST_FILE = "manifest.json"
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+
+MODEL_NAME = "ArcFace"
+# Gallery images and query faces are both crops of YOLO detections, so no
+# second face detector is run on them
+DETECTOR_BACKEND = "skip"
+# DeepFace's cosine threshold for ArcFace; matches further away than this are
+# not reported, like DeepFace.find does
+DISTANCE_THRESHOLD = 0.68
+
+
+def represent(img, detector_backend=DETECTOR_BACKEND):
+    """
+    Compute the ArcFace embedding of an image path or array
+
+    Returns:
+        numpy.ndarray: Embedding of the first face found (float32)
+    """
+    from deepface import DeepFace
+
+    representation = DeepFace.represent(
+        img_path=img,
+        model_name=MODEL_NAME,
+        detector_backend=detector_backend,
+        enforce_detection=False
+    )
+    return np.asarray(representation[0]['embedding'], dtype=np.float32)
+
+
+def index_config():
+    """Model settings an index was built with; embeddings are only comparable within one"""
+    return {'model_name': MODEL_NAME, 'detector_backend': DETECTOR_BACKEND}
+
+
+def file_hash(path):
+    """SHA-256 hex digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def scan_gallery(db_path, previous=None):
+    """
+    Describe every image of the gallery
+
+    The gallery has one directory per student holding that student's face
+    images. Hashes are reused from the previous manifest for files whose
+    mtime and size did not change.
+
+    Args:
+        db_path: Gallery root directory
+        previous: Manifest of the last build, if any
+
+    Returns:
+        dict: {relative_path: {'label', 'mtime', 'size', 'sha256'}} sorted by path
+    """
+    previous = previous or {}
+    manifest = {}
+    for root, _, files in os.walk(db_path):
+        for name in files:
+            if not name.lower().endswith(IMAGE_EXTENSIONS):
+                continue
+            path = os.path.join(root, name)
+            relative_path = os.path.relpath(path, db_path)
+            stat = os.stat(path)
+
+            entry = previous.get(relative_path)
+            if entry and entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+                sha256 = entry['sha256']
+            else:
+                sha256 = file_hash(path)
+
+            manifest[relative_path] = {
+                'label': os.path.basename(os.path.dirname(path)),
+                'mtime': stat.st_mtime,
+                'size': stat.st_size,
+                'sha256': sha256,
+            }
+    return dict(sorted(manifest.items()))
+
+
+def normalize(embeddings):
+    """L2-normalize embeddings along the last axis"""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+
+class FaceIndex:
+    """
+    Matrix of normalized gallery embeddings with their student labels
+    """
+
+    def __init__(self, embeddings, labels, manifest, config=None):
+        self.embeddings = embeddings
+        self.labels = labels
+        self.manifest = manifest
+        self.config = config if config is not None else index_config()
+
+    def __len__(self):
+        return len(self.labels)
+
+    @classmethod
+    def load(cls, index_path=INDEX_PATH, mmap=True):
+        """
+        Load an index written by build
+
+        Raises:
+            FileNotFoundError: If no index was built in index_path
+        """
+        embeddings = np.load(
+            os.path.join(index_path, EMBEDDINGS_FILE),
+            mmap_mode='r' if mmap else None
+        )
+        with open(os.path.join(index_path, LABELS_FILE)) as f:
+            labels = json.load(f)
+        with open(os.path.join(index_path, MANIFEST_FILE)) as f:
+            manifest = json.load(f)
+        return cls(embeddings, labels, manifest['files'], manifest['config'])
+
+    @classmethod
+    def build(cls, db_path=DB_PATH, index_path=INDEX_PATH, embed=represent, previous=None):
+        """
+        Embed the gallery and write the index to index_path
+
+        Images whose hash matches the previous index keep their embedding, so
+        only new or changed images are embedded again. Nothing is reused if the
+        previous index was built with another model or detector.
+
+        Args:
+            db_path: Gallery root directory
+            index_path: Directory to write the index to
+            embed: Callable returning the embedding of an image path
+            previous: FaceIndex to reuse embeddings from
+
+        Returns:
+            tuple: (FaceIndex, number of images embedded, number reused)
+        """
+        manifest = scan_gallery(db_path, previous.manifest if previous else None)
+
+        reusable = {}
+        if previous is not None and previous.config == index_config():
+            for row, entry in enumerate(previous.manifest.values()):
+                reusable[entry['sha256']] = row
+
+        embeddings = []
+        embedded = 0
+        for relative_path, entry in manifest.items():
+            row = reusable.get(entry['sha256'])
+            if row is not None:
+                embeddings.append(np.asarray(previous.embeddings[row]))
+            else:
+                embeddings.append(normalize(embed(os.path.join(db_path, relative_path))))
+                embedded += 1
+
+        if embeddings:
+            matrix = np.stack(embeddings).astype(np.float32)
+        else:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+        labels = [entry['label'] for entry in manifest.values()]
+
+        os.makedirs(index_path, exist_ok=True)
+        # Write to temporary files and swap them in so readers never see a
+        # half-written index
+        tmp_embeddings = os.path.join(index_path, EMBEDDINGS_FILE + '.tmp')
+        with open(tmp_embeddings, 'wb') as f:
+            np.save(f, matrix)
+        sidecars = (
+            (LABELS_FILE, labels),
+            (MANIFEST_FILE, {'config': index_config(), 'files': manifest}),
+        )
+        for name, content in sidecars:
+            with open(os.path.join(index_path, name + '.tmp'), 'w') as f:
+                json.dump(content, f)
+        for name in (EMBEDDINGS_FILE, LABELS_FILE, MANIFEST_FILE):
+            os.replace(os.path.join(index_path, name + '.tmp'), os.path.join(index_path, name))
+
+        return cls(matrix, labels, manifest), embedded, len(manifest) - embedded
+
+    def is_stale(self, db_path=DB_PATH):
+        """
+        Check whether the gallery changed since the index was built
+
+        Files are compared by mtime and size first and only hashed when those
+        changed, so an unchanged gallery is checked without reading images.
+        """
+        if self.config != index_config():
+            return True
+        current = scan_gallery(db_path, self.manifest)
+        if current.keys() != self.manifest.keys():
+            return True
+        return any(
+            current[path]['sha256'] != entry['sha256']
+            for path, entry in self.manifest.items()
+        )
+
+    def distances(self, embeddings):
+        """
+        Cosine distances between query embeddings and every gallery image
+
+        Args:
+            embeddings: One embedding or a (n, d) matrix of embeddings
+
+        Returns:
+            numpy.ndarray: (n, len(self)) distance matrix
+        """
+        queries = normalize(np.atleast_2d(embeddings))
+        return 1.0 - queries @ self.embeddings.T
+
+    def search(self, embedding, k=3, threshold=DISTANCE_THRESHOLD):
+        """
+        Closest gallery images to one embedding
+
+        Returns:
+            list: Up to k (student_label, distance) tuples, closest first
+        """
+        return self.search_batch(embedding, k, threshold)[0]
+
+    def search_batch(self, embeddings, k=3, threshold=DISTANCE_THRESHOLD):
+        """
+        Closest gallery images to each of several embeddings
+
+        Returns:
+            list: For each query, up to k (student_label, distance) tuples,
+            closest first
+        """
+        if len(self) == 0:
+            return [[] for _ in np.atleast_2d(embeddings)]
+
+        distances = self.distances(embeddings)
+        k = min(k, distances.shape[1])
+        nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+
+        results = []
+        for row, candidates in zip(distances, nearest):
+            candidates = candidates[np.argsort(row[candidates])]
+            results.append([
+                (self.labels[i], float(row[i]))
+                for i in candidates
+                if threshold is None or row[i] <= threshold
+            ])
+        return results
+
+
+def get_face_index(db_path=DB_PATH, index_path=INDEX_PATH, embed=represent):
+    """
+    Load the face index, rebuilding it first if it is missing or stale
+
+    Returns:
+        FaceIndex: An index matching the current gallery
+    """
+    try:
+        index = FaceIndex.load(index_path)
+    except FileNotFoundError:
+        index, _, _ = FaceIndex.build(db_path, index_path, embed)
+        return index
+
+    if index.is_stale(db_path):
+        index, _, _ = FaceIndex.build(db_path, index_path, embed, previous=index)
+    return index
@@ -0,0 +1,59 @@
+"""
+Track to student resolution from gallery match votes
+
+Every face of a track votes for the students among its top gallery matches.
+The votes of a track are kept as running tallies, {student_id: [votes,
+distance_sum]}, so a track costs the same memory however long it lasts.
+
+A track resolves to the student with the most votes, the lower average
+distance breaking ties. Once the leader's lead is safe, the track can be
+locked to it early and its rows written right away: the leader needs at
+least min_votes votes, and a lead over the runner-up of at least margin of
+all the track's votes.
+"""
+
+
+def add_vote(votes, student_id, distance):
+    """Count one match of a track for student_id"""
+    tally = votes.setdefault(student_id, [0, 0.0])
+    tally[0] += 1
+    tally[1] += distance
+
+
+def ranked(votes):
+    """(student_id, votes, average distance) of a track's candidates, best first"""
+    return sorted(
+        ((student_id, count, distance_sum / count) for student_id, (count, distance_sum) in votes.items()),
+        key=lambda candidate: (-candidate[1], candidate[2], candidate[0])
+    )
+
+
+def best_match(votes):
+    """Student a track resolves to, or None if it never matched anyone"""
+    candidates = ranked(votes)
+    return candidates[0][0] if candidates else None
+
+
+def confident_match(votes, min_votes, margin):
+    """
+    Student a track can be locked to before it ends, if any
+
+    Args:
+        votes: The track's tallies
+        min_votes: Votes the leader needs at least; 0 never locks
+        margin: Lead over the runner-up needed, as a share of all the
+            track's votes
+
+    Returns:
+        str: The leader's student ID, or None while the track is undecided
+    """
+    if min_votes <= 0:
+        return None
+    candidates = ranked(votes)
+    if not candidates or candidates[0][1] < min_votes:
+        return None
+    runner_up = candidates[1][1] if len(candidates) > 1 else 0
+    total = sum(count for _, count, _ in candidates)
+    if candidates[0][1] - runner_up < margin * total:
+        return None
+    return candidates[0][0]
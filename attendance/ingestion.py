@@ -0,0 +1,91 @@
+"""
+Batched write path for frame data produced by the video pipeline
+"""
+from django.db import connection, transaction
+from django.utils import timezone
+from .models import Class, Student, StudentData
+from . import summary
+
+
+def chunked(iterable, size):
+    """Yield lists of at most size items from iterable"""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def register(class_id, student_ids):
+    """
+    Make sure a class and its students exist in the dimension tables
+
+    Frames reference both through foreign keys, so they are registered before
+    any of their frames is inserted. A new class is dated to now. Existing
+    rows, and their names and dates, are left untouched.
+    """
+    Class.objects.bulk_create([Class(ClassID=class_id, held_at=timezone.now())], ignore_conflicts=True)
+    Student.objects.bulk_create(
+        [Student(studentID=student_id) for student_id in sorted(set(student_ids))],
+        ignore_conflicts=True
+    )
+
+
+def write_frames(class_id, frames, batch_size=1000):
+    """
+    Insert frame rows for one class in batches, skipping rows that already exist
+
+    Each batch runs in its own transaction: one query finds the rows of the
+    batch that are already stored, the rest are inserted with a single
+    bulk_create that also ignores conflicts on the (studentID, ClassID, FramID)
+    unique constraint, and the new rows are folded into the rollup. The class
+    and the batch's students are registered first. Re-running
+    the same video therefore stays idempotent without a lookup per row.
+
+    Args:
+        class_id: Class the frames belong to
+        frames: Iterable of (student_id, frame_id, emotions)
+        batch_size: Rows per batch
+
+    Yields:
+        tuple: (inserted, skipped) row counts for each batch
+    """
+    for batch in chunked(frames, batch_size):
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # Serialize writers of the same class so the existence check
+                # and the insert see a consistent view
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT pg_advisory_xact_lock(%s)', [class_id])
+
+            existing = set(
+                StudentData.objects
+                .filter(
+                    ClassID=class_id,
+                    studentID__in={student_id for student_id, _, _ in batch},
+                    FramID__in={frame_id for _, frame_id, _ in batch}
+                )
+                .values_list('studentID', 'FramID')
+            )
+
+            new_rows = []
+            for student_id, frame_id, emotions in batch:
+                key = (student_id, frame_id)
+                if key in existing:
+                    continue
+                existing.add(key)
+                new_rows.append(StudentData(
+                    studentID_id=student_id,
+                    ClassID_id=class_id,
+                    FramID=frame_id,
+                    Emotion=emotions
+                ))
+
+            register(class_id, [row.studentID_id for row in new_rows])
+            StudentData.objects.bulk_create(new_rows, ignore_conflicts=True)
+            summary.add_frames(class_id, [(row.studentID_id, row.Emotion) for row in new_rows])
+
+        yield len(new_rows), len(batch) - len(new_rows)
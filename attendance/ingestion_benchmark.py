@@ -0,0 +1,253 @@
+"""
+Offline harness for benchmarking the video ingestion pipeline
+
+add_class_data needs real footage, the YOLO weights from the network and
+the DeepFace models. This module provides stand-ins, so its stages can be
+timed anywhere:
+
+- make_video writes a short synthetic video of coloured, patterned "faces"
+  drifting over a dark background
+- make_gallery writes a face gallery with the same faces, one directory per
+  student
+- StubDetector finds the faces as bright blobs and tracks them by nearest
+  centroid, in place of YOLO
+- StubFaceAnalyzer derives emotion scores and embeddings from the crop
+  pixels in place of DeepFace; matching still goes through the real
+  FaceIndex
+
+StageTimer wraps the command's stage methods and adds up the time spent in
+each. The stages run concurrently in the pipeline, so their times overlap
+and can add up to more than the wall clock time.
+"""
+import os
+import threading
+import time
+import cv2
+import numpy as np
+from .emotions import EMOTIONS
+from .face_analysis import FaceAnalyzer
+
+BACKGROUND = 16
+FACE_RADIUS = 28
+# Side of the colour thumbnail the stub embedding is made of
+EMBEDDING_SIDE = 6
+
+
+def face_color(student):
+    """Distinct BGR colour of a synthetic student"""
+    hue = (student * 47) % 180
+    hsv = np.uint8([[[hue, 200, 230]]])
+    return tuple(int(value) for value in cv2.cvtColor(hsv, cv2.COLOR_HSV2BGR)[0, 0])
+
+
+def draw_face(image, center, student, radius=FACE_RADIUS):
+    """Draw a synthetic face: a coloured disc crossed by student-specific stripes"""
+    cv2.circle(image, center, radius, face_color(student), -1)
+    stripes = student % 4 + 1
+    for stripe in range(stripes):
+        offset = int((stripe + 1) * 2 * radius / (stripes + 1)) - radius
+        cv2.line(
+            image,
+            (center[0] - radius // 2, center[1] + offset),
+            (center[0] + radius // 2, center[1] + offset),
+            (BACKGROUND, BACKGROUND, BACKGROUND),
+            2
+        )
+
+
+def face_positions(frame_id, faces, width, height):
+    """Centres of the faces in a frame; each face drifts along its own ellipse"""
+    positions = []
+    columns = max(int(np.ceil(np.sqrt(faces))), 1)
+    rows = int(np.ceil(faces / columns))
+    for face in range(faces):
+        x0 = int((face % columns + 0.5) * width / columns)
+        y0 = int((face // columns + 0.5) * height / rows)
+        angle = frame_id / 25.0 + face
+        positions.append((x0 + int(8 * np.cos(angle)), y0 + int(6 * np.sin(angle))))
+    return positions
+
+
+def make_video(path, frames=300, faces=4, width=640, height=480, fps=25):
+    """
+    Write a synthetic video of faces drifting around their starting spots
+
+    Face i shows student i, so the expected identities are known.
+
+    Returns:
+        str: path
+    """
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, (width, height))
+    try:
+        for frame_id in range(frames):
+            frame = np.full((height, width, 3), BACKGROUND, dtype=np.uint8)
+            for student, center in enumerate(face_positions(frame_id, faces, width, height)):
+                draw_face(frame, center, student)
+            writer.write(frame)
+    finally:
+        writer.release()
+    return path
+
+
+def student_label(student):
+    """Gallery label of a synthetic student"""
+    return f'SYN{student:03d}'
+
+
+def make_gallery(db_path, students=4, images=2):
+    """
+    Write a gallery with images of the synthetic faces
+
+    Returns:
+        str: db_path
+    """
+    size = 2 * FACE_RADIUS + 8
+    for student in range(students):
+        directory = os.path.join(db_path, student_label(student))
+        os.makedirs(directory, exist_ok=True)
+        for image_id in range(images):
+            image = np.full((size, size, 3), BACKGROUND, dtype=np.uint8)
+            draw_face(image, (size // 2 + image_id, size // 2), student)
+            cv2.imwrite(os.path.join(directory, f'{image_id}.png'), image)
+    return db_path
+
+
+def stub_embedding(image):
+    """
+    Embedding of an image path or BGR array: its colour thumbnail, centred
+
+    Stands in for ArcFace; crops of the same synthetic face land close
+    together, different faces do not.
+    """
+    if isinstance(image, str):
+        image = cv2.imread(image)
+    thumbnail = cv2.resize(image, (EMBEDDING_SIDE, EMBEDDING_SIDE), interpolation=cv2.INTER_AREA)
+    vector = thumbnail.astype(np.float32).ravel()
+    return vector - vector.mean()
+
+
+class StubDetector:
+    """
+    Bright-blob face detector with a nearest-centroid tracker, in place of YOLO
+
+    Returns (track_id, (x_center, y_center, width, height)) like
+    add_class_data's get_boxes. Must be called with frames in order.
+    """
+
+    def __init__(self, min_area=100, max_distance=40):
+        self.min_area = min_area
+        self.max_distance = max_distance
+        self.tracks = {}
+        self.next_id = 1
+
+    def reset(self):
+        self.tracks = {}
+        self.next_id = 1
+
+    def __call__(self, frame):
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        _, mask = cv2.threshold(gray, BACKGROUND + 24, 255, cv2.THRESH_BINARY)
+        mask = cv2.dilate(mask, np.ones((5, 5), np.uint8))
+        count, _, stats, centroids = cv2.connectedComponentsWithStats(mask)
+
+        detections = []
+        unmatched = dict(self.tracks)
+        tracks = {}
+        for component in range(1, count):
+            x, y, w, h, area = stats[component]
+            if area < self.min_area:
+                continue
+            center = centroids[component]
+
+            track_id = None
+            best_distance = self.max_distance
+            for candidate, previous in unmatched.items():
+                distance = float(np.hypot(*(center - previous)))
+                if distance <= best_distance:
+                    track_id, best_distance = candidate, distance
+            if track_id is None:
+                track_id = self.next_id
+                self.next_id += 1
+            else:
+                del unmatched[track_id]
+
+            tracks[track_id] = center
+            detections.append((track_id, (int(x + w // 2), int(y + h // 2), int(w), int(h))))
+        self.tracks = tracks
+        return detections
+
+
+class StubFaceAnalyzer(FaceAnalyzer):
+    """
+    FaceAnalyzer with pixel-derived emotions and embeddings instead of DeepFace
+
+    Identification still searches the given FaceIndex, so the index and the
+    track to student resolution are exercised as usual.
+    """
+
+    def get_emotions(self, face_crops):
+        results = []
+        for crop in face_crops:
+            b, g, r = cv2.mean(crop)[:3]
+            logits = np.array([r, g, b, r + g, g + b, r + b, 128.0]) / 64.0
+            scores = np.exp(logits - logits.max())
+            scores = scores / scores.sum() * 100
+            results.append(dict(zip(EMOTIONS, scores.tolist())))
+        return results
+
+    def get_embeddings(self, face_crops):
+        return np.asarray([stub_embedding(crop) for crop in face_crops], dtype=np.float32)
+
+
+class StageTimer:
+    """
+    Time spent in, and calls to, each named stage; safe to use from the
+    pipeline's threads
+    """
+
+    def __init__(self):
+        self.seconds = {}
+        self.calls = {}
+        self.lock = threading.Lock()
+
+    def add(self, stage, seconds, calls=1):
+        with self.lock:
+            self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+            self.calls[stage] = self.calls.get(stage, 0) + calls
+
+    def wrap(self, stage, function):
+        """Callable timing each call of function as stage"""
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self.add(stage, time.perf_counter() - start)
+        return timed
+
+    def wrap_iterable(self, stage, iterable):
+        """Iterator timing each item produced by iterable as stage"""
+        iterator = iter(iterable)
+        while True:
+            start = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                # Reaching the end still took time, but produced nothing
+                self.add(stage, time.perf_counter() - start, calls=0)
+                return
+            self.add(stage, time.perf_counter() - start)
+            yield item
+
+    def wrap_generator_function(self, stage, function):
+        """Callable whose returned iterable is timed item by item as stage"""
+        def timed(*args, **kwargs):
+            return self.wrap_iterable(stage, function(*args, **kwargs))
+        return timed
+
+    def report(self):
+        """{stage: {'seconds': float, 'calls': int}} in the order stages were first seen"""
+        return {
+            stage: {'seconds': round(seconds, 4), 'calls': self.calls[stage]}
+            for stage, seconds in self.seconds.items()
+        }
@@ -0,0 +1,296 @@
+"""
+Per-request timing for the API endpoints
+
+RequestTimingMiddleware measures every request to a view of the attendance
+app and breaks its time down into:
+
+- db: time spent executing SQL, and the number of queries
+- serialize: time spent rendering the response body (TimedJSONRenderer)
+- aggregate: the rest of the view, i.e. Python building the response data
+- total: the whole request as seen by the middleware
+
+Queries are recorded by an execute wrapper installed on every database
+connection, which adds them to the timing of the request in the current
+context. That context follows the request into the threads that run the
+async views' queries.
+
+The breakdown is sent back in a Server-Timing header, so browser dev tools
+show it next to each dashboard call. A streamed export sends its headers
+before the body is produced, so its header only covers the time up to the
+first byte; the metrics record the whole stream.
+
+Requests slower than SLOW_REQUEST_MS are logged to attendance.slow_requests
+with their slowest SLOW_REQUEST_TOP_QUERIES queries. Latency histograms and
+query totals per view are kept in process and exposed in the Prometheus text
+format by metrics_view when METRICS_ENABLED is set. Every worker process keeps its
+own counts.
+"""
+import heapq
+import logging
+import threading
+import time
+from contextvars import ContextVar
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+from django.http import Http404, HttpResponse
+from rest_framework.renderers import JSONRenderer
+
+logger = logging.getLogger('attendance.slow_requests')
+
+INSTRUMENTED_NAMESPACE = 'attendance'
+# Upper bounds of the latency histogram buckets in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRICS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+_current_timing = ContextVar('request_timing', default=None)
+
+
+class RequestTiming:
+    """
+    Timings of one request, collected from record_query and from the renderer
+    """
+
+    def __init__(self, record_queries=False):
+        self.start = time.perf_counter()
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.serialize_seconds = 0.0
+        self.record_queries = record_queries
+        # (seconds, sql) of each query, kept for the slow request log
+        self.query_log = []
+        # Async views may run queries from several threads at once
+        self.lock = threading.Lock()
+
+    def add_query(self, seconds, sql):
+        with self.lock:
+            self.queries += 1
+            self.db_seconds += seconds
+            if self.record_queries:
+                self.query_log.append((seconds, sql))
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def server_timing(self, total):
+        """Server-Timing header value for a request that took total seconds"""
+        aggregate = max(total - self.db_seconds - self.serialize_seconds, 0.0)
+        return ', '.join([
+            f'db;dur={self.db_seconds * 1000:.2f};desc="{self.queries} queries"',
+            f'aggregate;dur={aggregate * 1000:.2f}',
+            f'serialize;dur={self.serialize_seconds * 1000:.2f}',
+            f'total;dur={total * 1000:.2f}',
+        ])
+
+    def slowest_queries(self, count):
+        """The count slowest queries as (seconds, sql), slowest first"""
+        return heapq.nlargest(count, self.query_log, key=lambda query: query[0])
+
+
+def record_query(execute, sql, params, many, context):
+    """Execute wrapper adding each query to the current request's timing"""
+    timing = _current_timing.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timing.add_query(time.perf_counter() - start, sql)
+
+
+def install_query_recorder(sender=None, connection=None, **kwargs):
+    """Add record_query to a connection once; connected to connection_created"""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+class TimedJSONRenderer(JSONRenderer):
+    """JSONRenderer that adds its rendering time to the current request's timing"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        start = time.perf_counter()
+        try:
+            return super().render(data, accepted_media_type, renderer_context)
+        finally:
+            timing = _current_timing.get()
+            if timing is not None:
+                timing.serialize_seconds += time.perf_counter() - start
+
+
+class RequestMetrics:
+    """Request counts, latency histograms and database totals per view"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            # {(view, method, status): count}
+            self.requests = {}
+            # {view: [count per bucket..., count above the last bucket]}
+            self.bucket_counts = {}
+            self.latency_sums = {}
+            self.queries = {}
+            self.db_seconds = {}
+
+    def observe(self, view, method, status_code, seconds, timing):
+        bucket = next(
+            (index for index, bound in enumerate(self.buckets) if seconds <= bound),
+            len(self.buckets)
+        )
+        with self.lock:
+            key = (view, method, status_code)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            counts = self.bucket_counts.setdefault(view, [0] * (len(self.buckets) + 1))
+            counts[bucket] += 1
+            self.latency_sums[view] = self.latency_sums.get(view, 0.0) + seconds
+            self.queries[view] = self.queries.get(view, 0) + timing.queries
+            self.db_seconds[view] = self.db_seconds.get(view, 0.0) + timing.db_seconds
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self.lock:
+            lines = [
+                '# HELP attendance_requests_total API requests by view, method and status code.',
+                '# TYPE attendance_requests_total counter',
+            ]
+            for (view, method, status_code), count in sorted(self.requests.items()):
+                lines.append(
+                    f'attendance_requests_total{{view="{view}",method="{method}",status="{status_code}"}} {count}'
+                )
+
+            lines += [
+                '# HELP attendance_request_duration_seconds API request latency by view.',
+                '# TYPE attendance_request_duration_seconds histogram',
+            ]
+            for view, counts in sorted(self.bucket_counts.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    lines.append(f'attendance_request_duration_seconds_bucket{{view="{view}",le="{bound}"}} {cumulative}')
+                total = cumulative + counts[-1]
+                lines.append(f'attendance_request_duration_seconds_bucket{{view="{view}",le="+Inf"}} {total}')
+                lines.append(f'attendance_request_duration_seconds_sum{{view="{view}"}} {self.latency_sums[view]:.6f}')
+                lines.append(f'attendance_request_duration_seconds_count{{view="{view}"}} {total}')
+
+            lines += [
+                '# HELP attendance_db_queries_total SQL queries run by API requests, by view.',
+                '# TYPE attendance_db_queries_total counter',
+            ]
+            for view, count in sorted(self.queries.items()):
+                lines.append(f'attendance_db_queries_total{{view="{view}"}} {count}')
+
+            lines += [
+                '# HELP attendance_db_seconds_total Time API requests spent in SQL, by view.',
+                '# TYPE attendance_db_seconds_total counter',
+            ]
+            for view, seconds in sorted(self.db_seconds.items()):
+                lines.append(f'attendance_db_seconds_total{{view="{view}"}} {seconds:.6f}')
+        return '\n'.join(lines) + '\n'
+
+
+metrics = RequestMetrics()
+
+
+class RequestTimingMiddleware:
+    """
+    Time requests to the attendance views: Server-Timing header, slow request
+    log and per-view metrics
+
+    Works in front of both sync and async views. The metrics endpoint itself
+    is not measured.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        # Connections opened before the app was ready missed connection_created
+        install_query_recorder(connection=connection)
+        timing = self.start_timing()
+        token = _current_timing.set(timing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current_timing.reset(token)
+        return self.process_response(request, response, timing)
+
+    async def __acall__(self, request):
+        timing = self.start_timing()
+        token = _current_timing.set(timing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current_timing.reset(token)
+        return self.process_response(request, response, timing)
+
+    def start_timing(self):
+        return RequestTiming(record_queries=getattr(settings, 'SLOW_REQUEST_MS', 0) > 0)
+
+    def process_response(self, request, response, timing):
+        match = request.resolver_match
+        if match is None or match.namespace != INSTRUMENTED_NAMESPACE or match.url_name == 'metrics':
+            return response
+
+        response['Server-Timing'] = timing.server_timing(timing.elapsed())
+        if not response.streaming:
+            self.finish(request, response, timing)
+        elif response.is_async:
+            response.streaming_content = self.afinish_streaming(response.streaming_content, request, response, timing)
+        else:
+            response.streaming_content = self.finish_streaming(response.streaming_content, request, response, timing)
+        return response
+
+    def finish_streaming(self, content, request, response, timing):
+        """Pass the streamed content through, timing its queries, then record the whole request"""
+        token = _current_timing.set(timing)
+        try:
+            yield from content
+        finally:
+            _current_timing.reset(token)
+            self.finish(request, response, timing)
+
+    async def afinish_streaming(self, content, request, response, timing):
+        """finish_streaming for async streamed content"""
+        token = _current_timing.set(timing)
+        try:
+            async for chunk in content:
+                yield chunk
+        finally:
+            _current_timing.reset(token)
+            self.finish(request, response, timing)
+
+    def finish(self, request, response, timing):
+        total = timing.elapsed()
+        view = request.resolver_match.url_name
+        metrics.observe(view, request.method, response.status_code, total, timing)
+
+        slow_ms = getattr(settings, 'SLOW_REQUEST_MS', 0)
+        if slow_ms > 0 and total * 1000 >= slow_ms:
+            top = getattr(settings, 'SLOW_REQUEST_TOP_QUERIES', 5)
+            queries = ''.join(
+                f'\n  {seconds * 1000:8.2f} ms  {sql}'
+                for seconds, sql in timing.slowest_queries(top)
+            )
+            logger.warning(
+                'Slow request %s %s: %.1f ms, %d queries in %.1f ms, serialize %.1f ms%s',
+                request.method, request.get_full_path(), total * 1000,
+                timing.queries, timing.db_seconds * 1000, timing.serialize_seconds * 1000, queries
+            )
+
+
+def metrics_view(request):
+    """Per-view request metrics in the Prometheus text format"""
+    if not getattr(settings, 'METRICS_ENABLED', False):
+        raise Http404('Metrics are disabled')
+    return HttpResponse(metrics.render(), content_type=METRICS_CONTENT_TYPE)
@@ -1,14 +1,120 @@
-from math import inf
+import itertools
 from django.core.management.base import BaseCommand, CommandError
 import os
-from attendance.models import StudentData
+from django.db import transaction
+from django.utils import timezone
+from attendance.checkpoint import IngestionState, checkpoint_path
+from attendance.identity import best_match
+from attendance.ingestion import register, write_frames
+from attendance.models import Class, Session
+from attendance.query_params import InvalidQuery, parse_moment
+from attendance.response_cache import bump_data_version
+from attendance.face_index import get_face_index
+from attendance.face_analysis import FaceAnalyzer
+from attendance.pipeline import VideoPipeline
+from attendance.recognition import RecognitionPolicy
+from attendance.sampling import SAMPLING_MODES, DEFAULT_SAMPLING_MODE, get_frames, interval_from_seconds
 from typing import List, Tuple
-from ultralytics import YOLO
-from deepface import DeepFace
-import cv2
 
 TRACK_MODEL_PATH = "attendance/management/commands/yolov8n-face-lindevs.onnx"
-DB_PATH = "attendance/management/commands/db"
+
+
+def add_processing_arguments(parser):
+    """Options controlling how a video is processed, shared with add_class_data_batch"""
+    parser.add_argument(
+        '--frame-interval',
+        type=int,
+        default=500,
+        help='Process every Nth frame (default: %(default)s)'
+    )
+    parser.add_argument(
+        '--every-seconds',
+        type=float,
+        default=None,
+        help='Process one frame every SECONDS of video; overrides --frame-interval'
+    )
+    parser.add_argument(
+        '--sampling',
+        choices=SAMPLING_MODES,
+        default=DEFAULT_SAMPLING_MODE,
+        help=f'How sampled frames are reached: decode all (read), grab and only '
+             f'retrieve sampled frames (grab) or seek to them (seek) (default: {DEFAULT_SAMPLING_MODE})'
+    )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=32,
+        help='Faces analyzed per model batch, collected across frames (default: 32)'
+    )
+    parser.add_argument(
+        '--write-batch-size',
+        type=int,
+        default=1000,
+        help='Rows written per database batch (default: 1000)'
+    )
+    parser.add_argument(
+        '--analysis-workers',
+        type=int,
+        default=1,
+        help='Threads running face analysis batches concurrently (default: 1)'
+    )
+    parser.add_argument(
+        '--frame-queue-size',
+        type=int,
+        default=8,
+        help='Decoded frames buffered ahead of detection (default: 8)'
+    )
+    parser.add_argument(
+        '--batch-queue-size',
+        type=int,
+        default=4,
+        help='Face batches queued or in flight in the analysis stage (default: 4)'
+    )
+    parser.add_argument(
+        '--track-timeout',
+        type=int,
+        default=30,
+        help='Sampled frames a track may be missing before it is resolved and its rows written (default: 30)'
+    )
+    parser.add_argument(
+        '--recognize-every',
+        type=int,
+        default=1,
+        help='Identify a track on every Nth of its sampled frames and reuse its matches '
+             'in between; 1 identifies every face (default: 1)'
+    )
+    parser.add_argument(
+        '--recognize-drift',
+        type=float,
+        default=None,
+        help='Identify a face anyway when its appearance differs from the track\'s last identified '
+             'face by more than this cosine distance, e.g. 0.2 (default: off)'
+    )
+    parser.add_argument(
+        '--lock-min-votes',
+        type=int,
+        default=10,
+        help='Votes a track\'s best match needs before the track is locked to it and its rows '
+             'written early; 0 resolves every track when it ends (default: 10)'
+    )
+    parser.add_argument(
+        '--lock-margin',
+        type=float,
+        default=0.5,
+        help='Lead over the runner-up, as a share of the track\'s votes, needed to lock a track (default: 0.5)'
+    )
+    parser.add_argument(
+        '--checkpoint-interval',
+        type=int,
+        default=100,
+        help='Save progress every N sampled frames so an interrupted run can resume; 0 disables (default: 100)'
+    )
+    parser.add_argument(
+        '--resume',
+        action='store_true',
+        help='Continue from the last checkpoint of the video instead of starting over'
+    )
+
 
 class Command(BaseCommand):
     """
@@ -16,6 +122,18 @@ class Command(BaseCommand):
     
     Usage:
         python manage.py add_class_data <video_path> [--class-id CLASS_ID] [--frame-interval FRAME_INTERVAL]
+                                        [--batch-size BATCH_SIZE] [--write-batch-size WRITE_BATCH_SIZE]
+                                        [--analysis-workers N] [--frame-queue-size N] [--batch-queue-size N]
+                                        [--every-seconds SECONDS] [--sampling {read,grab,seek}]
+                                        [--recognize-every N] [--recognize-drift DISTANCE]
+                                        [--lock-min-votes N] [--lock-margin SHARE]
+                                        [--track-timeout N] [--checkpoint-interval N] [--checkpoint PATH]
+                                        [--resume]
+    
+    Rows are written once their track is locked to a student or ends, and
+    progress is checkpointed to <video_path>.<class_id>.checkpoint.json (see
+    attendance/checkpoint.py). After a crash, run the same command again
+    with --resume.
     
     Example:
         python manage.py add_class_data /path/to/video.mp4 --class-id 101 --frame-interval 100
@@ -23,6 +141,8 @@ class Command(BaseCommand):
     
     help = 'Process video file and add class attendance and emotion data'
     
+    sampling = DEFAULT_SAMPLING_MODE
+    
     def add_arguments(self, parser):
         parser.add_argument(
             'video_path',
@@ -36,67 +156,201 @@ class Command(BaseCommand):
             help='Class ID for the video (default: 1)'
         )
         parser.add_argument(
-            '--frame-interval',
-            type=int,
-            default=500,
-            help='Process every Nth frame (default: 30)'
+            '--checkpoint',
+            type=str,
+            default=None,
+            help='State file to checkpoint to and resume from (default: <video_path>.<class_id>.checkpoint.json)'
         )
+        parser.add_argument(
+            '--held-at',
+            type=str,
+            default=None,
+            help='Date or ISO datetime the class was held, used by the from/to filters '
+                 '(default: when its first frames are written)'
+        )
+        add_processing_arguments(parser)
     
     def handle(self, *args, **options):
         video_path = options['video_path']
         class_id = options['class_id']
-        frame_interval = options['frame_interval']
         
         # Validate video file exists
         if not os.path.exists(video_path):
             raise CommandError(f'Video file not found: {video_path}')
+        try:
+            options['held_at'] = parse_moment(options, 'held_at')
+        except InvalidQuery as e:
+            raise CommandError(str(e))
+        
+        self.load_models()
+        self.process_video(video_path, class_id, options)
+    
+    def load_models(self):
+        """Load the tracker, face index and analysis models once for any number of videos"""
+        self.track_model = self.get_track_model()
+        self.face_index = get_face_index()
+        self.stdout.write(f'Face index: {len(self.face_index)} gallery images')
+        self.face_analyzer = FaceAnalyzer(self.face_index)
+    
+    def process_video(self, video_path, class_id, options):
+        """
+        Run one video through the pipeline and write its frames, recorded as
+        a Session of the class
+        
+        Returns:
+            tuple: (rows inserted, rows skipped as already present)
+        """
+        frame_interval = options['frame_interval']
+        batch_size = options['batch_size']
+        write_batch_size = options['write_batch_size']
+        
+        if options['every_seconds'] is not None:
+            try:
+                frame_interval = interval_from_seconds(video_path, options['every_seconds'])
+            except ValueError as e:
+                raise CommandError(str(e))
+        self.sampling = options['sampling']
                 
         self.stdout.write(
             self.style.SUCCESS(f'Processing video: {video_path}')
         )
         self.stdout.write(f'Class ID: {class_id}')
-        self.stdout.write(f'Frame interval: {frame_interval}')
+        self.stdout.write(f'Frame interval: {frame_interval} ({self.sampling} sampling)')
+        self.stdout.write(f'Batch size: {batch_size}')
         
+        state_path = options.get('checkpoint') or checkpoint_path(video_path, class_id)
+        checkpoint_interval = options.get('checkpoint_interval', 0)
+        track_timeout = options.get('track_timeout', 30)
+        lock_min_votes = options.get('lock_min_votes', 0)
+        lock_margin = options.get('lock_margin', 0.5)
         
-        self.track_model = self.get_track_model()
+        state = None
+        if options.get('resume'):
+            try:
+                state = IngestionState.load(state_path)
+                if state is not None:
+                    state.check(video_path, class_id, frame_interval, self.sampling)
+            except ValueError as e:
+                raise CommandError(str(e))
+            if state is None:
+                self.stdout.write(f'No checkpoint at {state_path}, starting from the beginning')
+        
+        session = None
+        if state is not None:
+            session = Session.objects.filter(pk=state.session_id).first()
+            self.stdout.write(
+                f'Resuming from frame {state.next_frame} ({state.inserted} rows written, '
+                f'{len(state.last_seen)} open tracks)'
+            )
+        if session is None:
+            register(class_id, [])
+            session = Session.objects.create(ClassID_id=class_id, video_path=video_path)
+        if options.get('held_at') is not None:
+            # update() sends no signals, hence the explicit bump
+            with transaction.atomic():
+                Class.objects.filter(ClassID=class_id).update(held_at=options['held_at'])
+                bump_data_version()
+        if state is None:
+            state = IngestionState(video_path, class_id, frame_interval, self.sampling, session.pk)
+        state.session_id = session.pk
         
-        track_id_matches = {}
+        # Track IDs must not carry over from a previous video
+        self.reset_tracker()
+        self.recognition = RecognitionPolicy(options.get('recognize_every', 1), options.get('recognize_drift'))
         
-        data_set = []
+        ready = []
+        batch_ids = itertools.count()
+        last_checkpoint = state.next_frame
+        tracks_locked = 0
+        tracks_resolved = 0
         
-        for frame_id, frame in enumerate(self.get_frames(video_path, frame_interval)):
+        def resolve(track_ids):
+            """Close tracks and queue the rows of undecided ones under the students they resolve to"""
+            nonlocal tracks_resolved
+            if not track_ids:
+                return
+            track_votes, rows = state.pop_tracks(track_ids)
+            if not track_votes:
+                return
+            tracks_resolved += len(track_votes)
+            # A track that never matched anyone has no student to write rows for
+            track_student_mapping = self.get_track_id_student_mapping(track_votes)
+            ready.extend(
+                (track_student_mapping[track_id], frame_id, emotions)
+                for track_id, frame_id, emotions in rows
+                if track_id in track_student_mapping
+            )
+        
+        def flush():
+            for inserted, skipped in self.write_frames(class_id, ready, write_batch_size):
+                self.stdout.write(
+                    f'Batch {next(batch_ids)}: inserted {inserted} rows, skipped {skipped} existing rows'
+                )
+                state.inserted += inserted
+                state.skipped += skipped
+            ready.clear()
+        
+        # The tracker starts over, so tracks open at the checkpoint cannot continue
+        resolve(list(state.last_seen))
+        
+        def collect(faces, results):
+            nonlocal last_checkpoint, tracks_locked
+            results = self.recognition.fill_matches(faces, results)
+            ready.extend(state.add(faces, results))
+            locked, locked_rows = state.lock_confident(lock_min_votes, lock_margin)
+            tracks_locked += locked
+            ready.extend(locked_rows)
+            resolve(state.stale_tracks(track_timeout))
+            if len(ready) >= write_batch_size:
+                flush()
+            if checkpoint_interval > 0 and state.next_frame - last_checkpoint >= checkpoint_interval:
+                flush()
+                state.save(state_path)
+                last_checkpoint = state.next_frame
+        
+        def report_progress(frame_id):
             if frame_id % 5 == 0:
                 self.stdout.write(f'Processing frame {frame_id}')
-
-            for track_id, box in self.get_boxes(frame):
-                if track_id not in track_id_matches:
-                    track_id_matches[track_id] = {}
-                
-                emotions : List[Tuple[str, float]] = self.get_emotion(box, frame)
-                
-                data_set.append((track_id, frame_id, emotions))
-                
-                top_match : List[Tuple[str, float]] = self.get_top_match(box, frame)
-
-                for match, distance in top_match:
-                    track_id_matches[track_id].setdefault(match, []).append(distance)
-
-        track_student_mapping = self.get_track_id_student_mapping(track_id_matches)
-
-        for track_id, frame_id, emotions in data_set:
-            student = track_student_mapping[track_id]
-            
-            if StudentData.objects.filter(studentID=student, ClassID=class_id, FramID=frame_id).exists():
-                continue
-            
-            StudentData.objects.create(
-                studentID=student,
-                ClassID=class_id,
-                FramID=frame_id,
-                Emotion=emotions
-            )
         
-        self.stdout.write(self.style.SUCCESS(f'Added {len(data_set)} data points'))
+        # Decode, track and analyze run as concurrent stages; collect runs in this thread
+        VideoPipeline(
+            frames=self.get_frames(video_path, frame_interval, state.next_frame),
+            detect=self.get_boxes,
+            analyze=self.analyze_faces,
+            sink=collect,
+            batch_size=batch_size,
+            analysis_workers=options['analysis_workers'],
+            frame_queue_size=options['frame_queue_size'],
+            batch_queue_size=options['batch_queue_size'],
+            on_frame=report_progress,
+            first_frame_id=state.next_frame,
+            recognize=self.recognition.should_recognize,
+        ).run()
+        
+        resolve(list(state.last_seen))
+        flush()
+        
+        session.frames_inserted = state.inserted
+        session.frames_skipped = state.skipped
+        session.finished_at = timezone.now()
+        session.save(update_fields=['frames_inserted', 'frames_skipped', 'finished_at'])
+        
+        if os.path.exists(state_path):
+            os.remove(state_path)
+        
+        self.stdout.write(
+            f'Tracks: {tracks_locked} locked early, {tracks_resolved} resolved when they ended'
+        )
+        recognition = self.recognition.stats()
+        self.stdout.write(
+            f'Recognition: {recognition["recognized"]} of {recognition["faces"]} faces identified, '
+            f'{recognition["skipped"]} reused their track\'s matches '
+            f'({recognition["drifted"]} identified early on appearance drift)'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Added {state.inserted} data points ({state.skipped} already present)'
+        ))
+        return state.inserted, state.skipped
 
     def download_yolo_model(self):
         import requests
@@ -109,22 +363,24 @@ class Command(BaseCommand):
 
         
     def get_track_model(self):
+        from ultralytics import YOLO
+        
         self.download_yolo_model()
         
         return YOLO(TRACK_MODEL_PATH)
 
+    
+    def reset_tracker(self):
+        predictor = getattr(self.track_model, 'predictor', None)
+        for tracker in getattr(predictor, 'trackers', None) or []:
+            tracker.reset()
+
 
-    def get_frames(self, video_path, frame_interval):
-        cap = cv2.VideoCapture(video_path)
-        frame_id = 0
-        while cap.isOpened():
-            ret, frame = cap.read()
-            if not ret:
-                break
-            if frame_id % frame_interval == 0:
-                yield frame
-            frame_id += 1
-        cap.release()
+    def get_frames(self, video_path, frame_interval, start=0):
+        return get_frames(video_path, frame_interval, self.sampling, start)
+    
+    def write_frames(self, class_id, rows, batch_size):
+        return write_frames(class_id, rows, batch_size)
     
     def get_boxes(self, frame):
         results = self.track_model.track(frame, persist=True, classes=[0])
@@ -136,75 +392,42 @@ class Command(BaseCommand):
         return zip(track_ids, boxes)
 
     
-    def get_emotion(self, box, frame):
-        x, y, w, h = box
-
-        x1 = max(x - w // 2, 0)
-        y1 = max(y - h // 2, 0)
-        x2 = min(x + w // 2, frame.shape[1])
-        y2 = min(y + h // 2, frame.shape[0])
-        face_crop = frame[y1:y2, x1:x2]
-        
-        analysis = DeepFace.analyze(face_crop, actions=['emotion'], enforce_detection=False)
-
-        emotions = analysis[0]['emotion']
+    def analyze_faces(self, face_crops, recognize=None):
+        """
+        Emotions of every crop, and gallery matches of the crops flagged in
+        recognize (all of them by default); unidentified crops get None
+        """
+        emotions_batch : List[dict] = self.get_emotions(face_crops)
+        if recognize is None:
+            recognize = [True] * len(face_crops)
         
-        emotions_dict = {}
+        to_identify = [crop for crop, flag in zip(face_crops, recognize) if flag]
+        top_matches = iter(self.get_top_matches(to_identify) if to_identify else [])
+        top_match_batch : List[List[Tuple[str, float]]] = [
+            next(top_matches) if flag else None for flag in recognize
+        ]
         
-        for emotion, value in emotions.items():
-            emotions_dict[emotion] = float(value)   
-        
-        return emotions_dict
+        return list(zip(emotions_batch, top_match_batch))
 
 
-    def get_top_match(self, box, frame):
-        x, y, w, h = box
+    def get_emotions(self, face_crops):
+        return self.face_analyzer.get_emotions(face_crops)
 
-        x1 = max(x - w // 2, 0)
-        y1 = max(y - h // 2, 0)
-        x2 = min(x + w // 2, frame.shape[1])
-        y2 = min(y + h // 2, frame.shape[0])
-        face_crop = frame[y1:y2, x1:x2]
-        
-        df_find = DeepFace.find(
-                img_path=face_crop,
-                db_path=DB_PATH,
-                detector_backend="mtcnn",
-                model_name="ArcFace",
-                enforce_detection=False,
-                silent=True
-        )
-            
-        df = df_find[0]
-        df = df.head(3)
-        
-        top_match = []
-        
-        for _, match in df.iterrows():
-            matched_img_path = match['identity']
-            matched_img_path = matched_img_path.split('/')[-2]
-            
-            distance = match['distance']
-
-            top_match.append((matched_img_path, distance))
 
-        return top_match
+    def get_top_matches(self, face_crops):
+        return self.face_analyzer.get_top_matches(face_crops)
         
-    def get_track_id_student_mapping(self, track_id_matches):
-        track_student_mapping = {}
+    def get_track_id_student_mapping(self, track_votes):
+        """
+        Student of each track from its vote tallies, for the tracks that did
+        not lock early (see attendance/identity.py)
         
-        for track_id, students_distacne in track_id_matches.items():
-            best_student = ""
-            best_count = 0
-            best_avg = inf
-            for student, distance_list in students_distacne.items():
-                count = len(distance_list)
-                avg = sum(distance_list) / count
-                
-                if best_student == "" or count > best_count or (count == best_student and avg < best_avg):
-                    best_student = student
-                    best_count = count
-                    best_avg = avg
-            
-            track_student_mapping[track_id] = student
+        Returns:
+            dict: {track_id: student_id}, without the tracks that never matched anyone
+        """
+        track_student_mapping = {}
+        for track_id, votes in track_votes.items():
+            student = best_match(votes)
+            if student is not None:
+                track_student_mapping[track_id] = student
         return track_student_mapping
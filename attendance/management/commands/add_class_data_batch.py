@@ -0,0 +1,243 @@
+from django.core.management.base import BaseCommand, CommandError, OutputWrapper
+import atexit
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+from itertools import islice
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from attendance.management.commands.add_class_data import add_processing_arguments
+
+# Command instance of each worker process, holding the models it loaded
+_worker_command = None
+
+
+class PrefixedStream:
+    """Text stream writing each line to another stream behind a prefix"""
+
+    def __init__(self, stream, prefix):
+        self.stream = stream
+        self.prefix = prefix
+
+    def write(self, text):
+        for line in text.splitlines(keepends=True):
+            self.stream.write(f'{self.prefix}{line}')
+        self.stream.flush()
+
+    def flush(self):
+        self.stream.flush()
+
+    def isatty(self):
+        return False
+
+
+def load_manifest(manifest_path):
+    """
+    Read the list of videos to process
+
+    The manifest is either a CSV file with video_path and class_id columns,
+    or a JSON file holding a list of {"video_path", "class_id"} objects or an
+    object mapping video paths to class IDs. Relative video paths are resolved
+    against the manifest's directory.
+
+    Returns:
+        list: (video_path, class_id) tuples in manifest order
+
+    Raises:
+        CommandError: If the manifest cannot be read
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    try:
+        with open(manifest_path, newline='') as f:
+            if manifest_path.lower().endswith('.json'):
+                data = json.load(f)
+                if isinstance(data, dict):
+                    entries = list(data.items())
+                else:
+                    entries = [(entry['video_path'], entry['class_id']) for entry in data]
+            else:
+                entries = [(row['video_path'], row['class_id']) for row in csv.DictReader(f)]
+        return [
+            (os.path.join(base_dir, video_path.strip()), int(class_id))
+            for video_path, class_id in entries
+        ]
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        raise CommandError(f'Cannot read manifest {manifest_path}: {e}')
+
+
+def init_worker(verbosity):
+    """Set up Django and load the models once per worker process"""
+    global _worker_command
+    import django
+
+    django.setup()
+
+    from attendance.management.commands.add_class_data import Command as AddClassDataCommand
+
+    # Per-frame progress of every worker is only shown with --verbosity 2
+    prefix = f'[worker {os.getpid()}] '
+    if verbosity > 1:
+        stdout = PrefixedStream(sys.stdout, prefix)
+    else:
+        stdout = open(os.devnull, 'w')
+        atexit.register(stdout.close)
+    _worker_command = AddClassDataCommand(
+        stdout=OutputWrapper(stdout),
+        stderr=OutputWrapper(PrefixedStream(sys.stderr, prefix)),
+        no_color=True
+    )
+    _worker_command.load_models()
+
+
+def process_video(video_path, class_id, options):
+    """
+    Process one video in a worker process
+
+    Returns:
+        dict: Outcome of the video; failures are reported, not raised
+    """
+    start = time.perf_counter()
+    try:
+        if not os.path.exists(video_path):
+            raise FileNotFoundError(f'Video file not found: {video_path}')
+        inserted, skipped = _worker_command.process_video(video_path, class_id, options)
+        return {'status': 'ok', 'inserted': inserted, 'skipped': skipped,
+                'seconds': time.perf_counter() - start}
+    except Exception as e:
+        return {'status': 'failed', 'error': f'{type(e).__name__}: {e}',
+                'seconds': time.perf_counter() - start}
+
+
+class Command(BaseCommand):
+    """
+    Django management command to process many videos in parallel
+
+    Videos listed in a manifest are spread across a pool of worker processes.
+    Each worker loads the tracker, face index and analysis models once and
+    reuses them for every video it gets. A failing video is reported and the
+    rest of the batch carries on. If a worker process dies (e.g. killed for
+    running out of memory), the videos it and the other workers were running
+    are reported as failed and the videos not started yet go to a new pool.
+
+    Usage:
+        python manage.py add_class_data_batch <manifest> [--workers N] [add_class_data options]
+
+    Example:
+        python manage.py add_class_data_batch week_12.csv --workers 4 --every-seconds 5
+
+    Manifest example (CSV):
+        video_path,class_id
+        monday.mp4,101
+        tuesday.mp4,102
+    """
+
+    help = 'Process the videos listed in a CSV/JSON manifest with a pool of worker processes'
+
+    # TensorFlow and the tracker are not fork-safe, so workers are spawned
+    start_method = 'spawn'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'manifest',
+            type=str,
+            help='CSV (video_path,class_id) or JSON manifest of videos to process'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=2,
+            help='Worker processes, each with its own copy of the models (default: 2)'
+        )
+        add_processing_arguments(parser)
+
+    def handle(self, *args, **options):
+        videos = load_manifest(options['manifest'])
+        if not videos:
+            raise CommandError(f'No videos listed in {options["manifest"]}')
+
+        workers = max(1, min(options['workers'], len(videos)))
+        self.stdout.write(f'Processing {len(videos)} videos with {workers} workers')
+
+        processing_options = {
+            key: value for key, value in options.items()
+            if key not in ('manifest', 'workers', 'stdout', 'stderr')
+        }
+
+        self.total = len(videos)
+        self.done = 0
+        failures = []
+        pending = list(videos)
+        while pending:
+            pending = self.run_pool(pending, workers, processing_options, options['verbosity'], failures)
+            if pending:
+                self.stdout.write(self.style.WARNING(
+                    f'Restarting the worker pool for the {len(pending)} videos not started yet'
+                ))
+
+        if failures:
+            raise CommandError(f'{len(failures)} of {len(videos)} videos failed: {", ".join(failures)}')
+        self.stdout.write(self.style.SUCCESS(f'Processed {len(videos)} videos'))
+
+    def run_pool(self, videos, workers, processing_options, verbosity, failures):
+        """
+        Process videos with a new pool of worker processes
+
+        No more videos than workers are submitted at a time, so every
+        submitted video is running and the others have not started when a
+        worker dies.
+
+        Returns:
+            list: (video_path, class_id) of the videos not started because a
+            worker died, empty once all were processed
+        """
+        remaining = iter(videos)
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context(self.start_method),
+            initializer=init_worker,
+            initargs=(verbosity,)
+        ) as pool:
+            running = {}
+
+            def submit(count):
+                for video_path, class_id in islice(remaining, count):
+                    future = pool.submit(process_video, video_path, class_id, processing_options)
+                    running[future] = (video_path, class_id)
+
+            submit(workers)
+            while running:
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                broken = False
+                for future in finished:
+                    video_path, class_id = running.pop(future)
+                    try:
+                        result = future.result()
+                    except BrokenProcessPool as e:
+                        broken = True
+                        result = {'status': 'failed', 'error': f'worker process died: {e}', 'seconds': 0.0}
+                    self.report(video_path, class_id, result, failures)
+                if broken:
+                    # The pool stops every worker once one died
+                    for future, (video_path, class_id) in running.items():
+                        self.report(video_path, class_id, {
+                            'status': 'failed', 'error': 'worker pool stopped after a worker died', 'seconds': 0.0
+                        }, failures)
+                    return list(remaining)
+                submit(len(finished))
+        return []
+
+    def report(self, video_path, class_id, result, failures):
+        """Print the outcome of one video, adding it to failures if it failed"""
+        self.done += 1
+        label = f'[{self.done}/{self.total}] {video_path} (class {class_id})'
+        if result['status'] == 'ok':
+            self.stdout.write(self.style.SUCCESS(
+                f"{label}: inserted {result['inserted']}, skipped {result['skipped']} "
+                f"in {result['seconds']:.1f}s"
+            ))
+        else:
+            failures.append(video_path)
+            self.stdout.write(self.style.ERROR(f"{label}: failed: {result['error']}"))
@@ -0,0 +1,246 @@
+from django.core.management.base import BaseCommand, CommandError
+import json
+import math
+import platform
+import statistics
+import subprocess
+import time
+import tracemalloc
+import django
+from django.core.cache import caches
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from attendance.models import Class, ClassStudentSummary, Enrollment, Student, StudentData
+from attendance.response_cache import RESPONSE_CACHE_ALIAS
+
+DETAIL_ENDPOINTS = ('students-detail-status', 'class-detail-status')
+ENDPOINTS = ('attendance-status', 'emotions-status', 'student-overall-status') + DETAIL_ENDPOINTS
+
+
+def get_scenarios(endpoints=ENDPOINTS):
+    """
+    Requests to measure: every endpoint as is, plus the query parameters of
+    the detail endpoints
+
+    Returns:
+        list: (name, url name, query params) tuples
+    """
+    first_class = Class.objects.order_by('ClassID').values_list('ClassID', flat=True).first()
+    first_day = Class.objects.filter(held_at__isnull=False).order_by('held_at').values_list('held_at', flat=True).first()
+
+    detail_params = [
+        {'depth': '0'},
+        {'page_size': '100'},
+        {'stream': 'ndjson'},
+    ]
+    if first_class is not None:
+        detail_params.append({'classID': str(first_class)})
+    if first_day is not None:
+        detail_params.append({'from': first_day.date().isoformat(), 'to': first_day.date().isoformat()})
+
+    scenarios = []
+    for endpoint in endpoints:
+        scenarios.append((endpoint, endpoint, {}))
+        if endpoint in DETAIL_ENDPOINTS:
+            for params in detail_params:
+                query = '&'.join(f'{key}={value}' for key, value in params.items())
+                scenarios.append((f'{endpoint}?{query}', endpoint, params))
+    return scenarios
+
+
+def summarize(samples):
+    """Min, median, 95th percentile and mean of latency samples in milliseconds"""
+    ordered = sorted(samples)
+    p95 = ordered[max(math.ceil(len(ordered) * 0.95) - 1, 0)]
+    return {
+        'min': round(ordered[0], 3),
+        'median': round(statistics.median(ordered), 3),
+        'p95': round(p95, 3),
+        'mean': round(statistics.fmean(ordered), 3),
+    }
+
+
+def get_commit():
+    """Commit the benchmark runs on, if the code is in a git checkout"""
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    """
+    Django management command to benchmark the attendance API endpoints
+
+    Each endpoint, and each query parameter variant of the detail endpoints,
+    is requested through the Django test client against the configured
+    database:
+
+    - cold: the response cache is cleared before every request, so the
+      views run their queries each time
+    - warm: the response is served from the response cache
+    - queries, peak memory (tracemalloc) and response size of one cold request
+
+    Streamed responses are consumed completely. Results are written as JSON
+    and can be compared with the output of an earlier run, e.g. of the
+    previous commit on the same data. Fill a scratch database with
+    generate_synthetic_data first.
+
+    Usage:
+        python manage.py benchmark_api [--endpoints NAME [NAME ...]] [--repeat N]
+                                       [--output FILE] [--compare BASELINE]
+
+    Example:
+        python manage.py benchmark_api --repeat 10 --output bench.json --compare bench_main.json
+    """
+
+    help = 'Measure latency, query count and peak memory of the API endpoints (JSON output)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--endpoints',
+            nargs='+',
+            choices=ENDPOINTS,
+            default=list(ENDPOINTS),
+            help='Endpoints to measure (default: all)'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=5,
+            help='Timed requests per scenario, cold and warm each (default: 5)'
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Write the results to this JSON file instead of stdout'
+        )
+        parser.add_argument(
+            '--compare',
+            type=str,
+            help='JSON results of an earlier run to compare with'
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1')
+
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as f:
+                    baseline = {result['name']: result for result in json.load(f)['results']}
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                raise CommandError(f'Cannot read baseline {options["compare"]}: {e}')
+
+        self.client = Client(HTTP_HOST='localhost')
+        self.cache = caches[RESPONSE_CACHE_ALIAS]
+
+        results = []
+        for name, endpoint, params in get_scenarios(options['endpoints']):
+            result = self.measure(name, reverse(f'attendance:{endpoint}'), params, options['repeat'])
+            results.append(result)
+            if options['verbosity'] > 1:
+                self.stderr.write(
+                    f"{name}: {result['coldMs']['median']:.1f} ms cold, "
+                    f"{result['warmMs']['median']:.1f} ms warm, {result['queries']} queries"
+                )
+
+        report = {'meta': self.get_meta(options['repeat']), 'results': results}
+        content = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(content + '\n')
+        else:
+            self.stdout.write(content)
+
+        if baseline is not None:
+            self.print_comparison(baseline, results)
+
+    def request(self, url, params):
+        """One GET, consuming streamed content; returns (status code, bytes)"""
+        response = self.client.get(url, params)
+        if response.streaming:
+            size = sum(len(chunk) for chunk in response.streaming_content)
+        else:
+            size = len(response.content)
+        return response.status_code, size
+
+    def measure(self, name, url, params, repeat):
+        """Measure one scenario"""
+        self.cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            tracemalloc.start()
+            try:
+                status_code, size = self.request(url, params)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+        # Captured queries are read from the connection's log, which later
+        # requests reset
+        query_count = len(queries)
+
+        cold = []
+        for _ in range(repeat):
+            self.cache.clear()
+            start = time.perf_counter()
+            self.request(url, params)
+            cold.append((time.perf_counter() - start) * 1000)
+
+        # Prime the cache once, then time cache hits
+        self.request(url, params)
+        warm = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            self.request(url, params)
+            warm.append((time.perf_counter() - start) * 1000)
+
+        return {
+            'name': name,
+            'status': status_code,
+            'bytes': size,
+            'queries': query_count,
+            'peakMemoryKiB': round(peak / 1024, 1),
+            'coldMs': summarize(cold),
+            'warmMs': summarize(warm),
+        }
+
+    def get_meta(self, repeat):
+        """Where and on what data the benchmark ran"""
+        return {
+            'timestamp': timezone.now().isoformat(),
+            'commit': get_commit(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'repeat': repeat,
+            'rows': {
+                'student_data': StudentData.objects.count(),
+                'class_student_summary': ClassStudentSummary.objects.count(),
+                'student': Student.objects.count(),
+                'class': Class.objects.count(),
+                'enrollment': Enrollment.objects.count(),
+            },
+        }
+
+    def print_comparison(self, baseline, results):
+        """Median cold latency, queries and peak memory against the baseline"""
+        self.stderr.write(f'{"scenario":<60} {"cold ms":>18} {"queries":>9} {"peak KiB":>20}')
+        for result in results:
+            before = baseline.get(result['name'])
+            if before is None:
+                self.stderr.write(f'{result["name"]:<60} {"(new)":>18}')
+                continue
+            old_ms, new_ms = before['coldMs']['median'], result['coldMs']['median']
+            change = (new_ms - old_ms) / old_ms * 100 if old_ms else 0.0
+            self.stderr.write(
+                f'{result["name"]:<60} {old_ms:>7.1f} -> {new_ms:>7.1f} {change:+5.0f}% '
+                f'{before["queries"]:>3} -> {result["queries"]:<3} '
+                f'{before["peakMemoryKiB"]:>8.0f} -> {result["peakMemoryKiB"]:<8.0f}'
+            )
@@ -0,0 +1,154 @@
+from django.core.management.base import BaseCommand, CommandError
+import copy
+import json
+import time
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.utils import load_backend
+from django.utils import timezone
+from .benchmark_api import get_commit, summarize
+
+MODES = ('connect', 'persistent', 'pool')
+
+
+def pool_supported():
+    """Whether Django's connection pool can be used: it needs psycopg 3 and psycopg_pool"""
+    try:
+        import psycopg  # noqa: F401
+        import psycopg_pool  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+class Command(BaseCommand):
+    """
+    Django management command to measure the database connection cost of a
+    request
+
+    Each simulated request runs --queries trivial queries the way Django
+    handles connections around a request, with the configured database:
+
+    - connect: a new connection per request (CONN_MAX_AGE=0, the old
+      default), closed when the request ends
+    - persistent: one connection kept open (CONN_MAX_AGE > 0) and checked
+      with CONN_HEALTH_CHECKS at the start of every request
+    - pool: a connection checked out of a psycopg 3 pool (DB_POOL) per
+      request and returned at its end; needs psycopg[pool]
+
+    The difference to persistent is what connection setup costs every
+    request. Connections are made with their own settings, whatever
+    DB_POOL and DB_CONN_MAX_AGE are. Results are written as JSON.
+
+    Usage:
+        python manage.py benchmark_connections [--modes MODE [MODE ...]] [--requests N]
+                                               [--queries N] [--output FILE]
+
+    Example:
+        python manage.py benchmark_connections --requests 200 --output connections.json
+    """
+
+    help = 'Measure the per-request cost of new, persistent and pooled database connections (JSON output)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--modes',
+            nargs='+',
+            choices=MODES,
+            default=list(MODES),
+            help='Connection handling to measure (default: all)'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=100,
+            help='Simulated requests per mode (default: 100)'
+        )
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=4,
+            help='Queries per simulated request (default: 4, as a detail endpoint cache miss)'
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Write the results to this JSON file instead of stdout'
+        )
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests must be at least 1')
+        if options['queries'] < 1:
+            raise CommandError('--queries must be at least 1')
+        if 'pool' in options['modes'] and not pool_supported():
+            raise CommandError('The pool mode needs psycopg 3 and psycopg_pool: pip install "psycopg[binary,pool]"')
+
+        results = []
+        for mode in options['modes']:
+            samples = self.measure(mode, options['requests'], options['queries'])
+            results.append({'mode': mode, 'requestMs': summarize(samples)})
+            if options['verbosity'] > 1:
+                self.stderr.write(f'{mode}: {results[-1]["requestMs"]["median"]:.2f} ms per request')
+
+        persistent = next((result for result in results if result['mode'] == 'persistent'), None)
+        if persistent is not None:
+            for result in results:
+                result['overheadMs'] = round(result['requestMs']['median'] - persistent['requestMs']['median'], 3)
+
+        report = {'meta': self.get_meta(options), 'results': results}
+        content = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(content + '\n')
+        else:
+            self.stdout.write(content)
+
+    def get_wrapper(self, mode):
+        """A connection of its own for the mode, set up from the default database's settings"""
+        settings_dict = copy.deepcopy(connections.settings[DEFAULT_DB_ALIAS])
+        options = settings_dict['OPTIONS']
+        options.pop('pool', None)
+        settings_dict['CONN_MAX_AGE'] = 600 if mode == 'persistent' else 0
+        if mode == 'pool':
+            options['pool'] = {'min_size': 1, 'max_size': 1}
+        backend = load_backend(settings_dict['ENGINE'])
+        return backend.DatabaseWrapper(settings_dict, f'benchmark_{mode}')
+
+    def measure(self, mode, requests, queries):
+        """Duration of each simulated request in milliseconds"""
+        wrapper = self.get_wrapper(mode)
+        try:
+            # Open the persistent connection and fill the pool before timing
+            self.request(wrapper, queries)
+            samples = []
+            for _ in range(requests):
+                start = time.perf_counter()
+                self.request(wrapper, queries)
+                samples.append((time.perf_counter() - start) * 1000)
+            return samples
+        finally:
+            wrapper.close()
+            if mode == 'pool':
+                wrapper.close_pool()
+
+    def request(self, wrapper, queries):
+        """What Django does with a connection over one request"""
+        # request_started: drop unusable or expired connections, check on reuse
+        wrapper.close_if_unusable_or_obsolete()
+        for _ in range(queries):
+            with wrapper.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+        # request_finished: close (or return to the pool) unless persistent
+        wrapper.close_if_unusable_or_obsolete()
+
+    def get_meta(self, options):
+        settings_dict = connections.settings[DEFAULT_DB_ALIAS]
+        return {
+            'timestamp': timezone.now().isoformat(),
+            'commit': get_commit(),
+            'host': settings_dict['HOST'] or 'localhost',
+            'healthChecks': settings_dict['CONN_HEALTH_CHECKS'],
+            'requests': options['requests'],
+            'queries': options['queries'],
+        }
@@ -0,0 +1,108 @@
+from django.core.management.base import BaseCommand, CommandError
+import json
+import os
+import time
+from itertools import cycle, islice
+from attendance.face_index import DB_PATH, scan_gallery, get_face_index
+from attendance.face_analysis import FaceAnalyzer
+
+
+def analyze(analyzer, faces):
+    """Emotion analysis and identification of one batch, as add_class_data runs them"""
+    analyzer.get_emotions(faces)
+    analyzer.get_top_matches(faces)
+
+
+class Command(BaseCommand):
+    """
+    Django management command to measure face analysis throughput at
+    different batch sizes
+
+    Faces are taken from the student gallery, so no video is needed. Each
+    batch size runs emotion analysis and identification on the same faces
+    and reports faces per second.
+
+    Usage:
+        python manage.py benchmark_face_batching [--batch-sizes N [N ...]] [--faces FACES]
+                                                 [--db-path DB_PATH] [--allow-gpu] [--json]
+
+    Example:
+        python manage.py benchmark_face_batching --batch-sizes 1 8 32 --faces 256
+    """
+
+    help = 'Benchmark batched emotion and identity inference (faces/second per batch size)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-sizes',
+            type=int,
+            nargs='+',
+            default=[1, 4, 8, 16, 32, 64],
+            help='Batch sizes to measure (default: 1 4 8 16 32 64)'
+        )
+        parser.add_argument(
+            '--faces',
+            type=int,
+            default=256,
+            help='Faces analyzed per batch size (default: 256)'
+        )
+        parser.add_argument(
+            '--db-path',
+            type=str,
+            default=DB_PATH,
+            help=f'Gallery directory the faces are read from (default: {DB_PATH})'
+        )
+        parser.add_argument(
+            '--allow-gpu',
+            action='store_true',
+            help='Let TensorFlow use a GPU instead of forcing CPU inference'
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print results as JSON'
+        )
+
+    def handle(self, *args, **options):
+        if not options['allow_gpu']:
+            # Must be set before TensorFlow is imported by DeepFace
+            os.environ['CUDA_VISIBLE_DEVICES'] = '-1'
+
+        import cv2
+
+        db_path = options['db_path']
+        if not os.path.isdir(db_path):
+            raise CommandError(f'Gallery directory not found: {db_path}')
+
+        images = [cv2.imread(os.path.join(db_path, path)) for path in scan_gallery(db_path)]
+        images = [image for image in images if image is not None]
+        if not images:
+            raise CommandError(f'No face images found in {db_path}')
+        faces = list(islice(cycle(images), options['faces']))
+
+        analyzer = FaceAnalyzer(get_face_index(db_path))
+
+        # Load the models before timing anything
+        analyze(analyzer, faces[:1])
+
+        results = []
+        for batch_size in options['batch_sizes']:
+            start = time.perf_counter()
+            for offset in range(0, len(faces), batch_size):
+                analyze(analyzer, faces[offset:offset + batch_size])
+            elapsed = time.perf_counter() - start
+
+            results.append({
+                'batchSize': batch_size,
+                'faces': len(faces),
+                'seconds': round(elapsed, 3),
+                'facesPerSecond': round(len(faces) / elapsed, 2),
+            })
+            if not options['json']:
+                self.stdout.write(
+                    f'batch size {batch_size:>4}: {results[-1]["facesPerSecond"]:>8.2f} faces/s '
+                    f'({elapsed:.2f}s for {len(faces)} faces)'
+                )
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
@@ -0,0 +1,201 @@
+from django.core.management.base import BaseCommand, CommandError, OutputWrapper
+from django.db import transaction
+import json
+import os
+import sys
+import tempfile
+import time
+from attendance.face_analysis import FaceAnalyzer
+from attendance.face_index import get_face_index
+from attendance.ingestion_benchmark import (
+    StageTimer,
+    StubDetector,
+    StubFaceAnalyzer,
+    make_gallery,
+    make_video,
+    stub_embedding,
+)
+from attendance.management.commands.add_class_data import Command as AddClassDataCommand
+from attendance.management.commands.add_class_data import add_processing_arguments
+
+
+class Command(BaseCommand):
+    """
+    Django management command to benchmark add_class_data's stages offline
+
+    By default a synthetic video and a matching face gallery are generated,
+    and YOLO and DeepFace are replaced by stubs, so no footage, model
+    download or network is needed. --real-models loads the real models
+    instead; give --video and --gallery with real faces for meaningful
+    numbers. The video goes through add_class_data's own pipeline and write
+    path, with every stage timed:
+
+    - read: decoding and sampling frames (get_frames)
+    - detect: face detection and tracking (get_boxes)
+    - emotion: batched emotion analysis (get_emotions)
+    - identify: batched embedding and gallery search (get_top_matches)
+    - resolve: picking a student per track
+    - write: database writes (write_frames)
+
+    Stages run concurrently, so their times can add up to more than the
+    wall clock time. Rows are written in a transaction that is rolled back
+    unless --keep-rows is given.
+
+    Usage:
+        python manage.py benchmark_ingestion [--video PATH] [--gallery PATH] [--frames N] [--faces N]
+                                             [--real-models] [--class-id CLASS_ID] [--keep-rows] [--json]
+                                             [add_class_data options]
+
+    Example:
+        python manage.py benchmark_ingestion --frames 500 --faces 9 --frame-interval 5 --analysis-workers 2
+    """
+
+    help = 'Benchmark the video ingestion stages offline (frames/s, faces/s, time per stage)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--video',
+            type=str,
+            help='Video to process (default: a generated synthetic video)'
+        )
+        parser.add_argument(
+            '--gallery',
+            type=str,
+            help='Face gallery directory (default: a generated gallery of the synthetic faces)'
+        )
+        parser.add_argument(
+            '--frames',
+            type=int,
+            default=300,
+            help='Length of the synthetic video in frames (default: 300)'
+        )
+        parser.add_argument(
+            '--faces',
+            type=int,
+            default=4,
+            help='Faces in the synthetic video (default: 4)'
+        )
+        parser.add_argument(
+            '--real-models',
+            action='store_true',
+            help='Use YOLO and DeepFace instead of the stubs'
+        )
+        parser.add_argument(
+            '--class-id',
+            type=int,
+            default=900000,
+            help='Class ID the benchmark rows are written under (default: 900000)'
+        )
+        parser.add_argument(
+            '--keep-rows',
+            action='store_true',
+            help='Commit the written rows instead of rolling them back'
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print results as JSON'
+        )
+        add_processing_arguments(parser)
+        # The synthetic video is short, so sample it densely by default, and
+        # leave no checkpoint files behind
+        parser.set_defaults(frame_interval=5, checkpoint_interval=0)
+
+    def handle(self, *args, **options):
+        with tempfile.TemporaryDirectory() as tmp, open(os.devnull, 'w') as devnull:
+            video_path = options['video']
+            if video_path is None:
+                video_path = make_video(os.path.join(tmp, 'synthetic.avi'), options['frames'], options['faces'])
+            elif not os.path.exists(video_path):
+                raise CommandError(f'Video file not found: {video_path}')
+
+            gallery = options['gallery']
+            if gallery is None:
+                gallery = make_gallery(os.path.join(tmp, 'gallery'), options['faces'])
+            elif not os.path.isdir(gallery):
+                raise CommandError(f'Gallery directory not found: {gallery}')
+
+            command, timer, faces = self.get_command(gallery, os.path.join(tmp, 'index'), devnull, options)
+
+            start = time.perf_counter()
+            with transaction.atomic():
+                inserted, skipped = command.process_video(video_path, options['class_id'], options)
+                if not options['keep_rows']:
+                    transaction.set_rollback(True)
+            elapsed = time.perf_counter() - start
+
+        stages = timer.report()
+        frames = stages.get('detect', {}).get('calls', 0)
+        results = {
+            'video': options['video'] or f'synthetic ({options["frames"]} frames, {options["faces"]} faces)',
+            'models': 'real' if options['real_models'] else 'stub',
+            'frameInterval': options['frame_interval'],
+            'seconds': round(elapsed, 3),
+            'frames': frames,
+            'faces': faces['count'],
+            'rowsInserted': inserted,
+            'rowsSkipped': skipped,
+            'framesPerSecond': round(frames / elapsed, 2),
+            'facesPerSecond': round(faces['count'] / elapsed, 2),
+            'recognition': command.recognition.stats(),
+            'stages': stages,
+        }
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(
+            f"{results['frames']} frames, {results['faces']} faces in {elapsed:.2f}s: "
+            f"{results['framesPerSecond']:.1f} frames/s, {results['facesPerSecond']:.1f} faces/s"
+        )
+        recognition = results['recognition']
+        self.stdout.write(
+            f"  {recognition['recognized']} of {recognition['faces']} faces identified, "
+            f"{recognition['skipped']} reused their track's matches"
+        )
+        for stage, stage_time in stages.items():
+            self.stdout.write(
+                f"  {stage:<9} {stage_time['seconds']:>8.3f}s {stage_time['seconds'] / elapsed * 100:>6.1f}% "
+                f"({stage_time['calls']} calls)"
+            )
+
+    def get_command(self, gallery, index_path, devnull, options):
+        """
+        add_class_data command with its models loaded and its stages timed
+
+        Its progress output goes to devnull unless --verbosity is above 1.
+
+        Returns:
+            tuple: (command, StageTimer, {'count': faces detected so far})
+        """
+        stdout = OutputWrapper(sys.stdout if options['verbosity'] > 1 else devnull)
+        command = AddClassDataCommand(stdout=stdout, stderr=OutputWrapper(sys.stderr), no_color=True)
+
+        if options['real_models']:
+            command.track_model = command.get_track_model()
+            command.face_index = get_face_index(gallery, index_path)
+            command.face_analyzer = FaceAnalyzer(command.face_index)
+        else:
+            detector = StubDetector()
+            command.face_index = get_face_index(gallery, index_path, embed=stub_embedding)
+            command.face_analyzer = StubFaceAnalyzer(command.face_index)
+            command.get_boxes = detector
+            command.reset_tracker = detector.reset
+
+        timer = StageTimer()
+        faces = {'count': 0}
+        get_boxes = command.get_boxes
+
+        def count_boxes(frame):
+            boxes = list(get_boxes(frame))
+            faces['count'] += len(boxes)
+            return boxes
+
+        command.get_frames = timer.wrap_generator_function('read', command.get_frames)
+        command.get_boxes = timer.wrap('detect', count_boxes)
+        command.get_emotions = timer.wrap('emotion', command.get_emotions)
+        command.get_top_matches = timer.wrap('identify', command.get_top_matches)
+        command.get_track_id_student_mapping = timer.wrap('resolve', command.get_track_id_student_mapping)
+        command.write_frames = timer.wrap_generator_function('write', command.write_frames)
+        return command, timer, faces
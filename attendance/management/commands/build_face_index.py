@@ -0,0 +1,62 @@
+from django.core.management.base import BaseCommand, CommandError
+import os
+from attendance.face_index import DB_PATH, INDEX_PATH, FaceIndex
+
+
+class Command(BaseCommand):
+    """
+    Django management command to build the ArcFace embedding index of the
+    student face gallery
+
+    Usage:
+        python manage.py build_face_index [--db-path DB_PATH] [--index-path INDEX_PATH] [--force]
+
+    Example:
+        python manage.py build_face_index --force
+    """
+
+    help = 'Embed the student face gallery into an on-disk index used for face matching'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--db-path',
+            type=str,
+            default=DB_PATH,
+            help=f'Gallery directory with one folder of face images per student (default: {DB_PATH})'
+        )
+        parser.add_argument(
+            '--index-path',
+            type=str,
+            default=INDEX_PATH,
+            help=f'Directory to write the index to (default: {INDEX_PATH})'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Embed every image again instead of reusing unchanged ones'
+        )
+
+    def handle(self, *args, **options):
+        db_path = options['db_path']
+        index_path = options['index_path']
+
+        if not os.path.isdir(db_path):
+            raise CommandError(f'Gallery directory not found: {db_path}')
+
+        previous = None
+        if not options['force']:
+            try:
+                previous = FaceIndex.load(index_path)
+            except FileNotFoundError:
+                pass
+
+        if previous is not None and not previous.is_stale(db_path):
+            self.stdout.write(self.style.SUCCESS(f'Index is up to date ({len(previous)} images)'))
+            return
+
+        index, embedded, reused = FaceIndex.build(db_path, index_path, previous=previous)
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Indexed {len(index)} images of {len(set(index.labels))} students '
+            f'({embedded} embedded, {reused} reused)'
+        ))
@@ -0,0 +1,133 @@
+from django.core.management.base import BaseCommand, CommandError
+import hashlib
+import json
+import os
+import time
+import cv2
+import numpy as np
+from attendance.sampling import SAMPLING_MODES, get_frames, interval_from_seconds
+
+# Size frames are shrunk to for the pixel difference report
+THUMBNAIL_SIZE = (64, 36)
+
+
+class Command(BaseCommand):
+    """
+    Django management command to compare the speed and accuracy of the frame
+    sampling modes against the exhaustive reader
+
+    Every mode samples the same video at the same interval. Each sampled frame
+    is compared with the frame the exhaustive reader returns at the same
+    position: exact matches are counted and the mean absolute pixel
+    difference is reported for the rest.
+
+    Usage:
+        python manage.py compare_frame_sampling <video_path> [--frame-interval N | --every-seconds S]
+                                                [--modes MODE [MODE ...]] [--json]
+
+    Example:
+        python manage.py compare_frame_sampling /path/to/video.mp4 --every-seconds 5
+    """
+
+    help = 'Report speed and accuracy of each frame sampling mode against reading every frame'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'video_path',
+            type=str,
+            help='Path to the video file to sample'
+        )
+        parser.add_argument(
+            '--frame-interval',
+            type=int,
+            default=500,
+            help='Sample every Nth frame (default: 500)'
+        )
+        parser.add_argument(
+            '--every-seconds',
+            type=float,
+            default=None,
+            help='Sample one frame every SECONDS of video; overrides --frame-interval'
+        )
+        parser.add_argument(
+            '--modes',
+            nargs='+',
+            choices=SAMPLING_MODES,
+            default=list(SAMPLING_MODES),
+            help='Sampling modes to compare (default: all)'
+        )
+        parser.add_argument(
+            '--json',
+            action='store_true',
+            help='Print results as JSON'
+        )
+
+    def handle(self, *args, **options):
+        video_path = options['video_path']
+        if not os.path.exists(video_path):
+            raise CommandError(f'Video file not found: {video_path}')
+
+        frame_interval = options['frame_interval']
+        if options['every_seconds'] is not None:
+            try:
+                frame_interval = interval_from_seconds(video_path, options['every_seconds'])
+            except ValueError as e:
+                raise CommandError(str(e))
+
+        reference, reference_seconds = self.sample(video_path, frame_interval, 'read')
+
+        results = []
+        for mode in options['modes']:
+            if mode == 'read':
+                frames, seconds = reference, reference_seconds
+            else:
+                frames, seconds = self.sample(video_path, frame_interval, mode)
+
+            exact = 0
+            differences = []
+            for (digest, thumbnail), (reference_digest, reference_thumbnail) in zip(frames, reference):
+                if digest == reference_digest:
+                    exact += 1
+                else:
+                    differences.append(float(np.abs(thumbnail - reference_thumbnail).mean()))
+
+            results.append({
+                'mode': mode,
+                'frameInterval': frame_interval,
+                'frames': len(frames),
+                'referenceFrames': len(reference),
+                'exactMatches': exact,
+                'meanPixelDifference': round(sum(differences) / len(differences), 3) if differences else 0.0,
+                'seconds': round(seconds, 3),
+                'speedup': round(reference_seconds / seconds, 2) if seconds > 0 else None,
+            })
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(f'Frame interval: {frame_interval}')
+        for result in results:
+            self.stdout.write(
+                f"{result['mode']:>5}: {result['frames']} frames in {result['seconds']:.2f}s "
+                f"({result['speedup']}x), {result['exactMatches']}/{result['referenceFrames']} exact, "
+                f"mean pixel difference {result['meanPixelDifference']}"
+            )
+
+    def sample(self, video_path, frame_interval, mode):
+        """
+        Sample a video, keeping a digest and a thumbnail of each frame
+
+        Returns:
+            tuple: (list of (digest, thumbnail), seconds spent sampling)
+        """
+        frames = []
+        sampling_seconds = 0.0
+        start = time.perf_counter()
+        for frame in get_frames(video_path, frame_interval, mode):
+            sampling_seconds += time.perf_counter() - start
+            thumbnail = cv2.resize(frame, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA).astype(np.float32)
+            frames.append((hashlib.sha1(frame.tobytes()).hexdigest(), thumbnail))
+            start = time.perf_counter()
+        sampling_seconds += time.perf_counter() - start
+        return frames, sampling_seconds
@@ -0,0 +1,119 @@
+from django.core.management.base import BaseCommand, CommandError
+import time
+from attendance.synthetic import DEFAULT_PROFILE, EMOTION_PROFILES, generate
+
+
+class Command(BaseCommand):
+    """
+    Django management command to fill the database with synthetic frame data
+
+    Meant for benchmarks and load tests on a scratch database. Rows are
+    written through the same batched path as add_class_data, so the rollup,
+    the dimension tables and the rosters are consistent with them. The same
+    arguments and seed always produce the same data, and running the command
+    again skips the frames that already exist.
+
+    Usage:
+        python manage.py generate_synthetic_data [--classes N] [--students N] [--frames N]
+                                                 [--attendance P] [--presence P]
+                                                 [--profile {classroom,uniform}] [--first-class-id ID]
+                                                 [--no-roster] [--seed SEED] [--batch-size N]
+
+    Example:
+        python manage.py generate_synthetic_data --classes 300 --students 50 --frames 200
+    """
+
+    help = 'Generate synthetic classes, students, rosters and frames at a configurable scale'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--classes',
+            type=int,
+            default=50,
+            help='Number of classes, one per day (default: 50)'
+        )
+        parser.add_argument(
+            '--students',
+            type=int,
+            default=40,
+            help='Students enrolled in every class (default: 40)'
+        )
+        parser.add_argument(
+            '--frames',
+            type=int,
+            default=100,
+            help='Sampled frames per class (default: 100)'
+        )
+        parser.add_argument(
+            '--attendance',
+            type=float,
+            default=0.9,
+            help='Probability that a student attends a class (default: 0.9)'
+        )
+        parser.add_argument(
+            '--presence',
+            type=float,
+            default=0.8,
+            help='Probability that an attending student is recognized in a frame (default: 0.8)'
+        )
+        parser.add_argument(
+            '--profile',
+            choices=sorted(EMOTION_PROFILES),
+            default=DEFAULT_PROFILE,
+            help=f'Emotion distribution the students\' moods are drawn around (default: {DEFAULT_PROFILE})'
+        )
+        parser.add_argument(
+            '--first-class-id',
+            type=int,
+            default=1,
+            help='ID of the first generated class (default: 1)'
+        )
+        parser.add_argument(
+            '--no-roster',
+            action='store_true',
+            help='Do not enroll the students in the generated classes'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed (default: 0)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Rows written per database batch (default: 5000)'
+        )
+
+    def handle(self, *args, **options):
+        for name in ('attendance', 'presence'):
+            if not 0 <= options[name] <= 1:
+                raise CommandError(f'--{name} must be between 0 and 1')
+        if min(options['classes'], options['students'], options['frames']) < 1:
+            raise CommandError('--classes, --students and --frames must be at least 1')
+
+        def report_class(class_id, inserted, skipped):
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Class {class_id}: inserted {inserted}, skipped {skipped}')
+
+        start = time.perf_counter()
+        inserted, skipped = generate(
+            classes=options['classes'],
+            students=options['students'],
+            frames=options['frames'],
+            attendance=options['attendance'],
+            presence=options['presence'],
+            profile=options['profile'],
+            first_class_id=options['first_class_id'],
+            roster=not options['no_roster'],
+            seed=options['seed'],
+            batch_size=options['batch_size'],
+            on_class=report_class,
+        )
+        elapsed = time.perf_counter() - start
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated {options["classes"]} classes: inserted {inserted} rows, skipped {skipped} '
+            f'in {elapsed:.1f}s ({inserted / max(elapsed, 1e-9):.0f} rows/s)'
+        ))
@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand, CommandError
+import csv
+from attendance.rosters import save_roster
+
+
+def load_roster(roster_path):
+    """
+    Read a class roster CSV with class_id and student_id columns and an
+    optional name column holding the student's name
+
+    Returns:
+        list: (class_id, student_id, name) tuples in file order
+
+    Raises:
+        CommandError: If the roster cannot be read
+    """
+    try:
+        with open(roster_path, newline='') as f:
+            return [
+                (int(row['class_id']), row['student_id'].strip(), (row.get('name') or '').strip())
+                for row in csv.DictReader(f)
+            ]
+    except (OSError, ValueError, KeyError, AttributeError) as e:
+        raise CommandError(f'Cannot read roster {roster_path}: {e}')
+
+
+class Command(BaseCommand):
+    """
+    Django management command to load class rosters
+
+    Attendance of a class with a roster is measured against its enrolled
+    students, so students who never showed up count as absent.
+
+    Usage:
+        python manage.py load_roster <roster.csv> [--replace]
+
+    Example:
+        python manage.py load_roster term_3.csv --replace
+
+    Roster example (CSV):
+        class_id,student_id,name
+        101,STU001,Sara Ahmadi
+        101,STU002,
+    """
+
+    help = 'Load class rosters (class_id,student_id[,name]) from a CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'roster',
+            type=str,
+            help='CSV file with class_id, student_id and optional name columns'
+        )
+        parser.add_argument(
+            '--replace',
+            action='store_true',
+            help='Unenroll students of the listed classes who are not in the file'
+        )
+
+    def handle(self, *args, **options):
+        entries = load_roster(options['roster'])
+        if not entries:
+            raise CommandError(f'No enrollments listed in {options["roster"]}')
+
+        added, removed = save_roster(entries, replace=options['replace'])
+        classes = len({class_id for class_id, _, _ in entries})
+        self.stdout.write(self.style.SUCCESS(
+            f'Loaded rosters of {classes} classes: {added} enrollments added, {removed} removed'
+        ))
@@ -0,0 +1,272 @@
+from django.core.management.base import BaseCommand, CommandError
+import http.client
+import itertools
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+from django.urls import reverse
+from django.utils import timezone
+from .benchmark_api import ENDPOINTS, get_commit, summarize
+
+CONNECTION_ERRORS = (OSError, http.client.HTTPException)
+
+
+class Command(BaseCommand):
+    """
+    Django management command to load test a running deployment of the API
+
+    Unlike benchmark_api, which calls the views in process one request at a
+    time, this sends concurrent HTTP requests to a server, so it measures
+    what the server does under load: e.g. gunicorn's sync workers (WSGI)
+    against uvicorn workers serving the async views (ASGI).
+
+    Each of --concurrency threads keeps one connection open and requests
+    the endpoints in turn until --requests were sent or --duration seconds
+    passed. --no-cache adds a distinct dummy query parameter to every
+    request, so none is served from the response cache. Throughput, error
+    counts and latency percentiles per endpoint are written as JSON and can
+    be compared with another run, e.g. of the other deployment on the same
+    data.
+
+    Usage:
+        python manage.py load_test [--url URL] [--endpoints NAME [NAME ...]] [--async-routes]
+                                   [--concurrency N] [--duration SECONDS | --requests N]
+                                   [--no-cache] [--label LABEL] [--output FILE] [--compare BASELINE]
+
+    Example:
+        python manage.py load_test --url http://localhost:8000 --concurrency 32 --no-cache --label wsgi --output wsgi.json
+        python manage.py load_test --url http://localhost:8001 --concurrency 32 --no-cache --label asgi --compare wsgi.json
+    """
+
+    help = 'Send concurrent requests to a running API server and report throughput and latency (JSON output)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url',
+            type=str,
+            default='http://localhost:8000',
+            help='Base URL of the server (default: http://localhost:8000)'
+        )
+        parser.add_argument(
+            '--endpoints',
+            nargs='+',
+            choices=ENDPOINTS,
+            default=list(ENDPOINTS),
+            help='Endpoints to request (default: all)'
+        )
+        parser.add_argument(
+            '--async-routes',
+            action='store_true',
+            help='Request the async/ routes of the endpoints'
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=16,
+            help='Concurrent connections (default: 16)'
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=10.0,
+            help='Seconds to send requests for (default: 10)'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            help='Send this many requests instead of running for --duration'
+        )
+        parser.add_argument(
+            '--no-cache',
+            action='store_true',
+            help='Bypass the response cache with a distinct query parameter per request'
+        )
+        parser.add_argument(
+            '--label',
+            type=str,
+            help='Name of the deployment under test, stored with the results'
+        )
+        parser.add_argument(
+            '--output',
+            type=str,
+            help='Write the results to this JSON file instead of stdout'
+        )
+        parser.add_argument(
+            '--compare',
+            type=str,
+            help='JSON results of an earlier run to compare with'
+        )
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency must be at least 1')
+        if options['requests'] is not None and options['requests'] < 1:
+            raise CommandError('--requests must be at least 1')
+        if options['requests'] is None and options['duration'] <= 0:
+            raise CommandError('--duration must be positive')
+
+        url = urlsplit(options['url'])
+        if url.scheme not in ('http', 'https') or not url.hostname:
+            raise CommandError(f'Invalid --url: {options["url"]}')
+
+        baseline = None
+        if options['compare']:
+            try:
+                with open(options['compare']) as f:
+                    baseline = json.load(f)
+                    baseline_results = {result['endpoint']: result for result in baseline['results']}
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                raise CommandError(f'Cannot read baseline {options["compare"]}: {e}')
+
+        prefix = 'async-' if options['async_routes'] else ''
+        self.url = url
+        self.base_path = url.path.rstrip('/')
+        self.paths = [
+            (endpoint, self.base_path + reverse(f'attendance:{prefix}{endpoint}'))
+            for endpoint in options['endpoints']
+        ]
+        self.no_cache = options['no_cache']
+        self.sequence = itertools.count()
+        self.samples = {endpoint: [] for endpoint in options['endpoints']}
+        self.errors = {endpoint: 0 for endpoint in options['endpoints']}
+        self.lock = threading.Lock()
+
+        self.warm_up()
+
+        limit = options['requests']
+        deadline = None if limit is not None else time.perf_counter() + options['duration']
+        start = time.perf_counter()
+        workers = [
+            threading.Thread(target=self.run_worker, args=(limit, deadline))
+            for _ in range(options['concurrency'])
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+
+        report = {'meta': self.get_meta(options, elapsed), 'results': self.get_results(elapsed)}
+        content = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(content + '\n')
+        else:
+            self.stdout.write(content)
+
+        if baseline is not None:
+            self.print_comparison(baseline['meta'].get('label'), baseline_results, report)
+
+    def connect(self):
+        connection_class = http.client.HTTPSConnection if self.url.scheme == 'https' else http.client.HTTPConnection
+        return connection_class(self.url.hostname, self.url.port, timeout=60)
+
+    def send(self, connection, path):
+        """
+        One GET, reading the whole body
+
+        Returns:
+            tuple: (whether it succeeded, the connection to use next)
+        """
+        try:
+            connection.request('GET', path)
+            response = connection.getresponse()
+            response.read()
+            return response.status == 200, connection
+        except CONNECTION_ERRORS:
+            connection.close()
+            return False, self.connect()
+
+    def warm_up(self):
+        """
+        One untimed request per endpoint, so the timed ones do not pay for
+        the server's imports and first connections
+
+        Raises:
+            CommandError: If the server cannot be reached
+        """
+        connection = self.connect()
+        try:
+            for endpoint, path in self.paths:
+                ok, connection = self.send(connection, path)
+                if not ok:
+                    raise CommandError(f'GET {self.url.scheme}://{self.url.netloc}{path} failed')
+        finally:
+            connection.close()
+
+    def run_worker(self, limit, deadline):
+        """Send requests over one connection until the limit or the deadline is reached"""
+        connection = self.connect()
+        try:
+            while True:
+                number = next(self.sequence)
+                if limit is not None and number >= limit:
+                    return
+                if deadline is not None and time.perf_counter() >= deadline:
+                    return
+
+                endpoint, path = self.paths[number % len(self.paths)]
+                if self.no_cache:
+                    path = f'{path}?nocache={number}'
+                start = time.perf_counter()
+                ok, connection = self.send(connection, path)
+                milliseconds = (time.perf_counter() - start) * 1000
+
+                with self.lock:
+                    if ok:
+                        self.samples[endpoint].append(milliseconds)
+                    else:
+                        self.errors[endpoint] += 1
+        finally:
+            connection.close()
+
+    def get_results(self, elapsed):
+        """Throughput and latency per endpoint, then over all of them"""
+        results = []
+        for endpoint, samples in self.samples.items():
+            results.append(self.get_result(endpoint, samples, self.errors[endpoint], elapsed))
+        every_sample = [sample for samples in self.samples.values() for sample in samples]
+        results.append(self.get_result('all', every_sample, sum(self.errors.values()), elapsed))
+        return results
+
+    def get_result(self, endpoint, samples, errors, elapsed):
+        return {
+            'endpoint': endpoint,
+            'requests': len(samples),
+            'errors': errors,
+            'requestsPerSecond': round(len(samples) / elapsed, 1),
+            'latencyMs': summarize(samples) if samples else None,
+        }
+
+    def get_meta(self, options, elapsed):
+        """What was load tested, and how"""
+        return {
+            'timestamp': timezone.now().isoformat(),
+            'commit': get_commit(),
+            'label': options['label'],
+            'url': options['url'],
+            'asyncRoutes': options['async_routes'],
+            'concurrency': options['concurrency'],
+            'noCache': options['no_cache'],
+            'seconds': round(elapsed, 2),
+        }
+
+    def print_comparison(self, baseline_label, baseline, report):
+        """Throughput and median/p95 latency against the baseline"""
+        label = report['meta']['label'] or 'this run'
+        self.stderr.write(f'{baseline_label or "baseline"} -> {label}')
+        self.stderr.write(f'{"endpoint":<26} {"req/s":>20} {"median ms":>22} {"p95 ms":>22} {"errors":>12}')
+        for result in report['results']:
+            before = baseline.get(result['endpoint'])
+            if before is None or not before['latencyMs'] or not result['latencyMs']:
+                self.stderr.write(f'{result["endpoint"]:<26} {"(no comparable samples)":>20}')
+                continue
+            old_rps, new_rps = before['requestsPerSecond'], result['requestsPerSecond']
+            change = (new_rps - old_rps) / old_rps * 100 if old_rps else 0.0
+            self.stderr.write(
+                f'{result["endpoint"]:<26} {old_rps:>6.1f} -> {new_rps:>6.1f} {change:+4.0f}% '
+                f'{before["latencyMs"]["median"]:>9.1f} -> {result["latencyMs"]["median"]:<9.1f} '
+                f'{before["latencyMs"]["p95"]:>9.1f} -> {result["latencyMs"]["p95"]:<9.1f} '
+                f'{before["errors"]:>4} -> {result["errors"]:<4}'
+            )
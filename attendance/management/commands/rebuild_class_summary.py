@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand, CommandError
+from attendance import summary
+
+
+class Command(BaseCommand):
+    """
+    Django management command to rebuild the ClassStudentSummary rollup from
+    the raw student_data table and check it against that table
+
+    Usage:
+        python manage.py rebuild_class_summary [--check-only] [--batch-size BATCH_SIZE]
+
+    Example:
+        python manage.py rebuild_class_summary --check-only
+    """
+
+    help = 'Rebuild the per-class/per-student rollup from raw frame data and verify it'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check-only',
+            action='store_true',
+            help='Only compare the rollup with the raw table, do not rebuild it'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows per insert when rebuilding (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        if not options['check_only']:
+            rows = summary.rebuild(batch_size=options['batch_size'])
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt rollup with {rows} rows'))
+
+        mismatches = summary.verify()
+        for mismatch in mismatches:
+            self.stdout.write(self.style.WARNING(mismatch))
+
+        if mismatches:
+            raise CommandError(f'Rollup does not match raw data: {len(mismatches)} mismatches')
+
+        self.stdout.write(self.style.SUCCESS('Rollup matches raw data'))
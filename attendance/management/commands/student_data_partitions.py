@@ -0,0 +1,85 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError
+from attendance import partitions
+
+
+class Command(BaseCommand):
+    """
+    Django management command to list, create and detach the ClassID range
+    partitions of student_data (PostgreSQL only)
+
+    Usage:
+        python manage.py student_data_partitions list
+        python manage.py student_data_partitions create --from START --to END [--name NAME]
+        python manage.py student_data_partitions detach NAME
+
+    Example:
+        python manage.py student_data_partitions create --from 100 --to 200
+        python manage.py student_data_partitions detach student_data_c100_200
+    """
+
+    help = 'List, create or detach the ClassID range partitions of student_data'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'action',
+            choices=['list', 'create', 'detach'],
+            help='What to do'
+        )
+        parser.add_argument(
+            'partition',
+            nargs='?',
+            help='Partition to detach'
+        )
+        parser.add_argument(
+            '--from',
+            dest='start',
+            type=int,
+            help='First ClassID of the new partition (inclusive)'
+        )
+        parser.add_argument(
+            '--to',
+            dest='end',
+            type=int,
+            help='End of the ClassID range of the new partition (exclusive)'
+        )
+        parser.add_argument(
+            '--name',
+            type=str,
+            help='Name of the new partition (default: student_data_c<from>_<to>)'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            if options['action'] == 'list':
+                self.list_partitions()
+            elif options['action'] == 'create':
+                self.create_partition(options)
+            else:
+                self.detach_partition(options)
+        except (partitions.PartitionError, DatabaseError) as e:
+            raise CommandError(str(e))
+
+    def list_partitions(self):
+        for name, bounds, rows in partitions.list_partitions():
+            self.stdout.write(f'{name}: {bounds} (~{rows} rows)')
+
+    def create_partition(self, options):
+        if options['start'] is None or options['end'] is None:
+            raise CommandError('create needs --from and --to')
+
+        name, moved = partitions.create_partition(options['start'], options['end'], options['name'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Created {name} for ClassID {options["start"]} to {options["end"]} '
+            f'({moved} rows moved from {partitions.DEFAULT_PARTITION})'
+        ))
+
+    def detach_partition(self, options):
+        if not options['partition']:
+            raise CommandError('detach needs the name of the partition')
+
+        removed, unenrolled = partitions.detach_partition(options['partition'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Detached {options["partition"]}; it is now a standalone table '
+            f'({removed} rollup rows and {unenrolled} enrollments removed)'
+        ))
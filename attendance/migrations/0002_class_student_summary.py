@@ -0,0 +1,79 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:08
+
+from django.db import migrations, models
+
+
+def populate_summary(apps, schema_editor):
+    """Build the rollup from the frames already in student_data"""
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute("""
+            INSERT INTO class_student_summary ("ClassID", "studentID", frame_count, emotion_sums, updated_at)
+            SELECT counts."ClassID", counts."studentID", counts.frames,
+                   COALESCE(sums.emotion_sums, '{}'::jsonb), NOW()
+            FROM (
+                SELECT "ClassID", "studentID", COUNT(*) AS frames
+                FROM student_data
+                GROUP BY "ClassID", "studentID"
+            ) AS counts
+            LEFT JOIN (
+                SELECT "ClassID", "studentID", jsonb_object_agg(key, total) AS emotion_sums
+                FROM (
+                    SELECT sd."ClassID", sd."studentID", e.key,
+                           SUM((e.value)::double precision) AS total
+                    FROM student_data AS sd
+                    CROSS JOIN LATERAL jsonb_each(
+                        CASE WHEN jsonb_typeof(sd."Emotion") = 'object'
+                             THEN sd."Emotion" ELSE '{}'::jsonb END
+                    ) AS e(key, value)
+                    WHERE jsonb_typeof(e.value) = 'number'
+                    GROUP BY sd."ClassID", sd."studentID", e.key
+                ) AS per_key
+                GROUP BY "ClassID", "studentID"
+            ) AS sums
+            ON sums."ClassID" = counts."ClassID" AND sums."studentID" = counts."studentID"
+        """)
+        return
+
+    StudentData = apps.get_model('attendance', 'StudentData')
+    ClassStudentSummary = apps.get_model('attendance', 'ClassStudentSummary')
+    totals = {}
+    for class_id, student_id, emotions in StudentData.objects.values_list('ClassID', 'studentID', 'Emotion').iterator():
+        total = totals.setdefault((class_id, student_id), {'frame_count': 0, 'emotion_sums': {}})
+        total['frame_count'] += 1
+        if isinstance(emotions, dict):
+            for emotion, value in emotions.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    total['emotion_sums'][emotion] = total['emotion_sums'].get(emotion, 0) + float(value)
+    ClassStudentSummary.objects.bulk_create(
+        [ClassStudentSummary(ClassID=class_id, studentID=student_id, **total) for (class_id, student_id), total in totals.items()],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassStudentSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ClassID', models.IntegerField(verbose_name='Class ID')),
+                ('studentID', models.CharField(max_length=50, verbose_name='Student ID')),
+                ('frame_count', models.IntegerField(default=0, verbose_name='Frame Count')),
+                ('emotion_sums', models.JSONField(default=dict, verbose_name='Emotion Sums')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Class Student Summary',
+                'verbose_name_plural': 'Class Student Summaries',
+                'db_table': 'class_student_summary',
+                'indexes': [models.Index(fields=['studentID'], name='class_stude_student_c63628_idx')],
+                'constraints': [models.UniqueConstraint(fields=('ClassID', 'studentID'), name='class_student_summary_unique')],
+            },
+        ),
+        migrations.RunPython(populate_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,50 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:10
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+
+def remove_duplicate_frames(apps, schema_editor):
+    """
+    Drop duplicate (studentID, ClassID, FramID) rows, keeping the oldest one,
+    so the unique constraint can be created. The rollup is rebuilt if any row
+    had to go.
+    """
+    StudentData = apps.get_model('attendance', 'StudentData')
+    ClassStudentSummary = apps.get_model('attendance', 'ClassStudentSummary')
+
+    duplicates = (
+        StudentData.objects
+        .values('studentID', 'ClassID', 'FramID')
+        .annotate(keep_id=models.Min('id'), rows=models.Count('id'))
+        .filter(rows__gt=1)
+    )
+    removed = 0
+    for duplicate in list(duplicates):
+        deleted, _ = (
+            StudentData.objects
+            .filter(studentID=duplicate['studentID'], ClassID=duplicate['ClassID'], FramID=duplicate['FramID'])
+            .exclude(id=duplicate['keep_id'])
+            .delete()
+        )
+        removed += deleted
+
+    if removed:
+        ClassStudentSummary.objects.all().delete()
+        import_module('attendance.migrations.0002_class_student_summary').populate_summary(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0002_class_student_summary'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_frames, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='studentdata',
+            constraint=models.UniqueConstraint(fields=('studentID', 'ClassID', 'FramID'), name='student_data_unique_frame'),
+        ),
+    ]
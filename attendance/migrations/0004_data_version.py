@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:18
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def create_version_row(apps, schema_editor):
+    """Create the single data version row"""
+    DataVersion = apps.get_model('attendance', 'DataVersion')
+    DataVersion.objects.get_or_create(pk=1, defaults={'version': 0, 'updated_at': timezone.now()})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0003_student_data_unique_frame'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DataVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.BigIntegerField(default=0, verbose_name='Version')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Data Version',
+                'verbose_name_plural': 'Data Version',
+                'db_table': 'data_version',
+            },
+        ),
+        migrations.RunPython(create_version_row, migrations.RunPython.noop),
+    ]
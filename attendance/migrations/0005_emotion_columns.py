@@ -0,0 +1,197 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:26
+
+from django.db import migrations, models
+
+EMOTIONS = ('angry', 'disgust', 'fear', 'happy', 'sad', 'surprise', 'neutral')
+FRAME_JSON = '"Emotion"'
+SUMS_JSON = 'emotion_sums'
+
+
+def _number(column, emotion):
+    return (
+        f"CASE WHEN jsonb_typeof({column}->'{emotion}') = 'number' "
+        f"THEN ({column}->>'{emotion}')::double precision END"
+    )
+
+
+def _values(emotions):
+    values = []
+    for emotion in EMOTIONS:
+        value = emotions.get(emotion) if isinstance(emotions, dict) else None
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            value = None
+        values.append(None if value is None else float(value))
+    return values
+
+
+def _dominant(values):
+    dominant = None
+    for index, value in enumerate(values):
+        if value is not None and (dominant is None or value > values[dominant]):
+            dominant = index
+    return dominant
+
+
+def copy_emotions(apps, schema_editor):
+    """
+    Move the Emotion and emotion_sums JSON into the emotion columns
+
+    Emotions outside the fixed set and non-numeric scores are dropped, as the
+    JSON aggregation already ignored non-numeric ones.
+    """
+    if schema_editor.connection.vendor == 'postgresql':
+        frame_values = ', '.join(f'{_number(FRAME_JSON, emotion)} AS {emotion}' for emotion in EMOTIONS)
+        assignments = ', '.join(f'{emotion} = v.{emotion}' for emotion in EMOTIONS)
+        scores = ', '.join(f'v.{emotion}' for emotion in EMOTIONS)
+        schema_editor.execute(f"""
+            UPDATE student_data AS sd
+            SET {assignments},
+                dominant_emotion = (
+                    SELECT e.position - 1
+                    FROM unnest(ARRAY[{scores}]) WITH ORDINALITY AS e(value, position)
+                    WHERE e.value IS NOT NULL
+                    ORDER BY e.value DESC, e.position
+                    LIMIT 1
+                )
+            FROM (SELECT id, {frame_values} FROM student_data) AS v
+            WHERE v.id = sd.id
+        """)
+        sum_assignments = ', '.join(f'{emotion}_sum = {_number(SUMS_JSON, emotion)}' for emotion in EMOTIONS)
+        schema_editor.execute(f"UPDATE class_student_summary SET {sum_assignments}")
+        return
+
+    StudentData = apps.get_model('attendance', 'StudentData')
+    ClassStudentSummary = apps.get_model('attendance', 'ClassStudentSummary')
+    frames = []
+    for frame in StudentData.objects.only('id', 'Emotion').iterator():
+        values = _values(frame.Emotion)
+        for emotion, value in zip(EMOTIONS, values):
+            setattr(frame, emotion, value)
+        frame.dominant_emotion = _dominant(values)
+        frames.append(frame)
+    StudentData.objects.bulk_update(frames, [*EMOTIONS, 'dominant_emotion'], batch_size=1000)
+
+    summaries = list(ClassStudentSummary.objects.all())
+    for summary in summaries:
+        for emotion, value in zip(EMOTIONS, _values(summary.emotion_sums)):
+            setattr(summary, f'{emotion}_sum', value)
+    ClassStudentSummary.objects.bulk_update(summaries, [f'{emotion}_sum' for emotion in EMOTIONS], batch_size=1000)
+
+
+def restore_emotions(apps, schema_editor):
+    """Rebuild the JSON columns from the emotion columns"""
+    StudentData = apps.get_model('attendance', 'StudentData')
+    ClassStudentSummary = apps.get_model('attendance', 'ClassStudentSummary')
+    for frame in StudentData.objects.iterator():
+        frame.Emotion = {
+            emotion: getattr(frame, emotion)
+            for emotion in EMOTIONS
+            if getattr(frame, emotion) is not None
+        }
+        frame.save(update_fields=['Emotion'])
+    for summary in ClassStudentSummary.objects.iterator():
+        summary.emotion_sums = {
+            emotion: getattr(summary, f'{emotion}_sum')
+            for emotion in EMOTIONS
+            if getattr(summary, f'{emotion}_sum') is not None
+        }
+        summary.save(update_fields=['emotion_sums'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0004_data_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='studentdata',
+            name='angry',
+            field=models.FloatField(blank=True, null=True, verbose_name='Angry'),
+        ),
+        migrations.AddField(
+            model_name='studentdata',
+            name='disgust',
+            field=models.FloatField(blank=True, null=True, verbose_name='Disgust'),
+        ),
+        migrations.AddField(
+            model_name='studentdata',
+            name='fear',
+            field=models.FloatField(blank=True, null=True, verbose_name='Fear'),
+        ),
+        migrations.AddField(
+            model_name='studentdata',
+            name='happy',
+            field=models.FloatField(blank=True, null=True, verbose_name='Happy'),
+        ),
+        migrations.AddField(
+            model_name='studentdata',
+            name='sad',
+            field=models.FloatField(blank=True, null=True, verbose_name='Sad'),
+        ),
+        migrations.AddField(
+            model_name='studentdata',
+            name='surprise',
+            field=models.FloatField(blank=True, null=True, verbose_name='Surprise'),
+        ),
+        migrations.AddField(
+            model_name='studentdata',
+            name='neutral',
+            field=models.FloatField(blank=True, null=True, verbose_name='Neutral'),
+        ),
+        migrations.AddField(
+            model_name='studentdata',
+            name='dominant_emotion',
+            field=models.PositiveSmallIntegerField(blank=True, choices=[(0, 'angry'), (1, 'disgust'), (2, 'fear'), (3, 'happy'), (4, 'sad'), (5, 'surprise'), (6, 'neutral')], null=True, verbose_name='Dominant Emotion'),
+        ),
+        migrations.AddField(
+            model_name='classstudentsummary',
+            name='angry_sum',
+            field=models.FloatField(blank=True, null=True, verbose_name='Angry Sum'),
+        ),
+        migrations.AddField(
+            model_name='classstudentsummary',
+            name='disgust_sum',
+            field=models.FloatField(blank=True, null=True, verbose_name='Disgust Sum'),
+        ),
+        migrations.AddField(
+            model_name='classstudentsummary',
+            name='fear_sum',
+            field=models.FloatField(blank=True, null=True, verbose_name='Fear Sum'),
+        ),
+        migrations.AddField(
+            model_name='classstudentsummary',
+            name='happy_sum',
+            field=models.FloatField(blank=True, null=True, verbose_name='Happy Sum'),
+        ),
+        migrations.AddField(
+            model_name='classstudentsummary',
+            name='sad_sum',
+            field=models.FloatField(blank=True, null=True, verbose_name='Sad Sum'),
+        ),
+        migrations.AddField(
+            model_name='classstudentsummary',
+            name='surprise_sum',
+            field=models.FloatField(blank=True, null=True, verbose_name='Surprise Sum'),
+        ),
+        migrations.AddField(
+            model_name='classstudentsummary',
+            name='neutral_sum',
+            field=models.FloatField(blank=True, null=True, verbose_name='Neutral Sum'),
+        ),
+        migrations.AlterField(
+            model_name='studentdata',
+            name='Emotion',
+            field=models.JSONField(null=True, verbose_name='Emotion Data'),
+        ),
+        migrations.RunPython(copy_emotions, restore_emotions),
+        migrations.RemoveField(
+            model_name='studentdata',
+            name='Emotion',
+        ),
+        migrations.RemoveField(
+            model_name='classstudentsummary',
+            name='emotion_sums',
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:02
+
+from django.db import migrations
+
+
+def _recreate_table(apps, schema_editor, partitioned):
+    """
+    Copy student_data into a new table, partitioned by ClassID range or not
+
+    Indexes and constraints are recreated from the model state, so they keep
+    the names later migrations refer to. On a partitioned table they are
+    created on the parent and cascade to every partition.
+    """
+    StudentData = apps.get_model('attendance', 'StudentData')
+    quote = schema_editor.quote_name
+    execute = schema_editor.execute
+
+    execute('ALTER TABLE student_data RENAME TO student_data_old')
+    execute('ALTER TABLE student_data_old ALTER COLUMN id DROP IDENTITY')
+    execute('ALTER TABLE student_data_old DROP CONSTRAINT student_data_pkey')
+    for index in StudentData._meta.indexes:
+        execute(f'DROP INDEX {quote(index.name)}')
+    for constraint in StudentData._meta.constraints:
+        execute(f'ALTER TABLE student_data_old DROP CONSTRAINT {quote(constraint.name)}')
+
+    if partitioned:
+        execute(
+            'CREATE TABLE student_data (LIKE student_data_old INCLUDING DEFAULTS INCLUDING STORAGE) '
+            'PARTITION BY RANGE ("ClassID")'
+        )
+        execute('CREATE TABLE student_data_default PARTITION OF student_data DEFAULT')
+        # Unique constraints of a partitioned table must contain the partition key
+        execute('ALTER TABLE student_data ADD CONSTRAINT student_data_pkey PRIMARY KEY (id, "ClassID")')
+    else:
+        execute('CREATE TABLE student_data (LIKE student_data_old INCLUDING DEFAULTS INCLUDING STORAGE)')
+        execute('ALTER TABLE student_data ADD CONSTRAINT student_data_pkey PRIMARY KEY (id)')
+
+    execute('INSERT INTO student_data SELECT * FROM student_data_old')
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM student_data')
+        next_id = cursor.fetchone()[0]
+    execute(f'ALTER TABLE student_data ALTER COLUMN id ADD GENERATED BY DEFAULT AS IDENTITY (START WITH {next_id})')
+
+    for index in StudentData._meta.indexes:
+        schema_editor.add_index(StudentData, index)
+    for constraint in StudentData._meta.constraints:
+        schema_editor.add_constraint(StudentData, constraint)
+    execute('DROP TABLE student_data_old')
+
+
+def partition_student_data(apps, schema_editor):
+    """Turn student_data into a table partitioned by ClassID range with a default partition"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    _recreate_table(apps, schema_editor, partitioned=True)
+
+
+def unpartition_student_data(apps, schema_editor):
+    """Merge every attached partition back into a plain student_data table"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    _recreate_table(apps, schema_editor, partitioned=False)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0005_emotion_columns'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_student_data, unpartition_student_data),
+    ]
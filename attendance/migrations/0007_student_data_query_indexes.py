@@ -0,0 +1,66 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:20
+"""
+Replace the single-column student_data indexes with ones matched to the
+queries that actually run, built without blocking writes
+
+Plans of the queries they serve, before -> after, measured with
+EXPLAIN (ANALYZE, BUFFERS) on generate_synthetic_data --classes 200
+--students 500 --frames 5 (359,719 frames, all in the default partition),
+for class 100 (1,828 frames of 453 students):
+
+- (class, student) refresh, ClassID = ? AND studentID = ?:
+  Bitmap Index Scan on the unique index + Bitmap Heap Scan, 4 buffers
+  -> Index Scan on class_student_idx, 4 buffers (no gain at this size)
+- frames per student of one class, ClassID = ? GROUP BY studentID:
+  Index Scan on ClassID_idx + HashAggregate + Sort, 1.30 ms
+  -> Index Scan on class_student_idx + GroupAggregate, no sort, 0.88 ms
+- write path existence check, ClassID = ? AND studentID IN (50 IDs) AND
+  FramID IN (5 IDs):
+  Index Scan on ClassID_idx filtering out 1,623 rows, 36 buffers
+  -> Index Only Scan on class_student_idx, same filter, 13 buffers
+- classes with frames written in a one-minute range, created_at BETWEEN
+  ? AND ? (72,606 rows; the index is dropped again by 0009):
+  Parallel Seq Scan over the whole table, 6,203 buffers, 69 ms
+  -> Index Only Scan on created_idx, 282 buffers, 26 ms
+
+Dropped as redundant:
+- studentID: the leading column of the student_data_unique_frame
+  constraint, which per-student lookups use instead (Bitmap Index Scan)
+- ClassID: the leading column of class_student_idx
+- FramID: no query filters on the frame number alone
+"""
+
+from django.db import migrations, models
+from attendance.operations import AddPartitionedIndexConcurrently, RemovePartitionedIndexConcurrently
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('attendance', '0006_partition_student_data'),
+    ]
+
+    operations = [
+        AddPartitionedIndexConcurrently(
+            model_name='studentdata',
+            index=models.Index(fields=['ClassID', 'studentID'], include=['FramID'], name='student_data_class_student_idx'),
+        ),
+        AddPartitionedIndexConcurrently(
+            model_name='studentdata',
+            index=models.Index(fields=['created_at'], include=['ClassID'], name='student_data_created_idx'),
+        ),
+        RemovePartitionedIndexConcurrently(
+            model_name='studentdata',
+            name='student_dat_student_2da74a_idx',
+        ),
+        RemovePartitionedIndexConcurrently(
+            model_name='studentdata',
+            name='student_dat_ClassID_0ffb4e_idx',
+        ),
+        RemovePartitionedIndexConcurrently(
+            model_name='studentdata',
+            name='student_dat_FramID_9278e3_idx',
+        ),
+    ]
@@ -0,0 +1,117 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def register_recorded(apps, schema_editor):
+    """
+    Register every student and class that already has frames, so the new
+    foreign keys of student_data find their targets
+    """
+    StudentData = apps.get_model('attendance', 'StudentData')
+    Student = apps.get_model('attendance', 'Student')
+    Class = apps.get_model('attendance', 'Class')
+    now = timezone.now()
+
+    student_ids = StudentData.objects.values_list('studentID', flat=True).distinct().order_by()
+    Student.objects.bulk_create(
+        [Student(studentID=student_id, created_at=now) for student_id in student_ids.iterator()],
+        batch_size=1000
+    )
+    class_ids = StudentData.objects.values_list('ClassID', flat=True).distinct().order_by()
+    Class.objects.bulk_create(
+        [Class(ClassID=class_id, created_at=now) for class_id in class_ids.iterator()],
+        batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('attendance', '0007_student_data_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Class',
+            fields=[
+                ('ClassID', models.IntegerField(primary_key=True, serialize=False, verbose_name='Class ID')),
+                ('name', models.CharField(blank=True, max_length=100, verbose_name='Name')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Class',
+                'verbose_name_plural': 'Classes',
+                'db_table': 'class',
+                'ordering': ['ClassID'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Student',
+            fields=[
+                ('studentID', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='Student ID')),
+                ('name', models.CharField(blank=True, max_length=100, verbose_name='Name')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Student',
+                'verbose_name_plural': 'Students',
+                'db_table': 'student',
+                'ordering': ['studentID'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Session',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('video_path', models.CharField(max_length=500, verbose_name='Video Path')),
+                ('frames_inserted', models.IntegerField(default=0, verbose_name='Frames Inserted')),
+                ('frames_skipped', models.IntegerField(default=0, verbose_name='Frames Skipped')),
+                ('started_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('ClassID', models.ForeignKey(db_column='ClassID', on_delete=django.db.models.deletion.CASCADE, related_name='sessions', to='attendance.class', verbose_name='Class')),
+            ],
+            options={
+                'verbose_name': 'Session',
+                'verbose_name_plural': 'Sessions',
+                'db_table': 'session',
+                'ordering': ['-started_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Enrollment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('ClassID', models.ForeignKey(db_column='ClassID', on_delete=django.db.models.deletion.CASCADE, to='attendance.class', verbose_name='Class')),
+                ('studentID', models.ForeignKey(db_column='studentID', on_delete=django.db.models.deletion.CASCADE, to='attendance.student', verbose_name='Student')),
+            ],
+            options={
+                'verbose_name': 'Enrollment',
+                'verbose_name_plural': 'Enrollments',
+                'db_table': 'enrollment',
+            },
+        ),
+        migrations.AddField(
+            model_name='class',
+            name='students',
+            field=models.ManyToManyField(blank=True, related_name='classes', through='attendance.Enrollment', to='attendance.student', verbose_name='Roster'),
+        ),
+        migrations.AddConstraint(
+            model_name='enrollment',
+            constraint=models.UniqueConstraint(fields=('ClassID', 'studentID'), name='enrollment_unique'),
+        ),
+        migrations.RunPython(register_recorded, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='studentdata',
+            name='studentID',
+            field=models.ForeignKey(db_column='studentID', db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='frames', to='attendance.student', verbose_name='Student ID'),
+        ),
+        migrations.AlterField(
+            model_name='studentdata',
+            name='ClassID',
+            field=models.ForeignKey(db_column='ClassID', db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='frames', to='attendance.class', verbose_name='Class ID'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+"""
+Date classes by when they were held instead of when their frames were written
+
+The from/to filters of the detail endpoints select classes by Class.held_at.
+Existing classes get the time their first frame was written, which is what
+the filters used before. The created_at index of student_data only served
+those filters and is dropped.
+"""
+from django.db import migrations, models
+from django.db.models import Min, OuterRef, Subquery
+from attendance.operations import RemovePartitionedIndexConcurrently
+
+
+def date_existing_classes(apps, schema_editor):
+    Class = apps.get_model('attendance', 'Class')
+    StudentData = apps.get_model('attendance', 'StudentData')
+    first_frame = (
+        StudentData.objects
+        .filter(ClassID=OuterRef('ClassID'))
+        .values('ClassID')
+        .annotate(first=Min('created_at'))
+        .values('first')
+    )
+    Class.objects.filter(held_at__isnull=True).update(held_at=Subquery(first_frame))
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('attendance', '0008_class_student_session_dimensions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='class',
+            name='held_at',
+            field=models.DateTimeField(blank=True, db_index=True, null=True, verbose_name='Held At'),
+        ),
+        migrations.RunPython(date_existing_classes, migrations.RunPython.noop, atomic=True),
+        RemovePartitionedIndexConcurrently(
+            model_name='studentdata',
+            name='student_data_created_idx',
+        ),
+    ]
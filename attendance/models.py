@@ -1,15 +1,152 @@
+import os
 from django.db import models
-from django.db.models import JSONField
+from .emotions import EMOTIONS, SUM_FIELDS, DominantEmotion, dominant_emotion, emotion_dict, emotion_values
+
+
+class Student(models.Model):
+    """
+    A student known to the system, either recognized in a video or listed
+    on a class roster
+    """
+    studentID = models.CharField(max_length=50, primary_key=True, verbose_name="Student ID")
+    name = models.CharField(max_length=100, blank=True, verbose_name="Name")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'student'
+        verbose_name = "Student"
+        verbose_name_plural = "Students"
+        ordering = ['studentID']
+
+    def __str__(self):
+        return self.studentID
+
+
+class Class(models.Model):
+    """
+    A class with its roster of enrolled students
+
+    Classes are registered as soon as frames are recorded for them. A class
+    without any enrollment has no roster; its attendance is then measured
+    against the students seen anywhere, as before rosters existed.
+
+    held_at is when the class took place, which the from/to filters of the
+    detail endpoints select on. add_class_data sets it from --held-at;
+    without it, it is the time the class's first frames were written.
+    """
+    ClassID = models.IntegerField(primary_key=True, verbose_name="Class ID")
+    name = models.CharField(max_length=100, blank=True, verbose_name="Name")
+    held_at = models.DateTimeField(null=True, blank=True, db_index=True, verbose_name="Held At")
+    students = models.ManyToManyField(
+        Student,
+        through='Enrollment',
+        related_name='classes',
+        blank=True,
+        verbose_name="Roster"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'class'
+        verbose_name = "Class"
+        verbose_name_plural = "Classes"
+        ordering = ['ClassID']
+
+    def __str__(self):
+        return f"Class {self.ClassID}"
+
+
+class Enrollment(models.Model):
+    """
+    A student on the roster of a class
+    """
+    ClassID = models.ForeignKey(Class, on_delete=models.CASCADE, db_column='ClassID', verbose_name="Class")
+    studentID = models.ForeignKey(Student, on_delete=models.CASCADE, db_column='studentID', verbose_name="Student")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'enrollment'
+        verbose_name = "Enrollment"
+        verbose_name_plural = "Enrollments"
+        constraints = [
+            models.UniqueConstraint(fields=['ClassID', 'studentID'], name='enrollment_unique'),
+        ]
+
+    def __str__(self):
+        return f"Student {self.studentID_id} - Class {self.ClassID_id}"
+
+
+class Session(models.Model):
+    """
+    One recording of a class processed by add_class_data
+    """
+    ClassID = models.ForeignKey(
+        Class,
+        on_delete=models.CASCADE,
+        db_column='ClassID',
+        related_name='sessions',
+        verbose_name="Class"
+    )
+    video_path = models.CharField(max_length=500, verbose_name="Video Path")
+    frames_inserted = models.IntegerField(default=0, verbose_name="Frames Inserted")
+    frames_skipped = models.IntegerField(default=0, verbose_name="Frames Skipped")
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'session'
+        verbose_name = "Session"
+        verbose_name_plural = "Sessions"
+        ordering = ['-started_at']
+
+    def __str__(self):
+        return f"Class {self.ClassID_id} - {os.path.basename(self.video_path)}"
 
 
 class StudentData(models.Model):
     """
     Model to store student attendance and emotion data
+
+    One row per recognized student per sampled frame, keyed by foreign keys
+    to the Student and Class dimension tables. The columns keep the student
+    and class IDs themselves, so filtering or grouping on them needs no join.
+
+    Each of the seven emotion scores has its own column; the Emotion property
+    reads and writes them as the {emotion: score} dict the JSON column used
+    to hold.
     """
-    studentID = models.CharField(max_length=50, verbose_name="Student ID")
+    # The composite indexes below cover both keys, so the foreign keys get no
+    # index of their own
+    studentID = models.ForeignKey(
+        Student,
+        on_delete=models.PROTECT,
+        db_column='studentID',
+        db_index=False,
+        related_name='frames',
+        verbose_name="Student ID"
+    )
     FramID = models.IntegerField(verbose_name="Frame ID")
-    ClassID = models.IntegerField(verbose_name="Class ID")
-    Emotion = JSONField(verbose_name="Emotion Data")
+    ClassID = models.ForeignKey(
+        Class,
+        on_delete=models.PROTECT,
+        db_column='ClassID',
+        db_index=False,
+        related_name='frames',
+        verbose_name="Class ID"
+    )
+    angry = models.FloatField(null=True, blank=True, verbose_name="Angry")
+    disgust = models.FloatField(null=True, blank=True, verbose_name="Disgust")
+    fear = models.FloatField(null=True, blank=True, verbose_name="Fear")
+    happy = models.FloatField(null=True, blank=True, verbose_name="Happy")
+    sad = models.FloatField(null=True, blank=True, verbose_name="Sad")
+    surprise = models.FloatField(null=True, blank=True, verbose_name="Surprise")
+    neutral = models.FloatField(null=True, blank=True, verbose_name="Neutral")
+    dominant_emotion = models.PositiveSmallIntegerField(
+        choices=DominantEmotion.choices,
+        null=True,
+        blank=True,
+        verbose_name="Dominant Emotion"
+    )
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -17,11 +154,88 @@ class StudentData(models.Model):
         db_table = 'student_data'
         verbose_name = "Student Data"
         verbose_name_plural = "Student Data"
+        constraints = [
+            models.UniqueConstraint(fields=['studentID', 'ClassID', 'FramID'], name='student_data_unique_frame'),
+        ]
+        indexes = [
+            # Per-class lookups, (class, student) refreshes and the write
+            # path's existence check; the unique constraint above leads with
+            # studentID and serves per-student lookups
+            models.Index(fields=['ClassID', 'studentID'], include=['FramID'], name='student_data_class_student_idx'),
+        ]
+
+    def __str__(self):
+        return f"Student {self.studentID_id} - Class {self.ClassID_id} - Frame {self.FramID}"
+
+    @property
+    def Emotion(self):
+        """Emotion scores as an {emotion: score} dict"""
+        return emotion_dict(getattr(self, emotion) for emotion in EMOTIONS)
+
+    @Emotion.setter
+    def Emotion(self, emotions):
+        values = emotion_values(emotions)
+        for emotion, value in zip(EMOTIONS, values):
+            setattr(self, emotion, value)
+        self.dominant_emotion = dominant_emotion(values)
+
+
+class ClassStudentSummary(models.Model):
+    """
+    Rollup of StudentData per (class, student): frame count and running
+    emotion sums, kept up to date as frames are inserted
+
+    An emotion's sum is null when none of the frames scored it.
+    """
+    ClassID = models.IntegerField(verbose_name="Class ID")
+    studentID = models.CharField(max_length=50, verbose_name="Student ID")
+    frame_count = models.IntegerField(default=0, verbose_name="Frame Count")
+    angry_sum = models.FloatField(null=True, blank=True, verbose_name="Angry Sum")
+    disgust_sum = models.FloatField(null=True, blank=True, verbose_name="Disgust Sum")
+    fear_sum = models.FloatField(null=True, blank=True, verbose_name="Fear Sum")
+    happy_sum = models.FloatField(null=True, blank=True, verbose_name="Happy Sum")
+    sad_sum = models.FloatField(null=True, blank=True, verbose_name="Sad Sum")
+    surprise_sum = models.FloatField(null=True, blank=True, verbose_name="Surprise Sum")
+    neutral_sum = models.FloatField(null=True, blank=True, verbose_name="Neutral Sum")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'class_student_summary'
+        verbose_name = "Class Student Summary"
+        verbose_name_plural = "Class Student Summaries"
+        constraints = [
+            models.UniqueConstraint(fields=['ClassID', 'studentID'], name='class_student_summary_unique'),
+        ]
         indexes = [
             models.Index(fields=['studentID']),
-            models.Index(fields=['ClassID']),
-            models.Index(fields=['FramID']),
         ]
 
     def __str__(self):
-        return f"Student {self.studentID} - Class {self.ClassID} - Frame {self.FramID}"
+        return f"Class {self.ClassID} - Student {self.studentID} - {self.frame_count} frames"
+
+    @property
+    def emotion_sums(self):
+        """Emotion sums as an {emotion: sum} dict"""
+        return emotion_dict(getattr(self, field) for field in SUM_FIELDS)
+
+    @emotion_sums.setter
+    def emotion_sums(self, emotion_sums):
+        for field, value in zip(SUM_FIELDS, emotion_values(emotion_sums)):
+            setattr(self, field, value)
+
+
+class DataVersion(models.Model):
+    """
+    Single-row counter bumped whenever attendance data changes; cached API
+    responses and their ETags are keyed by it
+    """
+    version = models.BigIntegerField(default=0, verbose_name="Version")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'data_version'
+        verbose_name = "Data Version"
+        verbose_name_plural = "Data Version"
+
+    def __str__(self):
+        return f"Data version {self.version}"
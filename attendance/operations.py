@@ -0,0 +1,113 @@
+"""
+Migration operations for indexes on partitioned PostgreSQL tables
+
+CREATE/DROP INDEX CONCURRENTLY are not supported on a partitioned table
+itself. The index is instead created ON ONLY the parent, which leaves it
+invalid, then concurrently on every partition, and each partition's index is
+attached to the parent's. Once all of them are attached the parent index
+becomes valid, and no step holds a lock that blocks writes for the length
+of an index build. On tables that are not partitioned these behave exactly
+like AddIndexConcurrently and RemoveIndexConcurrently.
+"""
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db.backends.utils import truncate_name
+
+
+def partitions_of(schema_editor, table):
+    """
+    Names of the partitions of a table
+
+    Returns:
+        list: Partition names, or None if the table is not partitioned
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(%s)",
+            [table]
+        )
+        row = cursor.fetchone()
+        if not row or not row[0]:
+            return None
+        cursor.execute(
+            """
+            SELECT child.relname
+            FROM pg_inherits
+            JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = to_regclass(%s)
+            ORDER BY child.relname
+            """,
+            [table]
+        )
+        return [name for name, in cursor.fetchall()]
+
+
+def add_index(schema_editor, model, index):
+    """Create an index concurrently, partition by partition on a partitioned table"""
+    table = model._meta.db_table
+    partitions = partitions_of(schema_editor, table)
+    if partitions is None:
+        schema_editor.add_index(model, index, concurrently=True)
+        return
+
+    quote = schema_editor.quote_name
+    max_length = schema_editor.connection.ops.max_name_length()
+
+    parent = index.create_sql(model, schema_editor)
+    parent.parts['table'] = f'ONLY {quote(table)}'
+    schema_editor.execute(parent)
+
+    for partition in partitions:
+        child_name = truncate_name(f'{partition}_{index.name}', max_length)
+        child = index.create_sql(model, schema_editor, concurrently=True)
+        child.parts['table'] = quote(partition)
+        child.parts['name'] = quote(child_name)
+        schema_editor.execute(child)
+        schema_editor.execute(f'ALTER INDEX {quote(index.name)} ATTACH PARTITION {quote(child_name)}')
+
+
+def remove_index(schema_editor, model, index):
+    """
+    Drop an index, concurrently unless the table is partitioned
+
+    Dropping a partitioned index cannot be done concurrently. It drops the
+    index of every partition with it, which is quick but briefly locks the
+    table.
+    """
+    if partitions_of(schema_editor, model._meta.db_table) is None:
+        schema_editor.remove_index(model, index, concurrently=True)
+    else:
+        schema_editor.remove_index(model, index)
+
+
+class AddPartitionedIndexConcurrently(AddIndexConcurrently):
+    """AddIndexConcurrently that also works on partitioned tables"""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        self._ensure_not_in_transaction(schema_editor)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            add_index(schema_editor, model, self.index)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        self._ensure_not_in_transaction(schema_editor)
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            remove_index(schema_editor, model, self.index)
+
+
+class RemovePartitionedIndexConcurrently(RemoveIndexConcurrently):
+    """RemoveIndexConcurrently that also works on partitioned tables"""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        self._ensure_not_in_transaction(schema_editor)
+        model = from_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            index = from_state.models[app_label, self.model_name_lower].get_index_by_name(self.name)
+            remove_index(schema_editor, model, index)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        self._ensure_not_in_transaction(schema_editor)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            index = to_state.models[app_label, self.model_name_lower].get_index_by_name(self.name)
+            add_index(schema_editor, model, index)
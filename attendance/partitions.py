@@ -0,0 +1,172 @@
+"""
+Declarative partitioning of student_data by ClassID range (PostgreSQL)
+
+Migration 0006 turns student_data into a table partitioned by RANGE
+("ClassID") with a DEFAULT partition that receives every class not covered
+by a range partition. Queries filtering on ClassID are pruned to a single
+partition, and a finished term can be detached and archived as a plain table
+without deleting rows one by one.
+
+PostgreSQL requires unique constraints of a partitioned table to include the
+partition key, so the primary key is (id, "ClassID"). id still comes from an
+identity sequence and stays unique on its own, which is what Django assumes.
+"""
+import re
+from django.db import connection, transaction
+from .models import ClassStudentSummary, Enrollment
+from .response_cache import bump_data_version
+
+TABLE = 'student_data'
+DEFAULT_PARTITION = 'student_data_default'
+PARTITION_KEY = 'ClassID'
+
+
+class PartitionError(Exception):
+    """Raised when partitions cannot be managed on the current database"""
+
+
+def is_partitioned():
+    """Whether student_data is a partitioned table on the current database"""
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT relkind = 'p' FROM pg_class WHERE oid = to_regclass(%s)",
+            [TABLE]
+        )
+        row = cursor.fetchone()
+    return bool(row and row[0])
+
+
+def _require_partitioned():
+    if not is_partitioned():
+        raise PartitionError(f'{TABLE} is not partitioned on this database (PostgreSQL only)')
+
+
+def partition_name(start, end):
+    """Default name of the partition holding ClassIDs in [start, end)"""
+    return f'{TABLE}_c{start}_{end}'.replace('-', 'm')
+
+
+def _range_bounds(bounds):
+    """(start, end) of a partition bound expression, None for MINVALUE/MAXVALUE"""
+    match = re.match(r'FOR VALUES FROM \((.+?)\) TO \((.+?)\)', bounds)
+    if match is None:
+        return None
+    return tuple(int(value) if value.lstrip('-').isdigit() else None for value in match.groups())
+
+
+def list_partitions():
+    """
+    Partitions of student_data
+
+    Returns:
+        list: (name, bounds, estimated rows) tuples, range partitions ordered
+        by their lower bound and the default partition last
+    """
+    _require_partitioned()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname,
+                   pg_get_expr(child.relpartbound, child.oid),
+                   GREATEST(child.reltuples, 0)::bigint
+            FROM pg_inherits
+            JOIN pg_class AS child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = to_regclass(%s)
+            """,
+            [TABLE]
+        )
+        rows = cursor.fetchall()
+
+    def position(row):
+        bounds = _range_bounds(row[1])
+        if bounds is None:
+            return (1, 0)
+        return (0, bounds[0] if bounds[0] is not None else float('-inf'))
+
+    return sorted(rows, key=position)
+
+
+def create_partition(start, end, name=None):
+    """
+    Create the partition for ClassIDs in [start, end)
+
+    Rows of that range already stored in the default partition are moved
+    into the new partition in the same transaction. A CHECK constraint
+    matching the bounds lets ATTACH PARTITION skip its validation scan of the
+    new partition.
+
+    Returns:
+        tuple: (partition name, rows moved from the default partition)
+
+    Raises:
+        PartitionError: If the table is not partitioned or the range is empty
+    """
+    _require_partitioned()
+    start, end = int(start), int(end)
+    if start >= end:
+        raise PartitionError(f'Empty range: {start} >= {end}')
+
+    name = name or partition_name(start, end)
+    quote = connection.ops.quote_name
+    partition = quote(name)
+    key = quote(PARTITION_KEY)
+    # Integers only, so the bounds can be inlined into the DDL
+    bounds = f'{key} >= {start} AND {key} < {end}'
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'CREATE TABLE {partition} (LIKE {quote(TABLE)} INCLUDING DEFAULTS INCLUDING STORAGE)')
+        cursor.execute(f'ALTER TABLE {partition} ADD CONSTRAINT {quote(name + "_bounds")} CHECK ({bounds})')
+        cursor.execute(f"""
+            WITH moved AS (
+                DELETE FROM {quote(DEFAULT_PARTITION)} WHERE {bounds} RETURNING *
+            )
+            INSERT INTO {partition} SELECT * FROM moved
+        """)
+        moved = cursor.rowcount
+        cursor.execute(
+            f'ALTER TABLE {quote(TABLE)} ATTACH PARTITION {partition} FOR VALUES FROM ({start}) TO ({end})'
+        )
+        cursor.execute(f'ALTER TABLE {partition} DROP CONSTRAINT {quote(name + "_bounds")}')
+    return name, moved
+
+
+def detach_partition(name):
+    """
+    Detach a range partition, keeping it as a standalone table
+
+    The detached table keeps its rows and indexes, so it can be dumped and
+    dropped, or attached again later. The rollup rows and enrollments of its
+    classes are removed with it so the API stops reporting the archived
+    classes, including rosters whose students were never seen; reload the
+    rosters with load_roster after attaching it again.
+
+    Returns:
+        tuple: (rollup rows removed, enrollments removed)
+
+    Raises:
+        PartitionError: If name is not a range partition of student_data
+    """
+    partitions = {partition: bounds for partition, bounds, _ in list_partitions()}
+    if name not in partitions:
+        raise PartitionError(f'{name} is not a partition of {TABLE}')
+    bounds = _range_bounds(partitions[name])
+    if bounds is None:
+        raise PartitionError('The default partition cannot be detached')
+
+    start, end = bounds
+    in_range = {}
+    if start is not None:
+        in_range['ClassID__gte'] = start
+    if end is not None:
+        in_range['ClassID__lt'] = end
+
+    quote = connection.ops.quote_name
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f'ALTER TABLE {quote(TABLE)} DETACH PARTITION {quote(name)}')
+        removed, _ = ClassStudentSummary.objects.filter(**in_range).delete()
+        unenrolled, _ = Enrollment.objects.filter(**in_range).delete()
+        bump_data_version()
+    return removed, unenrolled
@@ -0,0 +1,165 @@
+"""
+Staged producer/consumer pipeline for video ingestion
+
+Decoding, detection/tracking, face analysis and result handling run
+concurrently and hand work to each other through bounded queues:
+
+    reader thread -> frame queue -> detection thread -> batch queue
+        -> analysis worker pool -> writer (the calling thread)
+
+The reader decodes frames ahead of the detector. Detection and tracking run
+in a single thread so the tracker sees frames strictly in order. Face crops
+are grouped into batches and analyzed by a pool of workers; the writer
+consumes finished batches in submission order. It runs in the thread that
+called run(), so a sink writing to the database uses that thread's
+connection and transaction. Every queue is bounded, so a
+slow stage makes the stages before it wait instead of buffering the video in
+memory.
+"""
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from .face_analysis import crop_face
+
+# Marks the end of a stage's output
+_DONE = object()
+
+
+class PipelineStopped(Exception):
+    """Raised inside a stage when another stage failed"""
+
+
+class VideoPipeline:
+    """
+    Run frames through detection, batched analysis and a result sink
+
+    Args:
+        frames: Iterable of decoded frames, in video order
+        detect: Callable(frame) -> iterable of (track_id, box); called from a
+            single thread in frame order
+        analyze: Callable(list of face crops) -> list of results, one per crop;
+            called as analyze(crops, flags) when recognize is given
+        sink: Callable(faces, results) receiving each analyzed batch in order,
+            where faces is a list of (track_id, frame_id)
+        batch_size: Faces per analysis batch
+        analysis_workers: Threads running analyze concurrently
+        frame_queue_size: Decoded frames buffered ahead of detection
+        batch_queue_size: Batches queued or in flight in the analysis stage
+        on_frame: Optional callable(frame_id) called as each frame is detected
+        first_frame_id: ID of the first frame, when resuming part way into a video
+        recognize: Optional callable(track_id, crop) -> bool called for each
+            face in the detection thread, in frame order; its answers are
+            passed to analyze as a list of flags, one per crop
+    """
+
+    def __init__(self, frames, detect, analyze, sink, batch_size=32, analysis_workers=1,
+                 frame_queue_size=8, batch_queue_size=4, on_frame=None, first_frame_id=0, recognize=None):
+        self.frames = frames
+        self.detect = detect
+        self.analyze = analyze
+        self.sink = sink
+        self.batch_size = max(batch_size, 1)
+        self.analysis_workers = max(analysis_workers, 1)
+        self.frame_queue = queue.Queue(maxsize=max(frame_queue_size, 1))
+        self.batch_queue = queue.Queue(maxsize=max(batch_queue_size, 1))
+        self.on_frame = on_frame
+        self.first_frame_id = first_frame_id
+        self.recognize = recognize
+
+        self.stopped = threading.Event()
+        self.errors = []
+
+    def run(self):
+        """
+        Process every frame and block until all batches reached the sink
+
+        Raises:
+            Exception: The first error raised by any stage
+        """
+        with ThreadPoolExecutor(max_workers=self.analysis_workers, thread_name_prefix='analysis') as pool:
+            threads = [
+                threading.Thread(target=self._guard, args=(self._read,), name='reader', daemon=True),
+                threading.Thread(target=self._guard, args=(self._detect, pool), name='detector', daemon=True),
+            ]
+            for thread in threads:
+                thread.start()
+            self._guard(self._write)
+            for thread in threads:
+                thread.join()
+
+        if self.errors:
+            raise self.errors[0]
+
+    def _guard(self, stage, *args):
+        try:
+            stage(*args)
+        except PipelineStopped:
+            pass
+        except BaseException as e:
+            self.errors.append(e)
+            self.stopped.set()
+
+    def _put(self, target, item):
+        while True:
+            if self.stopped.is_set():
+                raise PipelineStopped()
+            try:
+                target.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _get(self, source):
+        while True:
+            if self.stopped.is_set():
+                raise PipelineStopped()
+            try:
+                return source.get(timeout=0.1)
+            except queue.Empty:
+                continue
+
+    def _read(self):
+        for frame_id, frame in enumerate(self.frames, self.first_frame_id):
+            self._put(self.frame_queue, (frame_id, frame))
+        self._put(self.frame_queue, _DONE)
+
+    def _submit(self, pool, crops, flags):
+        if self.recognize is None:
+            return pool.submit(self.analyze, crops)
+        return pool.submit(self.analyze, crops, flags)
+
+    def _detect(self, pool):
+        faces = []
+        crops = []
+        flags = []
+        while True:
+            item = self._get(self.frame_queue)
+            if item is _DONE:
+                break
+
+            frame_id, frame = item
+            if self.on_frame is not None:
+                self.on_frame(frame_id)
+            for track_id, box in self.detect(frame):
+                crop = crop_face(frame, box)
+                faces.append((track_id, frame_id))
+                crops.append(crop)
+                if self.recognize is not None:
+                    flags.append(self.recognize(track_id, crop))
+
+            if len(crops) >= self.batch_size:
+                self._put(self.batch_queue, (faces, self._submit(pool, crops, flags)))
+                faces, crops, flags = [], [], []
+
+        if crops:
+            self._put(self.batch_queue, (faces, self._submit(pool, crops, flags)))
+        self._put(self.batch_queue, _DONE)
+
+    def _write(self):
+        while True:
+            item = self._get(self.batch_queue)
+            if item is _DONE:
+                break
+
+            faces, future = item
+            self.sink(faces, future.result())
@@ -0,0 +1,152 @@
+"""
+Query parameters of the detail endpoints
+
+GetStudentsDetailStatus and GetClassDetailStatus accept:
+
+- classID / studentID: comma-separated IDs (or the parameter repeated);
+  only entries of matching classes/students are returned
+- from / to: dates or ISO datetimes; only classes held in that range are
+  returned (a date as "to" includes that whole day)
+- fields: comma-separated top-level fields to include in each entry
+- depth: 0 drops the nested breakdown, 1 keeps it without per-entry emotion
+  sums, 2 (the default) returns everything
+- page_size / cursor: cursor pagination over the entries' IDs
+- stream: json or ndjson streams the whole (filtered) export instead of
+  building it in memory; it cannot be combined with pagination
+
+Without any of them the endpoints return the full map as before.
+"""
+from datetime import datetime, time, timedelta
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.pagination import CursorPagination
+from .streaming import STREAM_MODES
+
+FULL_DEPTH = 2
+DEPTHS = (0, 1, FULL_DEPTH)
+
+
+class InvalidQuery(ValueError):
+    """Raised for a malformed query parameter; reported as a 400"""
+
+
+class SummaryCursorPagination(CursorPagination):
+    """
+    Cursor pagination over the class or student IDs of the rollup and the
+    rosters
+
+    The ordering is the ID field itself, which is unique among the keys, so
+    cursors stay stable while new classes and students are added.
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+    def __init__(self, ordering):
+        self.ordering = ordering
+
+
+def _split(params, name):
+    values = []
+    for value in params.getlist(name):
+        values.extend(part.strip() for part in value.split(',') if part.strip())
+    return values
+
+
+def parse_ids(params, name, cast=str):
+    """IDs given in a query parameter, or None if it is absent"""
+    values = _split(params, name)
+    if not values:
+        return None
+    try:
+        return [cast(value) for value in values]
+    except ValueError:
+        raise InvalidQuery(f'Invalid {name}: {params.get(name)}')
+
+
+def parse_moment(params, name, end_of_day=False):
+    """
+    Aware datetime given as a date or ISO datetime, or None if absent
+
+    Args:
+        end_of_day: Turn a plain date into the start of the next day, so it
+            can be used as an exclusive upper bound covering that day
+    """
+    value = params.get(name)
+    if not value:
+        return None
+
+    try:
+        day = parse_date(value)
+        if day is not None:
+            if end_of_day:
+                day += timedelta(days=1)
+            moment = datetime.combine(day, time.min)
+        else:
+            moment = parse_datetime(value)
+            if moment is None:
+                raise ValueError(value)
+    except ValueError:
+        raise InvalidQuery(f'Invalid {name}: {value}')
+
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+def parse_detail_query(params, fields):
+    """
+    Parse the query parameters of a detail endpoint
+
+    Args:
+        params: The request's query parameters
+        fields: Top-level fields the endpoint can return, in response order
+
+    Returns:
+        dict: class_ids, student_ids, since, until, fields, depth, paginate
+        and stream
+
+    Raises:
+        InvalidQuery: If a parameter is malformed
+    """
+    selected = _split(params, 'fields')
+    unknown = [field for field in selected if field not in fields]
+    if unknown:
+        raise InvalidQuery(f'Unknown fields: {", ".join(unknown)}; expected any of {", ".join(fields)}')
+
+    depth = params.get('depth', str(FULL_DEPTH))
+    if depth not in {str(value) for value in DEPTHS}:
+        raise InvalidQuery(f'Invalid depth: {depth}; expected one of {", ".join(map(str, DEPTHS))}')
+
+    stream = params.get('stream') or None
+    if stream is not None and stream not in STREAM_MODES:
+        raise InvalidQuery(f'Invalid stream: {stream}; expected one of {", ".join(STREAM_MODES)}')
+
+    query = {
+        'class_ids': parse_ids(params, 'classID', int),
+        'student_ids': parse_ids(params, 'studentID'),
+        'since': parse_moment(params, 'from'),
+        'until': parse_moment(params, 'to', end_of_day=True),
+        'fields': [field for field in fields if field in selected] if selected else list(fields),
+        'depth': int(depth),
+        'paginate': 'cursor' in params or 'page_size' in params,
+        'stream': stream,
+    }
+    if query['stream'] and query['paginate']:
+        raise InvalidQuery('stream cannot be combined with cursor pagination')
+    if query['since'] and query['until'] and query['since'] >= query['until']:
+        raise InvalidQuery('"from" must be before "to"')
+    return query
+
+
+FILTERS = ('class_ids', 'student_ids', 'since', 'until')
+
+
+def filters_of(query):
+    """The entry filters of a parsed query, as keyword arguments for get_summary_keys"""
+    return {name: query[name] for name in FILTERS}
+
+
+def is_filtered(query):
+    """Whether the query selects a subset of the entries"""
+    return any(query[name] is not None for name in FILTERS)
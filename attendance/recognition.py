@@ -0,0 +1,121 @@
+"""
+Per-track recognition policy for video ingestion
+
+A track keeps showing the same person from frame to frame, yet every one of
+its faces used to go through ArcFace and the gallery search. RecognitionPolicy
+re-identifies a track only every N of its sampled frames, or sooner when the
+face's appearance drifts from the one last identified. The other faces reuse
+the track's last gallery matches, which count as votes as usual.
+
+Drift is measured on a cheap appearance signature (a small normalized
+grayscale thumbnail) rather than on the ArcFace embedding, since computing
+the embedding is the cost being saved.
+
+should_recognize runs in the pipeline's detection thread, which sees each
+track's faces in order. fill_matches runs in its writer, which receives the
+analyzed batches in the same order. So a skipped face's track has always
+been identified in an earlier result.
+"""
+import threading
+import cv2
+import numpy as np
+
+SIGNATURE_SIDE = 16
+
+
+def appearance_signature(face_crop):
+    """Unit-length, zero-mean grayscale thumbnail of a face crop"""
+    if face_crop.size == 0:
+        return np.zeros(SIGNATURE_SIDE * SIGNATURE_SIDE, dtype=np.float32)
+    gray = cv2.cvtColor(face_crop, cv2.COLOR_BGR2GRAY) if face_crop.ndim == 3 else face_crop
+    thumbnail = cv2.resize(gray, (SIGNATURE_SIDE, SIGNATURE_SIDE), interpolation=cv2.INTER_AREA)
+    vector = thumbnail.astype(np.float32).ravel()
+    vector -= vector.mean()
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class RecognitionPolicy:
+    """
+    Decide which faces are identified, and fill in the matches of the rest
+
+    Args:
+        every: Identify a track on every Nth of its sampled frames; 1
+            identifies every face
+        drift: Cosine distance between a face's appearance signature and
+            the one of the track's last identified face above which the
+            face is identified anyway; None turns the check off
+    """
+
+    def __init__(self, every=1, drift=None):
+        self.every = max(every, 1)
+        self.drift = drift
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Forget every track, e.g. before a new video"""
+        # Detection thread: faces since the last identification, and its signature
+        self.since_recognized = {}
+        self.signatures = {}
+        # Writer: the track's last gallery matches
+        self.matches = {}
+        with self.lock:
+            self.faces = 0
+            self.recognized = 0
+            self.drifted = 0
+
+    def should_recognize(self, track_id, face_crop):
+        """Whether a face needs ArcFace and the gallery search; called in track order"""
+        since = self.since_recognized.get(track_id)
+        recognize = since is None or since + 1 >= self.every
+        drifted = False
+
+        if not recognize and self.drift is not None:
+            signature = appearance_signature(face_crop)
+            drifted = 1.0 - float(signature @ self.signatures[track_id]) > self.drift
+            recognize = drifted
+
+        if recognize:
+            self.since_recognized[track_id] = 0
+            if self.drift is not None:
+                self.signatures[track_id] = appearance_signature(face_crop)
+        else:
+            self.since_recognized[track_id] = since + 1
+
+        with self.lock:
+            self.faces += 1
+            self.recognized += recognize
+            self.drifted += drifted
+        return recognize
+
+    def fill_matches(self, faces, results):
+        """
+        Results of an analyzed batch with the skipped faces' matches filled in
+
+        Args:
+            faces: (track_id, frame_id) of each face
+            results: (emotions, top_match) of each face, top_match None for
+                skipped faces
+
+        Returns:
+            list: (emotions, top_match) of each face
+        """
+        filled = []
+        for (track_id, _), (emotions, top_match) in zip(faces, results):
+            if top_match is None:
+                top_match = self.matches.get(track_id, [])
+            else:
+                self.matches[track_id] = top_match
+            filled.append((emotions, top_match))
+        return filled
+
+    def stats(self):
+        """{'faces', 'recognized', 'skipped', 'drifted'} counts so far"""
+        with self.lock:
+            return {
+                'faces': self.faces,
+                'recognized': self.recognized,
+                'skipped': self.faces - self.recognized,
+                'drifted': self.drifted,
+            }
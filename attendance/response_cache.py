@@ -0,0 +1,154 @@
+"""
+Versioned response cache for the dashboard endpoints
+
+Attendance data only changes when frames are written, so every write bumps a
+single DataVersion counter and GET responses are cached under the version
+they were computed for. A bump never deletes anything: entries of older
+versions are simply no longer looked up and age out of the LRU-bounded
+cache. The version also serves as the ETag, so clients that poll with
+If-None-Match get a 304 for the price of one primary-key lookup.
+"""
+import hashlib
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from .models import DataVersion
+
+RESPONSE_CACHE_ALIAS = 'responses'
+VERSION_ID = 1
+
+
+def get_data_version():
+    """
+    Current data version
+
+    Returns:
+        tuple: (version, updated_at), (0, None) before the first write
+    """
+    row = DataVersion.objects.filter(pk=VERSION_ID).values_list('version', 'updated_at').first()
+    return row if row is not None else (0, None)
+
+
+async def aget_data_version():
+    """Async get_data_version"""
+    row = await DataVersion.objects.filter(pk=VERSION_ID).values_list('version', 'updated_at').afirst()
+    return row if row is not None else (0, None)
+
+
+def _increment_version():
+    updated = DataVersion.objects.filter(pk=VERSION_ID).update(
+        version=F('version') + 1,
+        updated_at=timezone.now()
+    )
+    if not updated:
+        DataVersion.objects.get_or_create(pk=VERSION_ID, defaults={'version': 1})
+
+
+def bump_data_version():
+    """
+    Invalidate cached responses once the current transaction commits
+
+    Bumping after commit keeps the version row out of the writers'
+    transactions, so parallel ingestion does not serialize on it. A reader
+    racing the bump can only cache newer data under the old version, which
+    the bump then retires.
+    """
+    transaction.on_commit(_increment_version)
+
+
+def _validators(version, updated_at):
+    """(ETag, Last-Modified timestamp or None) of a data version"""
+    return f'"{version}"', int(updated_at.timestamp()) if updated_at else None
+
+
+def _cache_key(request, version):
+    path = hashlib.sha256(request.get_full_path().encode()).hexdigest()
+    return f'response:{version}:{path}'
+
+
+def _add_validators(response, etag, last_modified):
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, no_cache=True)
+    return response
+
+
+class VersionedCacheMixin:
+    """
+    Serve GET responses of an APIView from the versioned response cache
+
+    Successful responses are rendered once per data version and request path
+    (including the query string) and carry ETag and Last-Modified headers
+    with Cache-Control: no-cache, so clients revalidate on every poll.
+    """
+    cache_alias = RESPONSE_CACHE_ALIAS
+
+    def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return super().dispatch(request, *args, **kwargs)
+
+        version, updated_at = get_data_version()
+        etag, last_modified = _validators(version, updated_at)
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = self.get_cached_response(request, version, *args, **kwargs)
+        return _add_validators(response, etag, last_modified)
+
+    def get_cached_response(self, request, version, *args, **kwargs):
+        """Rendered response for the request at a data version, computed on a miss"""
+        cache = caches[self.cache_alias]
+        key = _cache_key(request, version)
+
+        cached = cache.get(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = super().dispatch(request, *args, **kwargs)
+        # Streamed exports are too large to keep and are only revalidated
+        if response.status_code == 200 and not response.streaming:
+            response.render()
+            cache.set(key, (response.content, response['Content-Type']))
+        return response
+
+
+class AsyncVersionedCacheMixin:
+    """
+    VersionedCacheMixin for async Django views, which return plain
+    HttpResponses; the same data version serves as their ETag
+    """
+    cache_alias = RESPONSE_CACHE_ALIAS
+
+    async def dispatch(self, request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return await super().dispatch(request, *args, **kwargs)
+
+        version, updated_at = await aget_data_version()
+        etag, last_modified = _validators(version, updated_at)
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = await self.get_cached_response(request, version, *args, **kwargs)
+        return _add_validators(response, etag, last_modified)
+
+    async def get_cached_response(self, request, version, *args, **kwargs):
+        """Response for the request at a data version, computed on a miss"""
+        cache = caches[self.cache_alias]
+        key = _cache_key(request, version)
+
+        cached = await cache.aget(key)
+        if cached is not None:
+            content, content_type = cached
+            return HttpResponse(content, content_type=content_type)
+
+        response = await super().dispatch(request, *args, **kwargs)
+        if response.status_code == 200 and not response.streaming:
+            await cache.aset(key, (response.content, response['Content-Type']))
+        return response
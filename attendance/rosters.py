@@ -0,0 +1,58 @@
+"""
+Class rosters: the students enrolled in each class
+"""
+from django.db import transaction
+from .models import Class, Enrollment, Student
+from .response_cache import bump_data_version
+
+
+def save_roster(entries, replace=False):
+    """
+    Enroll students in classes, registering both as needed
+
+    Args:
+        entries: Iterable of (class_id, student_id, name); an empty name
+            leaves the student's stored name as it is
+        replace: Drop enrollments of the listed classes that are not in
+            entries, instead of only adding to their rosters
+
+    Returns:
+        tuple: (enrollments added, enrollments removed)
+    """
+    entries = list(entries)
+    class_ids = sorted({class_id for class_id, _, _ in entries})
+    names = {student_id: name for _, student_id, name in entries if name}
+    pairs = {(class_id, student_id) for class_id, student_id, _ in entries}
+
+    with transaction.atomic():
+        Class.objects.bulk_create([Class(ClassID=class_id) for class_id in class_ids], ignore_conflicts=True)
+        Student.objects.bulk_create(
+            [Student(studentID=student_id) for student_id in sorted({student_id for _, student_id in pairs})],
+            ignore_conflicts=True
+        )
+        if names:
+            students = list(Student.objects.filter(studentID__in=list(names)))
+            for student in students:
+                student.name = names[student.studentID]
+            Student.objects.bulk_update(students, ['name'])
+
+        existing = {
+            (class_id, student_id): enrollment_id
+            for enrollment_id, class_id, student_id in (
+                Enrollment.objects
+                .filter(ClassID__in=class_ids)
+                .values_list('id', 'ClassID', 'studentID')
+            )
+        }
+        Enrollment.objects.bulk_create([
+            Enrollment(ClassID_id=class_id, studentID_id=student_id)
+            for class_id, student_id in sorted(pairs - existing.keys())
+        ])
+
+        removed = 0
+        if replace:
+            stale = [enrollment_id for key, enrollment_id in existing.items() if key not in pairs]
+            removed, _ = Enrollment.objects.filter(id__in=stale).delete()
+
+        bump_data_version()
+    return len(pairs - existing.keys()), removed
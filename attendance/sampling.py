@@ -0,0 +1,121 @@
+"""
+Frame sampling strategies for video ingestion
+
+The pipeline only looks at every Nth frame. Reading every frame with
+cap.read() decodes and converts all of them just to drop most, so cheaper
+readers are offered:
+
+- read: decode and convert every frame (the original behaviour)
+- grab: cap.grab() every frame but only cap.retrieve() the sampled ones, so
+  skipped frames are never converted to BGR images
+- seek: jump straight to each sampled frame with CAP_PROP_POS_FRAMES, letting
+  the demuxer skip from the nearest keyframe; fastest for large intervals,
+  but frame-exact positioning depends on the codec and container
+
+All readers can start at a later sampled frame, which is how an interrupted
+ingestion resumes. read and grab grab their way up to it, so they stay
+frame-exact.
+"""
+import cv2
+
+SAMPLING_MODES = ('read', 'grab', 'seek')
+DEFAULT_SAMPLING_MODE = 'grab'
+
+
+def get_fps(video_path):
+    """Frame rate reported by the video container (0.0 if unknown)"""
+    cap = cv2.VideoCapture(video_path)
+    try:
+        return cap.get(cv2.CAP_PROP_FPS) or 0.0
+    finally:
+        cap.release()
+
+
+def interval_from_seconds(video_path, seconds):
+    """
+    Frame interval matching a time interval
+
+    Raises:
+        ValueError: If the video does not report its frame rate
+    """
+    fps = get_fps(video_path)
+    if fps <= 0:
+        raise ValueError(f'Cannot read the frame rate of {video_path}')
+    return max(int(round(fps * seconds)), 1)
+
+
+def skip_frames(cap, count):
+    """Grab count frames without decoding them; returns the number grabbed"""
+    for skipped in range(count):
+        if not cap.grab():
+            return skipped
+    return count
+
+
+def read_frames(video_path, frame_interval, start=0):
+    """Decode every frame and yield every frame_interval-th one, from sampled frame start on"""
+    cap = cv2.VideoCapture(video_path)
+    frame_id = skip_frames(cap, start * frame_interval)
+    try:
+        while cap.isOpened():
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if frame_id % frame_interval == 0:
+                yield frame
+            frame_id += 1
+    finally:
+        cap.release()
+
+
+def grab_frames(video_path, frame_interval, start=0):
+    """Grab every frame but only retrieve every frame_interval-th one, from sampled frame start on"""
+    cap = cv2.VideoCapture(video_path)
+    frame_id = skip_frames(cap, start * frame_interval)
+    try:
+        while cap.isOpened():
+            if not cap.grab():
+                break
+            if frame_id % frame_interval == 0:
+                ret, frame = cap.retrieve()
+                if not ret:
+                    break
+                yield frame
+            frame_id += 1
+    finally:
+        cap.release()
+
+
+def seek_frames(video_path, frame_interval, start=0):
+    """Seek directly to every frame_interval-th frame, from sampled frame start on"""
+    cap = cv2.VideoCapture(video_path)
+    frame_id = start * frame_interval
+    try:
+        while cap.isOpened():
+            if frame_id > 0:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, frame_id)
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield frame
+            frame_id += frame_interval
+    finally:
+        cap.release()
+
+
+def get_frames(video_path, frame_interval, mode=DEFAULT_SAMPLING_MODE, start=0):
+    """
+    Yield every frame_interval-th frame of a video using the given sampling mode,
+    skipping the first start sampled frames
+
+    Raises:
+        ValueError: If mode is not one of SAMPLING_MODES
+    """
+    readers = {
+        'read': read_frames,
+        'grab': grab_frames,
+        'seek': seek_frames,
+    }
+    if mode not in readers:
+        raise ValueError(f'Unknown sampling mode: {mode}')
+    return readers[mode](video_path, max(frame_interval, 1), max(start, 0))
@@ -0,0 +1,41 @@
+"""
+Keep the ClassStudentSummary rollup and the Student/Class dimension tables in
+step with StudentData writes that go through the ORM one row at a time
+(admin, shell, tests). Bulk inserts do not send these signals and update the
+rollup and dimensions themselves.
+"""
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from .ingestion import register
+from .models import Enrollment, StudentData
+from .response_cache import bump_data_version
+from . import summary
+
+
+@receiver(pre_save, sender=StudentData)
+def register_on_save(sender, instance, raw, **kwargs):
+    """Register the student and class of a frame before it references them"""
+    if not raw:
+        register(instance.ClassID_id, [instance.studentID_id])
+
+
+@receiver(post_save, sender=StudentData)
+def update_summary_on_save(sender, instance, created, **kwargs):
+    """Fold a new frame into the rollup, or recompute it after an edit"""
+    if created:
+        summary.add_frames(instance.ClassID_id, [(instance.studentID_id, instance.Emotion)])
+    else:
+        summary.refresh(instance.ClassID_id, instance.studentID_id)
+
+
+@receiver(post_delete, sender=StudentData)
+def update_summary_on_delete(sender, instance, **kwargs):
+    """Recompute the rollup row a deleted frame belonged to"""
+    summary.refresh(instance.ClassID_id, instance.studentID_id)
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def update_version_on_enrollment(sender, **kwargs):
+    """Rosters change attendance rates, so cached responses are invalidated"""
+    bump_data_version()
@@ -0,0 +1,124 @@
+"""
+Streaming JSON and NDJSON output for the detail endpoints
+
+Entries are serialized one at a time as the rollup rows come in through a
+server-side cursor, so a full export runs in memory bounded by the largest
+single class or student rather than by the dataset. Output is buffered into
+chunks of roughly STREAM_BUFFER_SIZE bytes to avoid tiny writes.
+
+- json: the same map the non-streaming endpoint returns
+- ndjson: one JSON object per line, with the entry's ID under key_name
+
+astreaming_response does the same for the async views, from an async
+iterable of entries.
+"""
+import json
+from django.http import StreamingHttpResponse
+from rest_framework.settings import api_settings
+from rest_framework.utils.encoders import JSONEncoder
+
+STREAM_MODES = ('json', 'ndjson')
+# Rows fetched per round trip of the server-side cursor
+STREAM_CHUNK_SIZE = 2000
+STREAM_BUFFER_SIZE = 64 * 1024
+
+CONTENT_TYPES = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def dumps(value):
+    """Serialize a value the way DRF's JSONRenderer does"""
+    return json.dumps(
+        value,
+        cls=JSONEncoder,
+        ensure_ascii=not api_settings.UNICODE_JSON,
+        allow_nan=not api_settings.STRICT_JSON,
+        separators=(',', ':') if api_settings.COMPACT_JSON else (', ', ': ')
+    )
+
+
+def json_member(position, key, value):
+    return f'{"," if position else ""}{dumps(str(key))}:{dumps(value)}'
+
+
+def ndjson_line(key, value, key_name):
+    return dumps({key_name: key, **value}) + '\n'
+
+
+def iter_json(entries):
+    """Yield the parts of a JSON object built from (key, value) pairs"""
+    yield '{'
+    for position, (key, value) in enumerate(entries):
+        yield json_member(position, key, value)
+    yield '}'
+
+
+def iter_ndjson(entries, key_name):
+    """Yield one JSON line per (key, value) pair, with the key under key_name"""
+    for key, value in entries:
+        yield ndjson_line(key, value, key_name)
+
+
+def buffered(parts, size=STREAM_BUFFER_SIZE):
+    """Join text parts into UTF-8 chunks of at least size bytes (except the last)"""
+    buffer = []
+    buffered_size = 0
+    for part in parts:
+        buffer.append(part)
+        buffered_size += len(part)
+        if buffered_size >= size:
+            yield ''.join(buffer).encode()
+            buffer = []
+            buffered_size = 0
+    if buffer:
+        yield ''.join(buffer).encode()
+
+
+async def aiter_json(entries):
+    """iter_json over an async iterable"""
+    yield '{'
+    position = 0
+    async for key, value in entries:
+        yield json_member(position, key, value)
+        position += 1
+    yield '}'
+
+
+async def aiter_ndjson(entries, key_name):
+    """iter_ndjson over an async iterable"""
+    async for key, value in entries:
+        yield ndjson_line(key, value, key_name)
+
+
+async def abuffered(parts, size=STREAM_BUFFER_SIZE):
+    """buffered over an async iterable"""
+    buffer = []
+    buffered_size = 0
+    async for part in parts:
+        buffer.append(part)
+        buffered_size += len(part)
+        if buffered_size >= size:
+            yield ''.join(buffer).encode()
+            buffer = []
+            buffered_size = 0
+    if buffer:
+        yield ''.join(buffer).encode()
+
+
+def streaming_response(entries, mode, key_name):
+    """
+    Stream (key, value) entries as a JSON map or as NDJSON
+
+    Errors raised while iterating happen after the headers were sent and
+    cut the response short instead of turning it into a 500.
+    """
+    parts = iter_json(entries) if mode == 'json' else iter_ndjson(entries, key_name)
+    return StreamingHttpResponse(buffered(parts), content_type=CONTENT_TYPES[mode])
+
+
+def astreaming_response(entries, mode, key_name):
+    """streaming_response for an async iterable of entries"""
+    parts = aiter_json(entries) if mode == 'json' else aiter_ndjson(entries, key_name)
+    return StreamingHttpResponse(abuffered(parts), content_type=CONTENT_TYPES[mode])
@@ -0,0 +1,190 @@
+"""
+Maintenance of the ClassStudentSummary rollup
+
+Frames are folded into the rollup incrementally as they are inserted. The
+rollup can also be rebuilt from scratch and verified against the raw
+student_data table. Every change to the rollup bumps the data version, which
+invalidates the cached API responses.
+"""
+import math
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.utils import timezone
+from .emotions import EMOTIONS, SUM_FIELDS, emotion_dict, emotion_values
+from .models import StudentData, ClassStudentSummary
+from .aggregation import get_frame_counts, get_emotion_sums
+from .response_cache import bump_data_version
+
+
+def add_emotions(emotion_sums, emotions):
+    """
+    Add one frame's emotion scores into a running emotion sums dict
+
+    Emotions outside the fixed set and non-numeric scores are ignored, like
+    the emotion columns do.
+    """
+    for emotion, value in emotion_dict(emotion_values(emotions)).items():
+        emotion_sums[emotion] = emotion_sums.get(emotion, 0) + value
+
+
+def add_frames(class_id, frames):
+    """
+    Fold newly inserted frames of one class into the rollup
+
+    Args:
+        class_id: Class the frames belong to
+        frames: Iterable of (student_id, emotions) for each inserted frame
+    """
+    deltas = {}
+    for student_id, emotions in frames:
+        delta = deltas.setdefault(student_id, {'frame_count': 0, 'emotion_sums': {}})
+        delta['frame_count'] += 1
+        add_emotions(delta['emotion_sums'], emotions)
+
+    if not deltas:
+        return
+
+    with transaction.atomic():
+        # Make sure every row exists, then lock them so concurrent writers
+        # cannot lose each other's increments
+        ClassStudentSummary.objects.bulk_create(
+            [ClassStudentSummary(ClassID=class_id, studentID=student_id) for student_id in deltas],
+            ignore_conflicts=True
+        )
+        summaries = list(
+            ClassStudentSummary.objects
+            .select_for_update()
+            .filter(ClassID=class_id, studentID__in=list(deltas))
+        )
+
+        now = timezone.now()
+        for summary in summaries:
+            delta = deltas[summary.studentID]
+            summary.frame_count += delta['frame_count']
+            emotion_sums = summary.emotion_sums
+            for emotion, value in delta['emotion_sums'].items():
+                emotion_sums[emotion] = emotion_sums.get(emotion, 0) + value
+            summary.emotion_sums = emotion_sums
+            summary.updated_at = now
+
+        ClassStudentSummary.objects.bulk_update(summaries, ['frame_count', *SUM_FIELDS, 'updated_at'])
+        bump_data_version()
+
+
+def refresh(class_id, student_id):
+    """
+    Recompute the rollup row of one (class, student) from the raw table
+
+    Used when frames are edited or deleted, where no delta is available.
+    """
+    with transaction.atomic():
+        bump_data_version()
+        totals = (
+            StudentData.objects
+            .filter(ClassID=class_id, studentID=student_id)
+            .aggregate(
+                frame_count=Count('id'),
+                **{field: Sum(emotion) for field, emotion in zip(SUM_FIELDS, EMOTIONS)}
+            )
+        )
+        frame_count = totals.pop('frame_count')
+
+        if frame_count == 0:
+            ClassStudentSummary.objects.filter(ClassID=class_id, studentID=student_id).delete()
+            return
+
+        ClassStudentSummary.objects.update_or_create(
+            ClassID=class_id,
+            studentID=student_id,
+            defaults={'frame_count': frame_count, **totals}
+        )
+
+
+def compute_from_raw():
+    """
+    Compute the rollup contents from the raw table
+
+    Returns:
+        dict: {(class_id, student_id): (frame_count, emotion_sums)}
+    """
+    frame_counts = get_frame_counts()
+    _, student_sums = get_emotion_sums(class_totals=False)
+
+    return {
+        (class_id, student_id): (frames, student_sums.get(class_id, {}).get(student_id, {}))
+        for class_id, students in frame_counts.items()
+        for student_id, frames in students.items()
+    }
+
+
+def rebuild(batch_size=1000):
+    """
+    Replace the whole rollup with totals recomputed from the raw table
+
+    On PostgreSQL the rollup is locked against writes before the totals are
+    computed, so frames written meanwhile wait for the rebuild and then add
+    to the new rollup instead of being lost. Reads are not blocked.
+
+    Returns:
+        int: Number of rollup rows written
+    """
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {ClassStudentSummary._meta.db_table} IN EXCLUSIVE MODE')
+        expected = compute_from_raw()
+
+        ClassStudentSummary.objects.all().delete()
+        ClassStudentSummary.objects.bulk_create(
+            [
+                ClassStudentSummary(
+                    ClassID=class_id,
+                    studentID=student_id,
+                    frame_count=frame_count,
+                    emotion_sums=emotion_sums
+                )
+                for (class_id, student_id), (frame_count, emotion_sums) in expected.items()
+            ],
+            batch_size=batch_size
+        )
+        bump_data_version()
+    return len(expected)
+
+
+def verify(rel_tol=1e-9, abs_tol=1e-6):
+    """
+    Compare the rollup with totals recomputed from the raw table
+
+    Emotion sums are compared with a tolerance since the rollup adds frames in
+    insertion order while the database may sum them in any order.
+
+    Returns:
+        list: One human-readable string per mismatch
+    """
+    expected = compute_from_raw()
+    actual = {
+        (summary.ClassID, summary.studentID): (summary.frame_count, summary.emotion_sums)
+        for summary in ClassStudentSummary.objects.all()
+    }
+
+    mismatches = []
+    for key in sorted(expected.keys() | actual.keys()):
+        class_id, student_id = key
+        label = f'Class {class_id} - Student {student_id}'
+        if key not in actual:
+            mismatches.append(f'{label}: missing from rollup')
+            continue
+        if key not in expected:
+            mismatches.append(f'{label}: not present in raw data')
+            continue
+
+        expected_frames, expected_sums = expected[key]
+        actual_frames, actual_sums = actual[key]
+        if expected_frames != actual_frames:
+            mismatches.append(f'{label}: frame count {actual_frames}, expected {expected_frames}')
+        for emotion in sorted(expected_sums.keys() | actual_sums.keys()):
+            expected_value = expected_sums.get(emotion, 0)
+            actual_value = actual_sums.get(emotion, 0)
+            if not math.isclose(expected_value, actual_value, rel_tol=rel_tol, abs_tol=abs_tol):
+                mismatches.append(f'{label}: {emotion} sum {actual_value}, expected {expected_value}')
+    return mismatches
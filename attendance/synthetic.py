@@ -0,0 +1,129 @@
+"""
+Synthetic frame data for benchmarks and load tests
+
+Classes are filled with frames the way the video pipeline would write them:
+every student of the pool is on each class's roster, attends with some
+probability, and is then recognized in a share of the class's sampled
+frames. Emotion scores are percentages summing to 100 like DeepFace's. Each
+student has a mood of their own drawn around an emotion profile, and
+every frame varies around that mood.
+
+Rows go through the regular batched write path, so the rollup and the
+dimension tables are kept up to date, and generating the same classes again
+inserts nothing.
+"""
+from datetime import timedelta
+import numpy as np
+from django.db import transaction
+from django.utils import timezone
+from .emotions import EMOTIONS
+from .ingestion import write_frames
+from .models import Class
+from .response_cache import bump_data_version
+from .rosters import save_roster
+
+# Relative weight of each emotion, in EMOTIONS order
+EMOTION_PROFILES = {
+    'uniform': (1.0, 1.0, 1.0, 1.0, 1.0, 1.0, 1.0),
+    # Mostly neutral, some happy and sad, little of the rest
+    'classroom': (0.3, 0.1, 0.3, 3.0, 1.5, 0.5, 8.0),
+}
+DEFAULT_PROFILE = 'classroom'
+
+# Dirichlet concentrations: how far a student's mood strays from the
+# profile, and a frame from the student's mood; higher values stay closer
+MOOD_CONCENTRATION = 10.0
+FRAME_CONCENTRATION = 50.0
+
+
+def student_ids(students):
+    """IDs of a pool of synthetic students"""
+    return [f'STU{number:05d}' for number in range(1, students + 1)]
+
+
+def generate_class(rng, class_id, students, frames, attendance, presence, moods):
+    """
+    Frames of one class
+
+    Args:
+        rng: numpy Generator
+        class_id: Class the frames belong to
+        students: IDs of the students on the roster
+        frames: Sampled frames in the class
+        attendance: Probability that a student attends the class
+        presence: Probability that an attending student is recognized in a frame
+        moods: (len(students), len(EMOTIONS)) Dirichlet parameters per student
+
+    Yields:
+        tuple: (student_id, frame_id, emotions) as taken by write_frames
+    """
+    attending = np.flatnonzero(rng.random(len(students)) < attendance)
+    for index in attending:
+        frame_ids = np.flatnonzero(rng.random(frames) < presence)
+        scores = rng.dirichlet(moods[index], size=len(frame_ids)) * 100
+        for frame_id, frame_scores in zip(frame_ids.tolist(), scores.tolist()):
+            yield students[index], frame_id, dict(zip(EMOTIONS, frame_scores))
+
+
+def generate(classes, students, frames, attendance=0.9, presence=0.8, profile=DEFAULT_PROFILE,
+             first_class_id=1, start=None, roster=True, seed=0, batch_size=5000, on_class=None):
+    """
+    Generate and write synthetic frames for a range of classes
+
+    Args:
+        classes: Number of classes, with IDs from first_class_id on
+        students: Size of the student pool, all enrolled in every class
+        frames: Sampled frames per class
+        attendance: Probability that a student attends a class
+        presence: Probability that an attending student is recognized in a frame
+        profile: Name of an EMOTION_PROFILES entry
+        first_class_id: ID of the first class
+        start: When the first class is held, one class per day after
+            it (default: classes days ago)
+        roster: Enroll the student pool in every class
+        seed: Random seed; the same arguments always produce the same data
+        batch_size: Rows per write batch
+        on_class: Optional callable(class_id, inserted, skipped) called after
+            each class
+
+    Returns:
+        tuple: (rows inserted, rows skipped as already present)
+
+    Raises:
+        ValueError: If profile is unknown
+    """
+    if profile not in EMOTION_PROFILES:
+        raise ValueError(f'Unknown emotion profile: {profile}')
+
+    rng = np.random.default_rng(seed)
+    pool = student_ids(students)
+    weights = np.asarray(EMOTION_PROFILES[profile])
+    moods = rng.dirichlet(weights / weights.sum() * MOOD_CONCENTRATION, size=len(pool))
+    moods = np.maximum(moods, 1e-3) * FRAME_CONCENTRATION
+    if start is None:
+        start = timezone.now() - timedelta(days=classes)
+
+    class_ids = range(first_class_id, first_class_id + classes)
+    if roster:
+        save_roster((class_id, student_id, '') for class_id in class_ids for student_id in pool)
+
+    total_inserted = 0
+    total_skipped = 0
+    for day, class_id in enumerate(class_ids):
+        rows = generate_class(rng, class_id, pool, frames, attendance, presence, moods)
+        inserted = skipped = 0
+        for batch_inserted, batch_skipped in write_frames(class_id, rows, batch_size):
+            inserted += batch_inserted
+            skipped += batch_skipped
+        if inserted:
+            # Spread classes over days so the from/to filters have something to
+            # select. update() sends no signals, hence the explicit bump.
+            with transaction.atomic():
+                Class.objects.filter(ClassID=class_id).update(held_at=start + timedelta(days=day))
+                bump_data_version()
+
+        total_inserted += inserted
+        total_skipped += skipped
+        if on_class is not None:
+            on_class(class_id, inserted, skipped)
+    return total_inserted, total_skipped
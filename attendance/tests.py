@@ -1,8 +1,41 @@
-from django.test import TestCase
-from django.urls import reverse
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from urllib.parse import parse_qs, urlsplit
+import cv2
+import numpy as np
+from unittest import mock, skipUnless
+from asgiref.sync import async_to_sync
+from django.test import LiveServerTestCase, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.urls import resolve, reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
-from .models import StudentData
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connection, connections
+from .models import Class, ClassStudentSummary, DataVersion, Enrollment, Session, Student, StudentData
+from .emotions import DominantEmotion
+from .response_cache import RESPONSE_CACHE_ALIAS, get_data_version
+from .ingestion import write_frames
+from .face_index import FaceIndex, get_face_index, normalize
+from .face_analysis import FaceAnalyzer, crop_face, first_face
+from .pipeline import VideoPipeline
+from .checkpoint import IngestionState
+from .sampling import get_frames, interval_from_seconds
+from .management.commands import add_class_data_batch
+from .management.commands.add_class_data_batch import load_manifest
+from .management.commands import benchmark_connections
+from .management.commands.add_class_data import Command as AddClassDataCommand
+from .management.commands.benchmark_ingestion import Command as BenchmarkIngestionCommand
+from .rosters import save_roster
+from attendance_system.settings import parse_view_timeouts
+from . import async_views, database, identity, ingestion_benchmark, instrumentation, partitions, recognition, summary, synthetic
 
 
 class StudentDataModelTest(TestCase):
@@ -11,23 +44,800 @@ class StudentDataModelTest(TestCase):
     def setUp(self):
         """Set up test data"""
         self.student_data = StudentData.objects.create(
-            studentID="STU001",
+            studentID_id="STU001",
             FramID=1,
-            ClassID=101,
+            ClassID_id=101,
             Emotion={"happy": 0.8, "sad": 0.1, "neutral": 0.1}
         )
     
     def test_student_data_creation(self):
         """Test that StudentData can be created"""
-        self.assertEqual(self.student_data.studentID, "STU001")
+        self.assertEqual(self.student_data.studentID_id, "STU001")
         self.assertEqual(self.student_data.FramID, 1)
-        self.assertEqual(self.student_data.ClassID, 101)
+        self.assertEqual(self.student_data.ClassID_id, 101)
         self.assertEqual(self.student_data.Emotion["happy"], 0.8)
     
     def test_string_representation(self):
         """Test the string representation of StudentData"""
         expected = "Student STU001 - Class 101 - Frame 1"
         self.assertEqual(str(self.student_data), expected)
+    
+    def test_emotion_columns(self):
+        """Test that Emotion is stored in the emotion columns with its dominant emotion"""
+        frame = StudentData.objects.get(pk=self.student_data.pk)
+        self.assertEqual(frame.happy, 0.8)
+        self.assertIsNone(frame.angry)
+        self.assertEqual(frame.dominant_emotion, DominantEmotion.HAPPY)
+        self.assertEqual(frame.Emotion, {"happy": 0.8, "sad": 0.1, "neutral": 0.1})
+        
+        frame.Emotion = {"fear": 0.5, "sad": 0.5, "confused": 1.0, "neutral": "high"}
+        self.assertEqual(frame.Emotion, {"fear": 0.5, "sad": 0.5})
+        self.assertEqual(frame.dominant_emotion, DominantEmotion.FEAR)
+        
+        frame.Emotion = None
+        self.assertEqual(frame.Emotion, {})
+        self.assertIsNone(frame.dominant_emotion)
+
+
+class ClassStudentSummaryTest(TestCase):
+    """Test cases for the ClassStudentSummary rollup"""
+    
+    def setUp(self):
+        """Set up test data"""
+        self.first_frame = StudentData.objects.create(
+            studentID_id="STU001",
+            FramID=1,
+            ClassID_id=101,
+            Emotion={"happy": 0.8, "sad": 0.2}
+        )
+        StudentData.objects.create(
+            studentID_id="STU001",
+            FramID=2,
+            ClassID_id=101,
+            Emotion={"happy": 0.4, "neutral": 0.6}
+        )
+    
+    def test_rollup_follows_inserts(self):
+        """Test that inserted frames are folded into the rollup"""
+        rollup = ClassStudentSummary.objects.get(ClassID=101, studentID="STU001")
+        self.assertEqual(rollup.frame_count, 2)
+        self.assertAlmostEqual(rollup.emotion_sums["happy"], 1.2)
+        self.assertAlmostEqual(rollup.emotion_sums["neutral"], 0.6)
+    
+    def test_rollup_follows_updates_and_deletes(self):
+        """Test that edited and deleted frames are recomputed in the rollup"""
+        self.first_frame.Emotion = {"happy": 0.1}
+        self.first_frame.save()
+        rollup = ClassStudentSummary.objects.get(ClassID=101, studentID="STU001")
+        self.assertAlmostEqual(rollup.emotion_sums["happy"], 0.5)
+        self.assertNotIn("sad", rollup.emotion_sums)
+        
+        StudentData.objects.filter(ClassID=101).delete()
+        self.assertFalse(ClassStudentSummary.objects.exists())
+    
+    def test_add_frames(self):
+        """Test that bulk-inserted frames can be folded in as one delta"""
+        summary.add_frames(101, [
+            ("STU001", {"happy": 1.0}),
+            ("STU002", {"sad": 0.5}),
+            ("STU002", "not a dict"),
+        ])
+        
+        first = ClassStudentSummary.objects.get(ClassID=101, studentID="STU001")
+        second = ClassStudentSummary.objects.get(ClassID=101, studentID="STU002")
+        self.assertEqual(first.frame_count, 3)
+        self.assertAlmostEqual(first.emotion_sums["happy"], 2.2)
+        self.assertEqual(second.frame_count, 2)
+        self.assertEqual(second.emotion_sums, {"sad": 0.5})
+    
+    def test_rebuild_and_verify(self):
+        """Test that a drifted rollup is reported and fixed by a rebuild"""
+        ClassStudentSummary.objects.update(frame_count=7)
+        self.assertEqual(len(summary.verify()), 1)
+        
+        call_command('rebuild_class_summary', stdout=io.StringIO())
+        self.assertEqual(summary.verify(), [])
+        self.assertEqual(ClassStudentSummary.objects.get().frame_count, 2)
+    
+    def test_check_only_command_fails_on_mismatch(self):
+        """Test that the check-only command errors out on a drifted rollup"""
+        ClassStudentSummary.objects.all().delete()
+        with self.assertRaises(CommandError):
+            call_command('rebuild_class_summary', '--check-only', stdout=io.StringIO())
+
+
+@skipUnless(connection.vendor == 'postgresql', 'The rebuild only locks the rollup on PostgreSQL')
+class ClassStudentSummaryRebuildTest(TransactionTestCase):
+    """Test cases for rebuilding the rollup while frames are written"""
+    
+    def test_frames_written_during_rebuild_are_kept(self):
+        """Test that a writer waits for a running rebuild and adds to the new rollup"""
+        list(write_frames(101, [("STU001", 1, {"happy": 1.0})]))
+        computed = threading.Event()
+        proceed = threading.Event()
+        compute_from_raw = summary.compute_from_raw
+        
+        def compute_and_wait():
+            expected = compute_from_raw()
+            computed.set()
+            proceed.wait(5)
+            return expected
+        
+        def in_thread(function):
+            def run():
+                try:
+                    function()
+                finally:
+                    connection.close()
+            thread = threading.Thread(target=run)
+            thread.start()
+            return thread
+        
+        with mock.patch.object(summary, 'compute_from_raw', compute_and_wait):
+            rebuild = in_thread(summary.rebuild)
+            self.assertTrue(computed.wait(5))
+            writer = in_thread(lambda: list(write_frames(101, [("STU001", 2, {"happy": 1.0})])))
+            writer.join(0.3)
+            self.assertTrue(writer.is_alive())
+            proceed.set()
+            rebuild.join(5)
+            writer.join(5)
+        
+        self.assertEqual(summary.verify(), [])
+        self.assertEqual(ClassStudentSummary.objects.get().frame_count, 2)
+
+
+class WriteFramesTest(TestCase):
+    """Test cases for the batched frame write path"""
+    
+    def test_write_frames_is_idempotent(self):
+        """Test that re-writing the same frames skips them without duplicates"""
+        frames = [
+            ("STU001", frame_id, {"happy": 0.5, "sad": 0.5})
+            for frame_id in range(5)
+        ]
+        
+        self.assertEqual(list(write_frames(101, frames, batch_size=2)), [(2, 0), (2, 0), (1, 0)])
+        self.assertEqual(
+            list(write_frames(101, frames + [("STU002", 0, {"happy": 1.0})], batch_size=10)),
+            [(1, 5)]
+        )
+        
+        self.assertEqual(StudentData.objects.count(), 6)
+        self.assertEqual(ClassStudentSummary.objects.get(studentID="STU001").frame_count, 5)
+        self.assertEqual(summary.verify(), [])
+        self.assertEqual(list(Student.objects.values_list('studentID', flat=True)), ["STU001", "STU002"])
+        self.assertEqual(list(Class.objects.values_list('ClassID', flat=True)), [101])
+    
+    def test_write_frames_skips_duplicates_within_batch(self):
+        """Test that a frame repeated inside one batch is written once"""
+        frames = [
+            ("STU001", 1, {"happy": 1.0}),
+            ("STU001", 1, {"sad": 1.0}),
+        ]
+        
+        self.assertEqual(list(write_frames(101, frames)), [(1, 1)])
+        self.assertEqual(StudentData.objects.get().Emotion, {"happy": 1.0})
+    
+    def test_unique_frame_constraint(self):
+        """Test that the database rejects a duplicate (student, class, frame)"""
+        StudentData.objects.create(studentID_id="STU001", FramID=1, ClassID_id=101, Emotion={})
+        with self.assertRaises(IntegrityError):
+            StudentData.objects.create(studentID_id="STU001", FramID=1, ClassID_id=101, Emotion={})
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Partitioning needs PostgreSQL')
+class StudentDataPartitionTest(TestCase):
+    """Test cases for the ClassID range partitions of student_data"""
+    
+    def setUp(self):
+        for class_id in (5, 105, 250):
+            list(write_frames(class_id, [("STU001", 1, {"happy": 1.0}), ("STU002", 1, {"sad": 1.0})]))
+    
+    def count_rows(self, table):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {connection.ops.quote_name(table)}')
+            return cursor.fetchone()[0]
+    
+    def test_create_partition_moves_rows(self):
+        """Test that a new partition takes over its range from the default partition"""
+        self.assertTrue(partitions.is_partitioned())
+        
+        name, moved = partitions.create_partition(100, 200)
+        
+        self.assertEqual((name, moved), ('student_data_c100_200', 2))
+        self.assertEqual(self.count_rows(name), 2)
+        self.assertEqual(self.count_rows(partitions.DEFAULT_PARTITION), 4)
+        self.assertEqual(
+            [partition for partition, _, _ in partitions.list_partitions()],
+            ['student_data_c100_200', 'student_data_default']
+        )
+        list(write_frames(150, [("STU001", 1, {"happy": 1.0})]))
+        self.assertEqual(self.count_rows(name), 3)
+        self.assertEqual(StudentData.objects.filter(ClassID=105).count(), 2)
+    
+    def test_detach_partition_archives_class_range(self):
+        """Test that detaching removes the range from the table, the rollup and the rosters"""
+        save_roster([(105, "STU001", ""), (105, "STU003", ""), (5, "STU003", "")])
+        name, _ = partitions.create_partition(100, 200)
+        
+        self.assertEqual(partitions.detach_partition(name), (2, 2))
+        
+        self.assertEqual(self.count_rows(name), 2)
+        self.assertFalse(StudentData.objects.filter(ClassID=105).exists())
+        self.assertEqual(summary.verify(), [])
+        self.assertEqual(list(Enrollment.objects.values_list('ClassID', 'studentID')), [(5, "STU003")])
+        response = self.client.get(reverse('attendance:attendance-status'))
+        self.assertNotIn(105, [entry['classID'] for entry in response.json()])
+        with self.assertRaises(partitions.PartitionError):
+            partitions.detach_partition(partitions.DEFAULT_PARTITION)
+    
+    def test_partitions_carry_query_indexes(self):
+        """Test that every partition has a valid copy of the composite indexes"""
+        partitions.create_partition(100, 200)
+        
+        with connection.cursor() as cursor:
+            cursor.execute(
+                """
+                SELECT parent.relname, index.indisvalid
+                FROM pg_inherits
+                JOIN pg_class AS parent ON parent.oid = pg_inherits.inhparent
+                JOIN pg_index AS index ON index.indexrelid = pg_inherits.inhrelid
+                WHERE index.indrelid = to_regclass(%s)
+                """,
+                ['student_data_c100_200']
+            )
+            indexes = dict(cursor.fetchall())
+        self.assertTrue(indexes['student_data_class_student_idx'])
+
+
+def stub_embedding(path):
+    """Deterministic fake embedding taken from the first bytes of an image file"""
+    with open(path, 'rb') as f:
+        return np.frombuffer(f.read(4), dtype=np.uint8).astype(np.float32)
+
+
+class FaceIndexTest(SimpleTestCase):
+    """Test cases for the gallery embedding index"""
+    
+    def setUp(self):
+        """Set up a small gallery with a stub embedding per image"""
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.db_path = os.path.join(self.tmp.name, 'db')
+        self.index_path = os.path.join(self.tmp.name, 'index')
+        self.write_image('STU001', 'a.jpg', bytes([9, 1, 0, 0]))
+        self.write_image('STU001', 'b.jpg', bytes([8, 2, 0, 0]))
+        self.write_image('STU002', 'a.jpg', bytes([0, 0, 9, 1]))
+    
+    def write_image(self, student, name, content):
+        os.makedirs(os.path.join(self.db_path, student), exist_ok=True)
+        with open(os.path.join(self.db_path, student, name), 'wb') as f:
+            f.write(content)
+    
+    def test_build_and_search(self):
+        """Test that the closest gallery images are returned with cosine distances"""
+        index, embedded, reused = FaceIndex.build(self.db_path, self.index_path, stub_embedding)
+        self.assertEqual((embedded, reused), (3, 0))
+        
+        loaded = FaceIndex.load(self.index_path)
+        self.assertEqual(loaded.labels, ['STU001', 'STU001', 'STU002'])
+        
+        matches = loaded.search(np.array([9, 1, 0, 0]), k=2, threshold=None)
+        self.assertEqual([label for label, _ in matches], ['STU001', 'STU001'])
+        self.assertAlmostEqual(matches[0][1], 0.0, places=6)
+        
+        # Images further away than the threshold are not reported
+        matches = loaded.search(np.array([0, 0, 1, 0]), k=3)
+        self.assertEqual([label for label, _ in matches], ['STU002'])
+    
+    def test_stale_index_is_rebuilt_incrementally(self):
+        """Test that gallery changes are detected and only changed images are embedded"""
+        index, _, _ = FaceIndex.build(self.db_path, self.index_path, stub_embedding)
+        self.assertFalse(index.is_stale(self.db_path))
+        
+        self.write_image('STU003', 'a.jpg', bytes([0, 9, 9, 0]))
+        self.assertTrue(index.is_stale(self.db_path))
+        
+        index = get_face_index(self.db_path, self.index_path, stub_embedding)
+        self.assertEqual(len(index), 4)
+        self.assertFalse(index.is_stale(self.db_path))
+        
+        _, embedded, reused = FaceIndex.build(
+            self.db_path, self.index_path, stub_embedding, previous=index
+        )
+        self.assertEqual((embedded, reused), (0, 4))
+
+
+class FaceAnalyzerTest(SimpleTestCase):
+    """Test cases for the per-detection face analysis stage"""
+    
+    def test_crop_face_clips_to_frame(self):
+        """Test that a centered box is cropped and clipped at the frame border"""
+        frame = np.arange(10 * 20 * 3).reshape(10, 20, 3)
+        self.assertEqual(crop_face(frame, (10, 5, 4, 4)).shape, (4, 4, 3))
+        self.assertEqual(crop_face(frame, (1, 1, 6, 6)).shape, (4, 4, 3))
+    
+    def test_get_top_matches_searches_whole_batch(self):
+        """Test that a batch of crops is embedded once and matched row by row"""
+        index = FaceIndex(normalize(np.array([[1, 0], [0, 1]])), ['STU001', 'STU002'], {})
+        analyzer = FaceAnalyzer(index, top_k=1)
+        calls = []
+        analyzer.get_embeddings = lambda crops: calls.append(len(crops)) or np.array([[0, 1], [1, 0], [0, 3]])
+        
+        matches = analyzer.get_top_matches([np.zeros((2, 2, 3))] * 3)
+        
+        self.assertEqual(calls, [3])
+        self.assertEqual([match[0][0] for match in matches], ['STU002', 'STU001', 'STU002'])
+    
+    def test_first_face_accepts_batch_and_single_results(self):
+        """Test that both DeepFace result shapes are unwrapped"""
+        self.assertEqual(first_face([{'emotion': {}}]), {'emotion': {}})
+        self.assertEqual(first_face({'emotion': {}}), {'emotion': {}})
+
+
+class VideoPipelineTest(SimpleTestCase):
+    """Test cases for the staged ingestion pipeline"""
+    
+    def test_pipeline_preserves_order(self):
+        """Test that detection sees frames in order and batches reach the sink in order"""
+        frames = [np.full((4, 4, 3), frame_id) for frame_id in range(10)]
+        detected = []
+        received = []
+        
+        def detect(frame):
+            detected.append(int(frame[0, 0, 0]))
+            return [(1, (2, 2, 2, 2)), (2, (2, 2, 2, 2))]
+        
+        def analyze(crops):
+            # Later batches finish first
+            time.sleep(0.01 * (10 - int(crops[0][0, 0, 0])))
+            return [int(crop[0, 0, 0]) for crop in crops]
+        
+        VideoPipeline(
+            frames=iter(frames),
+            detect=detect,
+            analyze=analyze,
+            sink=lambda faces, results: received.extend(zip(faces, results)),
+            batch_size=3,
+            analysis_workers=4,
+            frame_queue_size=2,
+            batch_queue_size=2,
+        ).run()
+        
+        self.assertEqual(detected, list(range(10)))
+        self.assertEqual(
+            received,
+            [((track_id, frame_id), frame_id) for frame_id in range(10) for track_id in (1, 2)]
+        )
+    
+    def test_pipeline_reraises_stage_errors(self):
+        """Test that a failing stage stops the pipeline and surfaces its error"""
+        def analyze(crops):
+            raise ValueError('model failed')
+        
+        pipeline = VideoPipeline(
+            frames=(np.zeros((4, 4, 3)) for _ in range(100)),
+            detect=lambda frame: [(1, (2, 2, 2, 2))],
+            analyze=analyze,
+            sink=lambda faces, results: None,
+            batch_size=1,
+        )
+        with self.assertRaisesMessage(ValueError, 'model failed'):
+            pipeline.run()
+
+
+class FrameSamplingTest(SimpleTestCase):
+    """Test cases for the frame sampling modes"""
+    
+    @classmethod
+    def setUpClass(cls):
+        """Write a short synthetic video whose frames are all different"""
+        super().setUpClass()
+        cls.tmp = tempfile.TemporaryDirectory()
+        cls.video_path = os.path.join(cls.tmp.name, 'video.avi')
+        writer = cv2.VideoWriter(cls.video_path, cv2.VideoWriter_fourcc(*'MJPG'), 10, (64, 48))
+        for frame_id in range(25):
+            frame = np.zeros((48, 64, 3), dtype=np.uint8)
+            frame[:, :frame_id * 2] = 255
+            writer.write(frame)
+        writer.release()
+    
+    @classmethod
+    def tearDownClass(cls):
+        cls.tmp.cleanup()
+        super().tearDownClass()
+    
+    def test_modes_return_the_same_frames(self):
+        """Test that grab and seek sampling return the frames the exhaustive reader returns"""
+        reference = list(get_frames(self.video_path, 10, 'read'))
+        self.assertEqual(len(reference), 3)
+        
+        for mode in ('grab', 'seek'):
+            frames = list(get_frames(self.video_path, 10, mode))
+            self.assertEqual(len(frames), len(reference), mode)
+            for frame, expected in zip(frames, reference):
+                self.assertTrue(np.array_equal(frame, expected), mode)
+    
+    def test_modes_start_at_a_later_sampled_frame(self):
+        """Test that every mode can resume part way into the video"""
+        reference = list(get_frames(self.video_path, 5, 'read'))
+        for mode in ('read', 'grab', 'seek'):
+            frames = list(get_frames(self.video_path, 5, mode, start=2))
+            self.assertEqual(len(frames), len(reference) - 2, mode)
+            for frame, expected in zip(frames, reference[2:]):
+                self.assertTrue(np.array_equal(frame, expected), mode)
+    
+    def test_interval_from_seconds(self):
+        """Test that a time interval is converted with the video frame rate"""
+        self.assertEqual(interval_from_seconds(self.video_path, 0.5), 5)
+        self.assertEqual(interval_from_seconds(self.video_path, 0.01), 1)
+    
+    def test_unknown_mode(self):
+        """Test that an unknown sampling mode is rejected"""
+        with self.assertRaises(ValueError):
+            get_frames(self.video_path, 10, 'skip')
+
+
+class IngestionBenchmarkTest(TestCase):
+    """Test cases for the offline ingestion benchmark harness"""
+    
+    def test_stubs_track_and_identify_synthetic_faces(self):
+        """Test that the stub detector and analyzer recognize every synthetic face"""
+        with tempfile.TemporaryDirectory() as tmp:
+            video = ingestion_benchmark.make_video(os.path.join(tmp, 'video.avi'), frames=10, faces=5)
+            gallery = ingestion_benchmark.make_gallery(os.path.join(tmp, 'gallery'), students=5)
+            index, _, _ = FaceIndex.build(gallery, os.path.join(tmp, 'index'), embed=ingestion_benchmark.stub_embedding)
+            analyzer = ingestion_benchmark.StubFaceAnalyzer(index)
+            detector = ingestion_benchmark.StubDetector()
+            
+            students_per_track = {}
+            for frame in get_frames(video, 3):
+                detections = detector(frame)
+                self.assertEqual(len(detections), 5)
+                crops = [crop_face(frame, box) for _, box in detections]
+                emotions, matches = analyzer.get_emotions(crops), analyzer.get_top_matches(crops)
+                self.assertAlmostEqual(sum(emotions[0].values()), 100.0)
+                for (track_id, _), top_match in zip(detections, matches):
+                    students_per_track.setdefault(track_id, set()).add(top_match[0][0])
+        
+        self.assertEqual(len(students_per_track), 5)
+        self.assertTrue(all(len(students) == 1 for students in students_per_track.values()))
+        self.assertEqual(len(set.union(*students_per_track.values())), 5)
+    
+    def test_benchmark_ingestion_reports_stages(self):
+        """Test that the benchmark times every stage and rolls its rows back"""
+        out = io.StringIO()
+        call_command('benchmark_ingestion', '--frames', '20', '--faces', '2', '--json', stdout=out)
+        results = json.loads(out.getvalue())
+        
+        self.assertEqual(results['models'], 'stub')
+        self.assertEqual(results['frames'], 4)
+        self.assertEqual(results['faces'], 8)
+        self.assertEqual(list(results['stages']), ['read', 'detect', 'emotion', 'identify', 'resolve', 'write'])
+        self.assertGreater(results['rowsInserted'], 0)
+        self.assertFalse(StudentData.objects.exists())
+
+
+class ResumableIngestionTest(TestCase):
+    """Test cases for checkpointed, resumable video ingestion"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.video = ingestion_benchmark.make_video(os.path.join(self.tmp.name, 'video.avi'), frames=60, faces=2)
+        self.gallery = ingestion_benchmark.make_gallery(os.path.join(self.tmp.name, 'gallery'), students=2)
+        self.state_path = os.path.join(self.tmp.name, 'state.json')
+    
+    def get_command(self, *args):
+        """add_class_data command with the benchmark's stub models, and its options"""
+        benchmark = BenchmarkIngestionCommand()
+        options = vars(benchmark.create_parser('manage.py', 'benchmark_ingestion').parse_args([
+            '--batch-size', '2', '--checkpoint-interval', '2', *args
+        ]))
+        options['checkpoint'] = self.state_path
+        command, _, _ = benchmark.get_command(self.gallery, os.path.join(self.tmp.name, 'index'), io.StringIO(), options)
+        return command, options
+    
+    def crash_after(self, command, batches):
+        """Make the command's analysis fail after a number of batches"""
+        analyze_faces = command.analyze_faces
+        analyzed = []
+        
+        def analyze_or_crash(crops, *args):
+            analyzed.append(len(crops))
+            if len(analyzed) > batches:
+                raise MemoryError('out of memory')
+            return analyze_faces(crops, *args)
+        
+        command.analyze_faces = analyze_or_crash
+    
+    def test_track_state_round_trip(self):
+        """Test that stale tracks are closed and open ones survive a checkpoint"""
+        state = IngestionState('video.avi', 101, 5, 'grab', session_id=7)
+        state.add([(1, 0), (2, 0)], [({'happy': 1.0}, [('STU001', 0.2)]), ({'sad': 1.0}, [])])
+        state.add([(1, 3)], [({'happy': 2.0}, [('STU001', 0.3), ('STU002', 0.5)])])
+        
+        self.assertEqual(state.next_frame, 4)
+        self.assertEqual(state.stale_tracks(2), [2])
+        state.save(self.state_path)
+        
+        loaded = IngestionState.load(self.state_path)
+        self.assertEqual(loaded.to_dict(), state.to_dict())
+        self.assertEqual(loaded.votes[1], {'STU001': [2, 0.5], 'STU002': [1, 0.5]})
+        
+        track_votes, rows = loaded.pop_tracks([2])
+        self.assertEqual(track_votes, {2: {}})
+        self.assertEqual(rows, [(2, 0, {'sad': 1.0})])
+        self.assertEqual(list(loaded.last_seen), [1])
+        
+        with self.assertRaisesMessage(ValueError, 'class ID 101, not 102'):
+            loaded.check('video.avi', 102, 5, 'grab')
+        self.assertIsNone(IngestionState.load(os.path.join(self.tmp.name, 'missing.json')))
+    
+    def test_resume_after_crash_writes_every_frame_once(self):
+        """Test that a run interrupted part way resumes from its checkpoint"""
+        command, options = self.get_command('--lock-min-votes', '0')
+        expected_rows, _ = command.process_video(self.video, 101, options)
+        expected = set(StudentData.objects.filter(ClassID=101).values_list('studentID', 'FramID'))
+        self.assertEqual(expected_rows, 24)
+        self.assertFalse(os.path.exists(self.state_path))
+        
+        # Tracks stay undecided, so every row waits in the checkpoint
+        command, options = self.get_command('--lock-min-votes', '0')
+        self.crash_after(command, 5)
+        with self.assertRaises(MemoryError):
+            command.process_video(self.video, 102, options)
+        
+        state = IngestionState.load(self.state_path)
+        self.assertEqual(state.next_frame, 4)
+        self.assertEqual(sum(len(rows) for rows in state.rows.values()), 8)
+        
+        command, options = self.get_command('--resume', '--lock-min-votes', '0')
+        inserted, skipped = command.process_video(self.video, 102, options)
+        
+        self.assertEqual(inserted, 24)
+        self.assertEqual(
+            set(StudentData.objects.filter(ClassID=102).values_list('studentID', 'FramID')),
+            expected
+        )
+        session = Session.objects.get(ClassID=102)
+        self.assertEqual(session.frames_inserted, 24)
+        self.assertIsNotNone(session.finished_at)
+        self.assertFalse(os.path.exists(self.state_path))
+    
+    def test_confident_tracks_are_written_before_the_video_ends(self):
+        """Test that locked tracks are flushed as they go and match the end-of-video resolution"""
+        command, options = self.get_command('--lock-min-votes', '0')
+        command.process_video(self.video, 101, options)
+        expected = set(StudentData.objects.filter(ClassID=101).values_list('studentID', 'FramID'))
+        
+        command, options = self.get_command(
+            '--lock-min-votes', '4', '--lock-margin', '0.2', '--write-batch-size', '1', '--checkpoint-interval', '0'
+        )
+        self.crash_after(command, 5)
+        with self.assertRaises(MemoryError):
+            command.process_video(self.video, 102, options)
+        
+        written = set(StudentData.objects.filter(ClassID=102).values_list('studentID', 'FramID'))
+        # Both tracks lock within the five frames analyzed before the crash
+        self.assertEqual(len(written), 10)
+        self.assertLessEqual(written, expected)
+        
+        command, options = self.get_command('--lock-min-votes', '4', '--lock-margin', '0.2')
+        out = io.StringIO()
+        command.stdout = out
+        command.process_video(self.video, 103, options)
+        self.assertIn('Tracks: 2 locked early, 0 resolved when they ended', out.getvalue())
+        self.assertEqual(
+            set(StudentData.objects.filter(ClassID=103).values_list('studentID', 'FramID')),
+            expected
+        )
+    
+    def test_held_at_dates_the_class(self):
+        """Test that a class is dated by --held-at, or else by when its frames are written"""
+        command, options = self.get_command()
+        before = datetime.now(dt_timezone.utc)
+        command.process_video(self.video, 101, options)
+        options['held_at'] = datetime(2026, 3, 2, 9, tzinfo=dt_timezone.utc)
+        command.process_video(self.video, 102, options)
+        
+        self.assertGreaterEqual(Class.objects.get(ClassID=101).held_at, before)
+        self.assertEqual(Class.objects.get(ClassID=102).held_at, options['held_at'])
+    
+    def test_skipping_recognition_keeps_identities(self):
+        """Test that reusing track matches writes the same rows with fewer searches"""
+        command, options = self.get_command('--lock-min-votes', '0')
+        command.process_video(self.video, 101, options)
+        expected = set(StudentData.objects.filter(ClassID=101).values_list('studentID', 'FramID'))
+        
+        command, options = self.get_command('--lock-min-votes', '0', '--recognize-every', '4')
+        out = io.StringIO()
+        command.stdout = out
+        command.process_video(self.video, 102, options)
+        
+        self.assertEqual(command.recognition.stats(), {'faces': 24, 'recognized': 6, 'skipped': 18, 'drifted': 0})
+        self.assertIn('Recognition: 6 of 24 faces identified, 18 reused', out.getvalue())
+        self.assertEqual(
+            set(StudentData.objects.filter(ClassID=102).values_list('studentID', 'FramID')),
+            expected
+        )
+    
+    def test_resume_rejects_checkpoint_of_another_run(self):
+        """Test that a checkpoint is only resumed with the settings it was taken with"""
+        IngestionState(self.video, 101, 5, 'grab').save(self.state_path)
+        command, options = self.get_command('--resume', '--frame-interval', '10')
+        with self.assertRaisesMessage(CommandError, 'frame interval 5, not 10'):
+            command.process_video(self.video, 101, options)
+
+
+class IdentityResolutionTest(SimpleTestCase):
+    """Test cases for resolving tracks to students from their match votes"""
+    
+    def tally(self, matches):
+        votes = {}
+        for student_id, distance in matches:
+            identity.add_vote(votes, student_id, distance)
+        return votes
+    
+    def test_most_votes_win_then_lowest_average_distance(self):
+        """Test that a track resolves to its most frequent match, closer on a tie"""
+        votes = self.tally([('STU001', 0.4), ('STU002', 0.1), ('STU001', 0.4), ('STU003', 0.2), ('STU003', 0.3)])
+        self.assertEqual(votes['STU001'], [2, 0.8])
+        self.assertEqual(identity.best_match(votes), 'STU003')
+        self.assertIsNone(identity.best_match({}))
+    
+    def test_track_mapping_keeps_the_best_student(self):
+        """Test that a later, weaker candidate does not replace the best one"""
+        mapping = AddClassDataCommand().get_track_id_student_mapping({
+            1: self.tally([('STU001', 0.2), ('STU001', 0.3), ('STU002', 0.1)]),
+            2: {},
+        })
+        self.assertEqual(mapping, {1: 'STU001'})
+    
+    def test_confident_match_needs_votes_and_margin(self):
+        """Test the minimum votes and margin thresholds for locking a track"""
+        votes = self.tally([('STU001', 0.2)] * 6 + [('STU002', 0.3)] * 2)
+        self.assertEqual(identity.confident_match(votes, 6, 0.5), 'STU001')
+        self.assertIsNone(identity.confident_match(votes, 7, 0.5))
+        self.assertIsNone(identity.confident_match(votes, 6, 0.6))
+        self.assertIsNone(identity.confident_match(votes, 0, 0.0))
+
+
+class RecognitionPolicyTest(SimpleTestCase):
+    """Test cases for skipping recognition of already identified tracks"""
+    
+    def face(self, student, shift=0):
+        image = np.full((64, 64, 3), ingestion_benchmark.BACKGROUND, dtype=np.uint8)
+        ingestion_benchmark.draw_face(image, (32 + shift, 32), student)
+        return image
+    
+    def test_tracks_are_identified_every_nth_frame(self):
+        """Test that each track is identified on its first and every Nth face"""
+        policy = recognition.RecognitionPolicy(every=3)
+        flags = [(policy.should_recognize(1, self.face(0)), policy.should_recognize(2, self.face(1))) for _ in range(7)]
+        
+        self.assertEqual([track_1 for track_1, _ in flags], [True, False, False, True, False, False, True])
+        self.assertEqual(flags[0], (True, True))
+        self.assertEqual(policy.stats(), {'faces': 14, 'recognized': 6, 'skipped': 8, 'drifted': 0})
+    
+    def test_appearance_drift_forces_recognition(self):
+        """Test that a track whose face changes is identified again"""
+        policy = recognition.RecognitionPolicy(every=100, drift=0.05)
+        self.assertTrue(policy.should_recognize(1, self.face(0)))
+        self.assertFalse(policy.should_recognize(1, self.face(0, shift=1)))
+        # The tracker switched to someone else
+        self.assertTrue(policy.should_recognize(1, self.face(3)))
+        self.assertFalse(policy.should_recognize(1, self.face(3)))
+        self.assertEqual(policy.stats()['drifted'], 1)
+    
+    def test_skipped_faces_reuse_track_matches(self):
+        """Test that unidentified faces get their track's last matches"""
+        policy = recognition.RecognitionPolicy(every=2)
+        first = policy.fill_matches(
+            [(1, 0), (2, 0)],
+            [({'happy': 1.0}, [('STU001', 0.2)]), ({'sad': 1.0}, [('STU002', 0.3)])]
+        )
+        second = policy.fill_matches([(1, 1), (2, 1)], [({'happy': 2.0}, None), ({'sad': 2.0}, [('STU003', 0.1)])])
+        
+        self.assertEqual(first[0], ({'happy': 1.0}, [('STU001', 0.2)]))
+        self.assertEqual(second, [({'happy': 2.0}, [('STU001', 0.2)]), ({'sad': 2.0}, [('STU003', 0.1)])])
+    
+    def test_only_flagged_crops_are_identified(self):
+        """Test that the command searches the gallery for flagged crops only"""
+        command = AddClassDataCommand()
+        searched = []
+        command.get_emotions = lambda crops: [{'happy': float(len(crops))}] * len(crops)
+        command.get_top_matches = lambda crops: searched.append(len(crops)) or [[('STU001', 0.1)]] * len(crops)
+        
+        results = command.analyze_faces([self.face(0)] * 3, [True, False, True])
+        self.assertEqual(searched, [2])
+        self.assertEqual([top_match for _, top_match in results], [[('STU001', 0.1)], None, [('STU001', 0.1)]])
+
+
+class BatchManifestTest(SimpleTestCase):
+    """Test cases for the multi-video ingestion manifest"""
+    
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+    
+    def write_manifest(self, name, content):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, 'w') as f:
+            f.write(content)
+        return path
+    
+    def test_csv_and_json_manifests(self):
+        """Test that all manifest formats resolve to (video path, class ID) pairs"""
+        expected = [
+            (os.path.join(self.tmp.name, 'monday.mp4'), 101),
+            ('/videos/tuesday.mp4', 102),
+        ]
+        manifests = [
+            self.write_manifest('week.csv', 'video_path,class_id\nmonday.mp4,101\n/videos/tuesday.mp4,102\n'),
+            self.write_manifest('week.json', json.dumps([
+                {'video_path': 'monday.mp4', 'class_id': 101},
+                {'video_path': '/videos/tuesday.mp4', 'class_id': '102'},
+            ])),
+            self.write_manifest('map.json', json.dumps({'monday.mp4': 101, '/videos/tuesday.mp4': 102})),
+        ]
+        for manifest in manifests:
+            self.assertEqual(load_manifest(manifest), expected, manifest)
+    
+    def test_invalid_manifest(self):
+        """Test that an unreadable manifest is reported as a command error"""
+        manifest = self.write_manifest('bad.csv', 'path,class\nmonday.mp4,101\n')
+        with self.assertRaises(CommandError):
+            load_manifest(manifest)
+
+
+def init_fake_worker(verbosity):
+    pass
+
+
+def process_fake_video(video_path, class_id, options):
+    """Stands in for process_video in add_class_data_batch's workers; 'crash' videos kill the worker"""
+    if 'crash' in video_path:
+        os._exit(1)
+    return {'status': 'ok', 'inserted': class_id, 'skipped': 0, 'seconds': 0.0}
+
+
+@mock.patch.object(add_class_data_batch, 'process_video', process_fake_video)
+@mock.patch.object(add_class_data_batch, 'init_worker', init_fake_worker)
+@mock.patch.object(add_class_data_batch.Command, 'start_method', 'fork')
+class AddClassDataBatchTest(SimpleTestCase):
+    """Test cases for the worker pool of add_class_data_batch"""
+    
+    def run_batch(self, videos, workers):
+        with tempfile.TemporaryDirectory() as tmp:
+            manifest = os.path.join(tmp, 'week.json')
+            with open(manifest, 'w') as f:
+                json.dump(videos, f)
+            out = io.StringIO()
+            try:
+                call_command('add_class_data_batch', manifest, workers=workers, stdout=out)
+            except CommandError as e:
+                return out.getvalue(), str(e)
+            return out.getvalue(), None
+    
+    def test_processes_every_video(self):
+        """Test that every video of the manifest is processed"""
+        out, error = self.run_batch({'monday.mp4': 101, 'tuesday.mp4': 102, 'friday.mp4': 105}, workers=2)
+        
+        self.assertIsNone(error)
+        self.assertEqual(out.count(': inserted'), 3)
+    
+    def test_dead_worker_does_not_abort_the_batch(self):
+        """Test that the videos not started when a worker died run in a new pool"""
+        out, error = self.run_batch({'crash.mp4': 101, 'monday.mp4': 102, 'tuesday.mp4': 103}, workers=1)
+        
+        self.assertIn('1 of 3 videos failed', error)
+        self.assertIn('crash.mp4', error)
+        self.assertIn('worker process died', out)
+        self.assertIn('Restarting the worker pool for the 2 videos not started yet', out)
+        self.assertIn('monday.mp4 (class 102): inserted 102', out)
+        self.assertIn('tuesday.mp4 (class 103): inserted 103', out)
 
 
 class AttendanceAPITest(APITestCase):
@@ -35,23 +845,24 @@ class AttendanceAPITest(APITestCase):
     
     def setUp(self):
         """Set up test data"""
+        caches[RESPONSE_CACHE_ALIAS].clear()
         # Create multiple test records
         StudentData.objects.create(
-            studentID="STU001",
+            studentID_id="STU001",
             FramID=1,
-            ClassID=101,
+            ClassID_id=101,
             Emotion={"happy": 0.8, "sad": 0.1, "neutral": 0.1}
         )
         StudentData.objects.create(
-            studentID="STU002",
+            studentID_id="STU002",
             FramID=1,
-            ClassID=101,
+            ClassID_id=101,
             Emotion={"happy": 0.6, "sad": 0.3, "neutral": 0.1}
         )
         StudentData.objects.create(
-            studentID="STU001",
+            studentID_id="STU001",
             FramID=2,
-            ClassID=102,
+            ClassID_id=102,
             Emotion={"happy": 0.7, "sad": 0.2, "neutral": 0.1}
         )
     
@@ -119,6 +930,45 @@ class AttendanceAPITest(APITestCase):
         self.assertIn('classMentioned', first_student_data)
         self.assertIn('classBreakdown', first_student_data)
     
+    def test_get_students_detail_status_values(self):
+        """Test GetStudentsDetailStatus breaks each student down by class"""
+        url = reverse('attendance:students-detail-status')
+        response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data.keys()), ['STU001', 'STU002'])
+        
+        student_001 = response.data['STU001']
+        self.assertEqual(student_001['overallAttendance'], {
+            'overallAttendance': 100.0,
+            'classesAttended': 2
+        })
+        self.assertEqual(student_001['classMentioned'], [101, 102])
+        self.assertEqual(student_001['classBreakdown'][102], {
+            'framesAttended': 1,
+            'emotionSummary': {'sad': 0.2, 'happy': 0.7, 'neutral': 0.1}
+        })
+        self.assertEqual(response.data['STU002']['overallAttendance']['overallAttendance'], 50.0)
+    
+    def test_get_students_detail_status_query_count(self):
+        """Test GetStudentsDetailStatus query count does not grow with students or classes"""
+        for student in range(20):
+            for class_id in (101, 102, 103):
+                StudentData.objects.create(
+                    studentID_id=f"STU1{student:02d}",
+                    FramID=1,
+                    ClassID_id=class_id,
+                    Emotion={"happy": 0.5, "neutral": 0.5}
+                )
+        
+        url = reverse('attendance:students-detail-status')
+        # Data version, rosters, number of classes and one rollup query
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 22)
+    
     def test_get_class_detail_status(self):
         """Test GetClassDetailStatus API endpoint"""
         url = reverse('attendance:class-detail-status')
@@ -137,8 +987,679 @@ class AttendanceAPITest(APITestCase):
         self.assertIn('emotionDistribution', first_class_data)
         self.assertIn('studentBreakdown', first_class_data)
     
+    def test_get_class_detail_status_values(self):
+        """Test GetClassDetailStatus aggregates counts and emotions per class and student"""
+        url = reverse('attendance:class-detail-status')
+        # Data version, rosters, number of students and one rollup query
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data.keys()), [101, 102])
+        
+        class_101 = response.data[101]
+        self.assertEqual(class_101['attendanceRate'], 100.0)
+        self.assertEqual(class_101['presentStudents'], 2)
+        self.assertEqual(list(class_101['emotionDistribution'].keys()), ['happy', 'sad', 'neutral'])
+        self.assertAlmostEqual(class_101['emotionDistribution']['happy'], 1.4)
+        self.assertAlmostEqual(class_101['emotionDistribution']['sad'], 0.4)
+        self.assertEqual(class_101['studentBreakdown']['STU002'], {
+            'framesAttended': 1,
+            'emotionSummary': {'sad': 0.3, 'happy': 0.6, 'neutral': 0.1}
+        })
+        
+        class_102 = response.data[102]
+        self.assertEqual(class_102['attendanceRate'], 50.0)
+        self.assertEqual(class_102['presentStudents'], 1)
+        self.assertEqual(list(class_102['studentBreakdown'].keys()), ['STU001'])
+    
+
+
+    def test_detail_status_filters(self):
+        """Test that classID/studentID select entries without changing their values"""
+        response = self.client.get(reverse('attendance:class-detail-status'), {'classID': '102'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data.keys()), [102])
+        self.assertEqual(response.data[102]['attendanceRate'], 50.0)
+        
+        response = self.client.get(reverse('attendance:class-detail-status'), {'studentID': 'STU002'})
+        self.assertEqual(list(response.data.keys()), [101])
+        self.assertEqual(list(response.data[101]['studentBreakdown']), ['STU001', 'STU002'])
+        
+        response = self.client.get(reverse('attendance:students-detail-status'), {'classID': '101,102'})
+        self.assertEqual(list(response.data.keys()), ['STU001', 'STU002'])
+        self.assertEqual(response.data['STU002']['overallAttendance']['overallAttendance'], 50.0)
+    
+    def test_detail_status_date_range(self):
+        """Test that from/to select the classes held in the range, whenever their frames were written"""
+        Class.objects.filter(ClassID=101).update(held_at=datetime(2026, 3, 2, 9, tzinfo=dt_timezone.utc))
+        Class.objects.filter(ClassID=102).update(held_at=datetime(2026, 3, 3, 9, tzinfo=dt_timezone.utc))
+        url = reverse('attendance:class-detail-status')
+        
+        response = self.client.get(url, {'from': '2026-03-02', 'to': '2026-03-02'})
+        self.assertEqual(list(response.data.keys()), [101])
+        response = self.client.get(url, {'from': '2026-03-02T12:00:00+00:00'})
+        self.assertEqual(list(response.data.keys()), [102])
+        
+        # The range also limits each student's classes
+        response = self.client.get(reverse('attendance:students-detail-status'), {'from': '2026-03-03'})
+        self.assertEqual(list(response.data.keys()), ['STU001'])
+        self.assertEqual(response.data['STU001']['classMentioned'], [102])
+        self.assertEqual(list(response.data['STU001']['classBreakdown']), [102])
+        self.assertEqual(response.data['STU001']['overallAttendance'], {
+            'overallAttendance': 100.0,
+            'classesAttended': 1
+        })
+        response = self.client.get(reverse('attendance:students-detail-status'), {'from': '2026-03-03', 'stream': 'ndjson'})
+        self.assertEqual(
+            [json.loads(line)['classMentioned'] for line in b''.join(response.streaming_content).splitlines()],
+            [[102]]
+        )
+    
+    def test_detail_status_fields_and_depth(self):
+        """Test that fields and depth trim each entry"""
+        response = self.client.get(
+            reverse('attendance:class-detail-status'),
+            {'fields': 'presentStudents,studentBreakdown', 'depth': '1'}
+        )
+        self.assertEqual(response.data[101], {
+            'presentStudents': 2,
+            'studentBreakdown': {'STU001': {'framesAttended': 1}, 'STU002': {'framesAttended': 1}}
+        })
+        
+        response = self.client.get(reverse('attendance:students-detail-status'), {'depth': '0'})
+        self.assertEqual(list(response.data['STU001'].keys()), ['overallAttendance', 'classMentioned'])
+        self.assertEqual(response.data['STU001']['classMentioned'], [101, 102])
+    
+    def test_detail_status_cursor_pagination(self):
+        """Test that cursor pages cover every entry once"""
+        url = reverse('attendance:class-detail-status')
+        response = self.client.get(url, {'page_size': 1})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(response.data['results'].keys()), [101])
+        self.assertEqual(response.data['results'][101]['attendanceRate'], 100.0)
+        self.assertIsNone(response.data['previous'])
+        
+        response = self.client.get(response.data['next'])
+        self.assertEqual(list(response.data['results'].keys()), [102])
+        self.assertEqual(response.data['results'][102]['attendanceRate'], 50.0)
+        self.assertIsNone(response.data['next'])
+    
+    def test_detail_status_invalid_query(self):
+        """Test that malformed query parameters are rejected with a 400"""
+        url = reverse('attendance:class-detail-status')
+        for params in ({'fields': 'classMentioned'}, {'depth': '3'}, {'classID': 'abc'}, {'from': 'yesterday'}):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, params)
+            self.assertIn('error', response.data)
+
+    def test_detail_status_streaming(self):
+        """Test that streamed exports match the regular response"""
+        for name, key_name in (('class-detail-status', 'classID'), ('students-detail-status', 'studentID')):
+            url = reverse(f'attendance:{name}')
+            expected = self.client.get(url).content
+            
+            response = self.client.get(url, {'stream': 'json'})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(response.streaming)
+            self.assertEqual(b''.join(response.streaming_content), expected)
+            
+            response = self.client.get(url, {'stream': 'ndjson', 'depth': '0'})
+            self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+            lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+            expected = json.loads(self.client.get(url, {'depth': '0'}).content)
+            self.assertEqual(
+                {str(line.pop(key_name)): line for line in lines},
+                expected
+            )
+        
+        response = self.client.get(url, {'stream': 'json', 'page_size': 1})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_attendance_against_roster(self):
+        """Test that classes with a roster count their absent students"""
+        save_roster([(101, "STU001", ""), (101, "STU002", ""), (101, "STU003", "Absent Student")])
+        self.assertEqual(Student.objects.get(studentID="STU003").name, "Absent Student")
+        
+        response = self.client.get(reverse('attendance:attendance-status'))
+        self.assertEqual(response.data[0], {
+            'classID': 101,
+            'attendanceRate': 66.67,
+            'totalStudents': 3,
+            'attendedStudents': 2
+        })
+        # Class 102 has no roster and keeps counting the students seen
+        self.assertEqual(response.data[1]['attendanceRate'], 100.0)
+        
+        response = self.client.get(reverse('attendance:class-detail-status'))
+        self.assertEqual(response.data[101]['attendanceRate'], 66.67)
+        # STU003 is only on class 101's roster, so 102 is still measured against two students
+        self.assertEqual(response.data[102]['attendanceRate'], 50.0)
+        
+        response = self.client.get(reverse('attendance:student-overall-status'))
+        self.assertEqual(response.data[2], {'studentID': 'STU003', 'classesAttended': 0, 'totalClasses': 1})
+        
+        response = self.client.get(reverse('attendance:students-detail-status'))
+        self.assertEqual(response.data['STU001']['overallAttendance'], {
+            'overallAttendance': 100.0,
+            'classesAttended': 1
+        })
+        
+        save_roster([(101, "STU001", "")], replace=True)
+        self.assertEqual(Enrollment.objects.count(), 1)
+    
+    def test_detail_lists_rosters_without_frames(self):
+        """Test that enrolled students and rostered classes without frames are listed with empty breakdowns"""
+        save_roster([(101, "STU001", ""), (101, "STU003", ""), (103, "STU001", "")])
+        
+        response = self.client.get(reverse('attendance:students-detail-status'))
+        self.assertEqual(list(response.data), ['STU001', 'STU002', 'STU003'])
+        self.assertEqual(response.data['STU003'], {
+            'overallAttendance': {'overallAttendance': 0.0, 'classesAttended': 0},
+            'classMentioned': [],
+            'classBreakdown': {}
+        })
+        self.assertEqual(response.data['STU001']['overallAttendance']['overallAttendance'], 50.0)
+        
+        response = self.client.get(reverse('attendance:class-detail-status'))
+        self.assertEqual(list(response.data), [101, 102, 103])
+        self.assertEqual(response.data[103], {
+            'attendanceRate': 0.0,
+            'presentStudents': 0,
+            'emotionDistribution': {},
+            'studentBreakdown': {}
+        })
+        
+        response = self.client.get(reverse('attendance:students-detail-status'), {'stream': 'ndjson'})
+        lines = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual([line['studentID'] for line in lines], ['STU001', 'STU002', 'STU003'])
+        
+        response = self.client.get(reverse('attendance:class-detail-status'), {'page_size': 2})
+        page = self.client.get(response.data['next'])
+        self.assertEqual(list(page.data['results']), [103])
+        
+        response = self.client.get(reverse('attendance:students-detail-status'), {'classID': '101'})
+        self.assertEqual(list(response.data), ['STU001', 'STU002', 'STU003'])
+
+
+class ResponseCacheTest(APITestCase):
+    """Test cases for the versioned response cache"""
+    
+    def setUp(self):
+        caches[RESPONSE_CACHE_ALIAS].clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            list(write_frames(101, [("STU001", 1, {"happy": 1.0})]))
+        self.url = reverse('attendance:class-detail-status')
+    
+    def test_repeated_get_is_served_from_cache(self):
+        """Test that only the data version is queried once a response is cached"""
+        first = self.client.get(self.url)
+        with self.assertNumQueries(1):
+            second = self.client.get(self.url)
+        
+        self.assertEqual(second.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertIn('Last-Modified', second)
+        self.assertIn('no-cache', second['Cache-Control'])
+    
+    def test_conditional_get_returns_not_modified(self):
+        """Test that polling with the current ETag gets an empty 304"""
+        etag = self.client.get(self.url)['ETag']
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['ETag'], etag)
+    
+    def test_ingestion_invalidates_cached_responses(self):
+        """Test that writing frames bumps the version and serves fresh data"""
+        version, _ = get_data_version()
+        etag = self.client.get(self.url)['ETag']
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            list(write_frames(102, [("STU001", 1, {"sad": 1.0})]))
+        
+        self.assertEqual(get_data_version()[0], version + 1)
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(list(json.loads(response.content)), ['101', '102'])
+    
+    def test_version_is_bumped_after_commit(self):
+        """Test that an uncommitted write does not change the data version"""
+        version = DataVersion.objects.get().version
+        with self.captureOnCommitCallbacks() as callbacks:
+            StudentData.objects.create(studentID_id="STU002", FramID=1, ClassID_id=101, Emotion={})
+            self.assertEqual(DataVersion.objects.get().version, version)
+        
+        for callback in callbacks:
+            callback()
+        self.assertEqual(DataVersion.objects.get().version, version + 1)
+
+
+class RequestInstrumentationTest(APITestCase):
+    """Test cases for the Server-Timing header, slow request log and metrics"""
+    
+    def setUp(self):
+        caches[RESPONSE_CACHE_ALIAS].clear()
+        instrumentation.metrics.reset()
+        list(write_frames(101, [("STU001", 1, {"happy": 1.0}), ("STU002", 1, {"sad": 1.0})]))
+        self.url = reverse('attendance:class-detail-status')
+    
+    def server_timing(self, response):
+        """Server-Timing metrics as {name: (duration, description)}"""
+        timings = {}
+        for metric in response['Server-Timing'].split(', '):
+            name, *params = metric.split(';')
+            params = dict(param.split('=', 1) for param in params)
+            timings[name] = (float(params['dur']), params.get('desc', '').strip('"'))
+        return timings
+    
+    def test_server_timing_breaks_down_request(self):
+        """Test that the header reports queries, DB, aggregation and serialization time"""
+        response = self.client.get(self.url)
+        
+        timings = self.server_timing(response)
+        self.assertEqual(set(timings), {'db', 'aggregate', 'serialize', 'total'})
+        # Data version, rosters, known student count and the rollup
+        self.assertEqual(timings['db'][1], '4 queries')
+        self.assertGreater(timings['serialize'][0], 0)
+        self.assertLessEqual(timings['db'][0] + timings['serialize'][0], timings['total'][0])
+        
+        # A cache hit only looks up the data version and renders nothing
+        timings = self.server_timing(self.client.get(self.url))
+        self.assertEqual(timings['db'][1], '1 queries')
+        self.assertEqual(timings['serialize'][0], 0)
+    
+    def test_streamed_response_is_measured_to_the_end(self):
+        """Test that a streamed export is recorded once its content is consumed"""
+        response = self.client.get(self.url, {'stream': 'ndjson'})
+        self.assertIn('Server-Timing', response)
+        self.assertNotIn('attendance_requests_total{view="class-detail-status"', instrumentation.metrics.render())
+        
+        b''.join(response.streaming_content)
+        self.assertIn(
+            'attendance_requests_total{view="class-detail-status",method="GET",status="200"} 1',
+            instrumentation.metrics.render()
+        )
+    
+    def test_non_api_requests_are_not_timed(self):
+        """Test that only the attendance views get the header"""
+        response = self.client.get('/admin/login/')
+        self.assertNotIn('Server-Timing', response)
+        self.assertNotIn('Server-Timing', self.client.get(reverse('attendance:metrics')))
+    
+    @override_settings(SLOW_REQUEST_MS=1, SLOW_REQUEST_TOP_QUERIES=2)
+    def test_slow_requests_are_logged_with_top_queries(self):
+        """Test that requests over the threshold are logged with their slowest queries"""
+        with self.assertLogs('attendance.slow_requests', level='WARNING') as logs:
+            # Hold the request up past the threshold in one of its queries
+            with connection.execute_wrapper(lambda execute, *args: (time.sleep(0.002), execute(*args))[1]):
+                self.client.get(self.url, {'depth': '0'})
+        
+        self.assertEqual(len(logs.output), 1)
+        message = logs.output[0]
+        self.assertIn('Slow request GET /api/class-detail-status/?depth=0', message)
+        self.assertIn('4 queries', message)
+        self.assertEqual(message.count(' ms  '), 2)
+    
+    def test_fast_requests_are_not_logged(self):
+        """Test that the slow request log is off by default"""
+        with self.assertNoLogs('attendance.slow_requests'):
+            self.client.get(self.url)
+    
+    def test_metrics_endpoint_is_off_by_default(self):
+        """Test that the unauthenticated metrics endpoint has to be enabled"""
+        self.client.get(self.url)
+        self.assertEqual(self.client.get(reverse('attendance:metrics')).status_code, status.HTTP_404_NOT_FOUND)
+    
+    @override_settings(METRICS_ENABLED=True)
+    def test_metrics_endpoint_exposes_latency_histograms(self):
+        """Test the Prometheus text output of the per-view metrics"""
+        self.client.get(self.url)
+        self.client.get(self.url)
+        self.client.get(reverse('attendance:attendance-status'))
+        
+        response = self.client.get(reverse('attendance:metrics'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = response.content.decode()
+        self.assertIn('# TYPE attendance_request_duration_seconds histogram', text)
+        self.assertIn('attendance_request_duration_seconds_bucket{view="class-detail-status",le="+Inf"} 2', text)
+        self.assertIn('attendance_request_duration_seconds_count{view="attendance-status"} 1', text)
+        # 4 queries on the miss, 1 on the hit
+        self.assertIn('attendance_db_queries_total{view="class-detail-status"} 5', text)
+        self.assertNotIn('view="metrics"', text)
+        
+        with self.settings(METRICS_ENABLED=False):
+            self.assertEqual(self.client.get(reverse('attendance:metrics')).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class AsyncViewsTestMixin:
+    """Requests to the sync and async routes of an endpoint, for comparison"""
+    
+    def get_sync(self, endpoint, params=None):
+        caches[RESPONSE_CACHE_ALIAS].clear()
+        response = self.client.get(reverse(f'attendance:{endpoint}'), params or {})
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, content
+    
+    def get_async(self, endpoint, params=None, clear=True, **headers):
+        if clear:
+            caches[RESPONSE_CACHE_ALIAS].clear()
+        return async_to_sync(self._get_async)(reverse(f'attendance:async-{endpoint}'), params or {}, headers)
+    
+    async def _get_async(self, url, params, headers):
+        response = await self.async_client.get(url, params, headers=headers)
+        if response.streaming:
+            content = b''.join([chunk async for chunk in response.streaming_content])
+        else:
+            content = response.content
+        return response, content
+    
+    def assert_same_responses(self, requests):
+        for endpoint, params in requests:
+            with self.subTest(endpoint=endpoint, params=params):
+                expected, expected_content = self.get_sync(endpoint, params)
+                response, content = self.get_async(endpoint, params)
+                self.assertEqual(response.status_code, expected.status_code)
+                self.assertEqual(response['Content-Type'], expected['Content-Type'])
+                self.assertEqual(content, expected_content)
+
+
+class AsyncViewsTest(AsyncViewsTestMixin, TestCase):
+    """Test cases for the async versions of the read endpoints"""
+    
+    def setUp(self):
+        synthetic.generate(classes=3, students=4, frames=5, first_class_id=201, seed=3)
+        # A class without a roster and a student without enrollments
+        list(write_frames(101, [("STU001", 1, {"happy": 1.0})]))
+        # A class and a student with a roster but no frames
+        save_roster([(301, "STU900", "")])
+    
+    def test_async_views_return_the_same_responses(self):
+        """Test that every endpoint and detail variant matches its sync view byte for byte"""
+        requests = [(endpoint, None) for endpoint in (
+            'attendance-status', 'emotions-status', 'student-overall-status',
+            'students-detail-status', 'class-detail-status',
+        )]
+        for endpoint in ('students-detail-status', 'class-detail-status'):
+            requests += [
+                (endpoint, {'depth': '1', 'fields': 'attendanceRate,studentBreakdown' if endpoint == 'class-detail-status' else 'classBreakdown'}),
+                (endpoint, {'classID': '201,101'}),
+                (endpoint, {'stream': 'json'}),
+                (endpoint, {'stream': 'ndjson', 'depth': '0'}),
+                (endpoint, {'depth': '7'}),
+            ]
+        self.assert_same_responses(requests)
+    
+    def test_pagination(self):
+        """Test that async pages hold the same entries and link to the async route"""
+        expected, _ = self.get_sync('class-detail-status', {'page_size': '2'})
+        response, content = self.get_async('class-detail-status', {'page_size': '2'})
+        page = json.loads(content)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(page['results'], json.loads(expected.content)['results'])
+        self.assertIn('/api/async/class-detail-status/?cursor=', page['next'])
+        
+        cursor = parse_qs(urlsplit(page['next']).query)['cursor'][0]
+        _, content = self.get_async('class-detail-status', {'page_size': '2', 'cursor': cursor})
+        self.assertEqual(list(json.loads(content)['results']), ['202', '203'])
+    
+    def test_cache_and_conditional_requests(self):
+        """Test that the async views cache their responses and answer polls with 304"""
+        first, first_content = self.get_async('class-detail-status')
+        with self.assertNumQueries(1):
+            response, content = self.get_async('class-detail-status', clear=False)
+        self.assertEqual(content, first_content)
+        self.assertEqual(response['ETag'], first['ETag'])
+        self.assertEqual(response['ETag'], self.get_sync('class-detail-status')[0]['ETag'])
+        self.assertIn('no-cache', response['Cache-Control'])
+        
+        response, content = self.get_async('class-detail-status', clear=False, if_none_match=first['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(content, b'')
+    
+    def test_async_responses_are_timed(self):
+        """Test that the queries run through the async ORM are counted in Server-Timing"""
+        instrumentation.metrics.reset()
+        response, _ = self.get_async('class-detail-status')
+        # Data version, rosters, known student count and the rollup
+        self.assertIn('desc="4 queries"', response['Server-Timing'])
+        
+        response, _ = self.get_async('class-detail-status', {'stream': 'ndjson'})
+        self.assertIn('Server-Timing', response)
+        self.assertIn(
+            'attendance_requests_total{view="async-class-detail-status",method="GET",status="200"} 2',
+            instrumentation.metrics.render()
+        )
 
 
+@override_settings(ASYNC_CONCURRENT_QUERIES=True)
+class AsyncConcurrentQueriesTest(AsyncViewsTestMixin, TransactionTestCase):
+    """Test cases for the async views running their queries on separate connections"""
+    
+    def setUp(self):
+        # The fan-out threads outlive the test; keep them from holding
+        # connections to the test database
+        self.enterContext(mock.patch.dict(connections.settings[DEFAULT_DB_ALIAS], CONN_MAX_AGE=0))
+        synthetic.generate(classes=2, students=3, frames=4, first_class_id=201, seed=5)
+    
+    def test_concurrent_queries_return_the_same_responses(self):
+        """Test that fanning the queries out changes neither the responses nor their timing"""
+        self.assert_same_responses([
+            ('attendance-status', None),
+            ('student-overall-status', None),
+            ('students-detail-status', None),
+            ('class-detail-status', {'classID': '202'}),
+            ('class-detail-status', {'stream': 'ndjson'}),
+        ])
+        response, _ = self.get_async('students-detail-status')
+        self.assertIn('desc="4 queries"', response['Server-Timing'])
+
+
+@override_settings(DB_VIEW_STATEMENT_TIMEOUTS={'class-detail-status': 50}, DB_PGBOUNCER=False)
+class StatementTimeoutTest(AsyncViewsTestMixin, TestCase):
+    """Test cases for the per-endpoint statement timeouts"""
+    
+    def setUp(self):
+        list(write_frames(101, [("STU001", 1, {"happy": 1.0})]))
+    
+    def current_timeout(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SHOW statement_timeout')
+            return cursor.fetchone()[0]
+    
+    def on_rollup_query(self, action):
+        """Execute wrapper running action(raw cursor) before the detail views' rollup query"""
+        def wrapper(execute, sql, params, many, context):
+            if '"class_student_summary"."frame_count"' in sql:
+                action(context['cursor'].cursor)
+            return execute(sql, params, many, context)
+        return connection.execute_wrapper(wrapper)
+    
+    def timeouts_seen(self, get):
+        seen = []
+        def record(cursor):
+            cursor.execute("SELECT current_setting('statement_timeout')")
+            seen.append(cursor.fetchone()[0])
+        with self.on_rollup_query(record):
+            get()
+        return seen
+    
+    def test_timeout_applies_to_its_endpoint_only(self):
+        """Test that the configured endpoint runs under its timeout and leaves the connection as it was"""
+        self.assertEqual(self.timeouts_seen(lambda: self.get_sync('class-detail-status')), ['50ms'])
+        self.assertEqual(self.timeouts_seen(lambda: self.get_sync('emotions-status')), ['0'])
+        self.assertEqual(self.current_timeout(), '0')
+    
+    def test_async_views_share_the_timeout(self):
+        """Test that the async route uses its endpoint's timeout and resets it afterwards"""
+        self.assertEqual(self.timeouts_seen(lambda: self.get_async('class-detail-status')), ['50ms'])
+        self.assertEqual(self.current_timeout(), '0')
+        
+        # Session settings would leak to other clients of a PgBouncer
+        with self.settings(DB_PGBOUNCER=True):
+            self.assertEqual(self.timeouts_seen(lambda: self.get_async('class-detail-status')), ['0'])
+    
+    def test_slow_query_is_cancelled(self):
+        """Test that a query over the timeout is cancelled and reported as an error"""
+        with self.on_rollup_query(lambda cursor: cursor.execute('SELECT pg_sleep(0.2)')):
+            response, content = self.get_sync('class-detail-status')
+        
+        self.assertEqual(response.status_code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+        self.assertIn('statement timeout', json.loads(content)['error'])
+        # The view's transaction was rolled back; the connection is usable
+        self.assertEqual(self.get_sync('class-detail-status')[0].status_code, status.HTTP_200_OK)
+    
+    def test_endpoint_lookup(self):
+        """Test that requests map to their endpoint's timeout by URL name"""
+        self.assertEqual(database.get_statement_timeout(resolve_request('/api/async/class-detail-status/')), 50)
+        self.assertEqual(database.get_statement_timeout(resolve_request('/api/class-detail-status/')), 50)
+        self.assertEqual(database.get_statement_timeout(resolve_request('/api/students-detail-status/')), 0)
+    
+    def test_setting_is_validated(self):
+        """Test that malformed DB_VIEW_STATEMENT_TIMEOUTS entries are named in the error"""
+        self.assertEqual(
+            parse_view_timeouts(' class-detail-status=50, ,students-detail-status = 0'),
+            {'class-detail-status': 50, 'students-detail-status': 0}
+        )
+        for value, entry in (
+            ('class-detail-status', 'class-detail-status'),
+            ('class-detail-status=50,students-detail-status=slow', 'students-detail-status=slow'),
+            ('=50', '=50'),
+            ('class-detail-status=-1', 'class-detail-status=-1'),
+        ):
+            message = f"DB_VIEW_STATEMENT_TIMEOUTS: expected <url name>=<milliseconds>, got '{entry}'"
+            with self.assertRaisesMessage(ImproperlyConfigured, message):
+                parse_view_timeouts(value)
+
+
+def resolve_request(path):
+    """A request to path with its resolver match set, as the URL resolver does"""
+    return mock.Mock(resolver_match=resolve(path))
+
+
+class ConnectionBenchmarkTest(TestCase):
+    """Test cases for the benchmark_connections command"""
+    
+    @skipUnless(benchmark_connections.pool_supported(), 'needs psycopg 3 and psycopg_pool')
+    def test_benchmark_measures_every_mode(self):
+        """Test that new, persistent and pooled connections are measured against each other"""
+        stdout = io.StringIO()
+        call_command('benchmark_connections', '--requests', '3', '--queries', '2', stdout=stdout)
+        report = json.loads(stdout.getvalue())
+        
+        results = {result['mode']: result for result in report['results']}
+        self.assertEqual(list(results), ['connect', 'persistent', 'pool'])
+        self.assertEqual(results['persistent']['overheadMs'], 0)
+        self.assertGreater(results['connect']['overheadMs'], 0)
+        self.assertEqual(report['meta']['queries'], 2)
+    
+    def test_invalid_arguments(self):
+        """Test that empty runs are rejected"""
+        with self.assertRaises(CommandError):
+            call_command('benchmark_connections', '--requests', '0')
+
+
+class LoadTestCommandTest(LiveServerTestCase):
+    """Test cases for the load_test command"""
+    
+    def setUp(self):
+        synthetic.generate(classes=2, students=3, frames=4, seed=2)
+    
+    def test_load_test_writes_comparable_json(self):
+        """Test that the requests are spread over the endpoints and reported per endpoint"""
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, 'wsgi.json')
+            call_command(
+                'load_test', '--url', self.live_server_url, '--requests', '10', '--concurrency', '2',
+                '--no-cache', '--label', 'wsgi', '--output', output
+            )
+            with open(output) as f:
+                report = json.load(f)
+            stderr = io.StringIO()
+            call_command(
+                'load_test', '--url', self.live_server_url, '--requests', '4', '--async-routes',
+                '--endpoints', 'attendance-status', 'class-detail-status',
+                '--compare', output, stdout=io.StringIO(), stderr=stderr
+            )
+        
+        self.assertEqual(report['meta']['label'], 'wsgi')
+        results = {result['endpoint']: result for result in report['results']}
+        self.assertEqual(results['all']['requests'], 10)
+        self.assertEqual(results['all']['errors'], 0)
+        self.assertEqual(results['class-detail-status']['requests'], 2)
+        self.assertLessEqual(results['all']['latencyMs']['min'], results['all']['latencyMs']['p95'])
+        self.assertIn('wsgi -> this run', stderr.getvalue())
+    
+    def test_unreachable_server(self):
+        """Test that a server that cannot be reached is reported before the run"""
+        with self.assertRaises(CommandError):
+            call_command('load_test', '--url', 'http://127.0.0.1:9', '--requests', '1')
+        with self.assertRaises(CommandError):
+            call_command('load_test', '--url', 'localhost:8000', '--requests', '1')
+
+
+class SyntheticDataTest(TestCase):
+    """Test cases for the synthetic data generator and the API benchmark"""
+    
+    def test_generate_is_deterministic_and_consistent(self):
+        """Test that generated frames are reproducible and keep the rollup and rosters in step"""
+        inserted, skipped = synthetic.generate(classes=3, students=4, frames=10, first_class_id=201, seed=7)
+        
+        self.assertEqual(skipped, 0)
+        self.assertEqual(StudentData.objects.count(), inserted)
+        self.assertEqual(summary.verify(), [])
+        self.assertEqual(Enrollment.objects.count(), 12)
+        self.assertEqual(sorted(Class.objects.values_list('ClassID', flat=True)), [201, 202, 203])
+        frame = StudentData.objects.first()
+        self.assertAlmostEqual(sum(frame.Emotion.values()), 100.0)
+        
+        self.assertEqual(
+            synthetic.generate(classes=3, students=4, frames=10, first_class_id=201, seed=7),
+            (0, inserted)
+        )
+        with self.assertRaises(ValueError):
+            synthetic.generate(classes=1, students=1, frames=1, profile='gloomy')
+    
+    def test_generate_dates_its_classes(self):
+        """Test that generated classes are held a day apart and cached responses are retired"""
+        start = datetime(2026, 3, 2, 9, tzinfo=dt_timezone.utc)
+        version, _ = get_data_version()
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            synthetic.generate(classes=2, students=4, frames=10, first_class_id=201, seed=7, start=start)
+        synthetic.generate(classes=2, students=4, frames=10, first_class_id=201, seed=7)
+        
+        held = dict(Class.objects.filter(ClassID__in=[201, 202]).values_list('ClassID', 'held_at'))
+        self.assertEqual(held, {201: start, 202: start + timedelta(days=1)})
+        self.assertGreater(get_data_version()[0], version)
+    
+    def test_benchmark_api_writes_json(self):
+        """Test that the benchmark measures every scenario and writes comparable JSON"""
+        synthetic.generate(classes=2, students=3, frames=5, seed=1)
+        with tempfile.TemporaryDirectory() as tmp:
+            output = os.path.join(tmp, 'bench.json')
+            call_command('benchmark_api', '--repeat', '1', '--output', output, stdout=io.StringIO())
+            with open(output) as f:
+                report = json.load(f)
+            call_command(
+                'benchmark_api', '--repeat', '1', '--endpoints', 'attendance-status',
+                '--compare', output, stdout=io.StringIO(), stderr=io.StringIO()
+            )
+        
+        self.assertEqual(report['meta']['rows']['student_data'], StudentData.objects.count())
+        names = [result['name'] for result in report['results']]
+        self.assertIn('class-detail-status?stream=ndjson', names)
+        for result in report['results']:
+            self.assertEqual(result['status'], 200, result['name'])
+            self.assertGreater(result['queries'], 0, result['name'])
+            self.assertLessEqual(result['coldMs']['min'], result['coldMs']['p95'])
+
 
 class URLPatternsTest(TestCase):
     """Test cases for URL patterns"""
@@ -168,4 +1689,15 @@ class URLPatternsTest(TestCase):
         url = reverse('attendance:class-detail-status')
         self.assertEqual(url, '/api/class-detail-status/')
     
+    def test_metrics_url(self):
+        """Test metrics URL pattern"""
+        url = reverse('attendance:metrics')
+        self.assertEqual(url, '/api/metrics/')
+    
+    def test_async_urls(self):
+        """Test that the async versions are served under async/"""
+        url = reverse('attendance:async-class-detail-status')
+        self.assertEqual(url, '/api/async/class-detail-status/')
+        self.assertIs(resolve(url).func.view_class, async_views.AsyncGetClassDetailStatus)
+    
 
@@ -1,13 +1,30 @@
+from django.conf import settings
 from django.urls import path
-from . import views
+from . import async_views, instrumentation, views
 
 app_name = 'attendance'
 
+ENDPOINTS = [
+    ('attendance-status', views.GetAttendanceStatus, async_views.AsyncGetAttendanceStatus),
+    ('emotions-status', views.GetEmotionsStatus, async_views.AsyncGetEmotionsStatus),
+    ('student-overall-status', views.GetStudentOverallStatus, async_views.AsyncGetStudentOverallStatus),
+    ('students-detail-status', views.GetStudentsDetailStatus, async_views.AsyncGetStudentsDetailStatus),
+    ('class-detail-status', views.GetClassDetailStatus, async_views.AsyncGetClassDetailStatus),
+]
+
 urlpatterns = [
-    # Main API endpoints
-    path('attendance-status/', views.GetAttendanceStatus.as_view(), name='attendance-status'),
-    path('emotions-status/', views.GetEmotionsStatus.as_view(), name='emotions-status'),
-    path('student-overall-status/', views.GetStudentOverallStatus.as_view(), name='student-overall-status'),
-    path('students-detail-status/', views.GetStudentsDetailStatus.as_view(), name='students-detail-status'),
-    path('class-detail-status/', views.GetClassDetailStatus.as_view(), name='class-detail-status'),
+    # Main API endpoints, served by the async views with ASYNC_VIEWS set
+    *(
+        path(f'{name}/', (async_view if settings.ASYNC_VIEWS else view).as_view(), name=name)
+        for name, view, async_view in ENDPOINTS
+    ),
+    
+    # Async versions of the endpoints above, whatever ASYNC_VIEWS is
+    *(
+        path(f'async/{name}/', async_view.as_view(), name=f'async-{name}')
+        for name, _, async_view in ENDPOINTS
+    ),
+    
+    # Prometheus metrics of the endpoints above
+    path('metrics/', instrumentation.metrics_view, name='metrics'),
 ]
@@ -1,11 +1,33 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.db.models import Count
-from .models import StudentData
+from .database import StatementTimeoutMixin
+from .response_cache import VersionedCacheMixin
+from .streaming import STREAM_CHUNK_SIZE, streaming_response
+from .aggregation import (
+    attendance_rate,
+    count_known,
+    get_held_classes,
+    get_class_student_counts,
+    get_class_student_summary,
+    get_rosters,
+    get_student_class_counts,
+    get_student_class_summary,
+    get_summary_keys,
+    iter_class_student_summary,
+    iter_student_class_summary,
+)
+from .query_params import (
+    FULL_DEPTH,
+    InvalidQuery,
+    SummaryCursorPagination,
+    filters_of,
+    is_filtered,
+    parse_detail_query,
+)
 
 
-class GetAttendanceStatus(APIView):
+class GetAttendanceStatus(VersionedCacheMixin, StatementTimeoutMixin, APIView):
     """
     API endpoint to get attendance rate of all classIDs as a list
     """
@@ -18,32 +40,7 @@ class GetAttendanceStatus(APIView):
             Response: List of attendance rates for all classes
         """
         try:
-            # Get all unique class IDs
-            class_ids = StudentData.objects.values_list('ClassID', flat=True).distinct()
-            
-            attendance_data = []
-            for class_id in class_ids:
-                # Get all records for this class
-                class_records = StudentData.objects.filter(ClassID=class_id)
-                
-                # Get unique students in this class
-                unique_students = class_records.values('studentID').distinct()
-                total_students = unique_students.count()
-                
-                # Calculate attendance rate
-                attendance_rate = 0.0
-                if total_students > 0:
-                    # Count students who have any records (attended)
-                    attended_students = unique_students.count()
-                    attendance_rate = (attended_students / total_students) * 100
-                
-                attendance_data.append({
-                    'classID': class_id,
-                    'attendanceRate': round(attendance_rate, 2),
-                    'totalStudents': total_students,
-                    'attendedStudents': attended_students
-                })
-            
+            attendance_data = self.get_data(get_class_student_counts(), get_rosters('ClassID'))
             return Response(attendance_data, status=status.HTTP_200_OK)
             
         except Exception as e:
@@ -51,9 +48,28 @@ class GetAttendanceStatus(APIView):
                 {'error': f'Error retrieving attendance status: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+    
+    def get_data(self, class_student_counts, rosters):
+        """Attendance rate list from the per-class student counts and the class rosters"""
+        attendance_data = []
+        for class_id in sorted(class_student_counts.keys() | rosters.keys()):
+            if class_id in rosters:
+                # Enrolled students, absent ones included
+                total_students, attended_students = rosters[class_id]
+            else:
+                # Without a roster only the students seen are known
+                total_students = attended_students = class_student_counts[class_id]
+            
+            attendance_data.append({
+                'classID': class_id,
+                'attendanceRate': attendance_rate(attended_students, total_students),
+                'totalStudents': total_students,
+                'attendedStudents': attended_students
+            })
+        return attendance_data
 
 
-class GetEmotionsStatus(APIView):
+class GetEmotionsStatus(VersionedCacheMixin, StatementTimeoutMixin, APIView):
     """
     API endpoint to get emotions distribution of all classes as a list
     """
@@ -66,29 +82,7 @@ class GetEmotionsStatus(APIView):
             Response: List of emotions distribution for all classes
         """
         try:
-            # Get all unique class IDs
-            class_ids = StudentData.objects.values_list('ClassID', flat=True).distinct()
-            
-            emotions_data = []
-            for class_id in class_ids:
-                # Get all records for this class
-                class_records = StudentData.objects.filter(ClassID=class_id)
-                
-                # Aggregate emotion distribution across all students in class
-                emotion_distribution = {}
-                for record in class_records:
-                    if isinstance(record.Emotion, dict):
-                        for emotion, value in record.Emotion.items():
-                            if emotion in emotion_distribution:
-                                emotion_distribution[emotion] += value
-                            else:
-                                emotion_distribution[emotion] = value
-                
-                emotions_data.append({
-                    'classID': class_id,
-                    'emotionDistribution': emotion_distribution
-                })
-            
+            emotions_data = self.get_data(get_class_student_summary())
             return Response(emotions_data, status=status.HTTP_200_OK)
             
         except Exception as e:
@@ -96,9 +90,16 @@ class GetEmotionsStatus(APIView):
                 {'error': f'Error retrieving emotions status: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+    
+    def get_data(self, summary):
+        """Emotions distribution list from the class summary"""
+        return [
+            {'classID': class_id, 'emotionDistribution': class_data['emotionSummary']}
+            for class_id, class_data in summary.items()
+        ]
 
 
-class GetStudentOverallStatus(APIView):
+class GetStudentOverallStatus(VersionedCacheMixin, StatementTimeoutMixin, APIView):
     """
     API endpoint to get a list of how many classes each student attended
     """
@@ -111,24 +112,7 @@ class GetStudentOverallStatus(APIView):
             Response: List of student attendance data
         """
         try:
-            total_classes = StudentData.objects.values('ClassID').distinct().count()
-            
-            # Efficiently get student attendance data with single query
-            student_stats = (
-                StudentData.objects
-                .values('studentID')
-                .annotate(classes_attended=Count('ClassID', distinct=True))
-                .order_by('studentID')
-            )
-            
-            student_data = []
-            for stats in student_stats:
-                student_data.append({
-                    'studentID': stats['studentID'],
-                    'classesAttended': stats['classes_attended'],
-                    'totalClasses': total_classes
-                })
-            
+            student_data = self.get_data(get_student_class_counts(), get_rosters('studentID'), count_known('ClassID'))
             return Response(student_data, status=status.HTTP_200_OK)
             
         except Exception as e:
@@ -136,13 +120,32 @@ class GetStudentOverallStatus(APIView):
                 {'error': f'Error retrieving student overall status: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+    
+    def get_data(self, student_class_counts, rosters, total_classes):
+        """Student attendance list from the per-student class counts, the student rosters and the class total"""
+        student_data = []
+        for student_id in sorted(student_class_counts.keys() | rosters.keys()):
+            if student_id in rosters:
+                student_total_classes, classes_attended = rosters[student_id]
+            else:
+                student_total_classes = total_classes
+                classes_attended = student_class_counts[student_id]
+            student_data.append({
+                'studentID': student_id,
+                'classesAttended': classes_attended,
+                'totalClasses': student_total_classes
+            })
+        return student_data
 
 
-class GetStudentsDetailStatus(APIView):
+class GetStudentsDetailStatus(VersionedCacheMixin, StatementTimeoutMixin, APIView):
     """
     API endpoint to get detailed status for all students
     Returns a map where key is student name and value is overallAttendance, classMentioned and class breakdown data
+    Supports the classID/studentID/from/to filters, fields/depth selection, cursor pagination
+    and streaming described in query_params
     """
+    fields = ('overallAttendance', 'classMentioned', 'classBreakdown')
     
     def get(self, request):
         """
@@ -152,70 +155,94 @@ class GetStudentsDetailStatus(APIView):
             Response: Map of student details with attendance and class breakdown
         """
         try:
-            # Get all unique student IDs
-            student_ids = StudentData.objects.values_list('studentID', flat=True).distinct()
+            query = parse_detail_query(request.query_params, self.fields)
+            paginator = None
+            student_ids = None
+            if query['paginate']:
+                paginator = SummaryCursorPagination('studentID')
+                keys = get_summary_keys('studentID', **filters_of(query))
+                student_ids = [row['studentID'] for row in paginator.paginate_queryset(keys, request, view=self)]
+            elif is_filtered(query):
+                student_ids = get_summary_keys('studentID', **filters_of(query))
             
-            total_classes = StudentData.objects.values('ClassID').distinct().count()
+            emotions = self.needs_emotions(query)
+            # A date range also limits each student's classes to those held in it
+            class_ids = get_held_classes(query['since'], query['until'])
             
-            students_detail = {}
-            for student_id in student_ids:
-                # Get all records for this student
-                student_records = StudentData.objects.filter(studentID=student_id)
-                
-                # Calculate overall attendance
-                classes_attended = student_records.values('ClassID').distinct().count()
-                
-                # Get class breakdown data
-                class_breakdown = {}
-                unique_classes = student_records.values('ClassID').distinct()
-                
-                for class_data in unique_classes:
-                    class_id = class_data['ClassID']
-                    class_records = student_records.filter(ClassID=class_id, studentID=student_id)
-                    
-                    # Calculate emotion summary for this class
-                    emotion_summary = {}
-                    for record in class_records:
-                        if isinstance(record.Emotion, dict):
-                            for emotion, value in record.Emotion.items():
-                                if emotion in emotion_summary:
-                                    emotion_summary[emotion] += value
-                                else:
-                                    emotion_summary[emotion] = value
-                    
-                    class_breakdown[class_id] = {
-                        'framesAttended': class_records.count(),
-                        'emotionSummary': emotion_summary
-                    }
-                
-                # Calculate overall attendance percentage
-                overall_attendance_percentage = 0.0
-                if total_classes > 0:
-                    overall_attendance_percentage = round((classes_attended / total_classes) * 100, 2)
-                
-                students_detail[student_id] = {
-                    'overallAttendance': {
-                        'overallAttendance': overall_attendance_percentage,
-                        'classesAttended': classes_attended
-                    },
-                    'classMentioned': list(class_breakdown.keys()),
-                    'classBreakdown': class_breakdown
-                }
+            rosters = get_rosters('studentID', class_ids)
+            total_classes = count_known('ClassID', class_ids)
             
-            return Response(students_detail, status=status.HTTP_200_OK)
+            if query['stream']:
+                entries = (
+                    (student_id, self.get_entry(class_breakdown, rosters.get(student_id), total_classes, query))
+                    for student_id, class_breakdown in iter_student_class_summary(
+                        student_ids, emotions, chunk_size=STREAM_CHUNK_SIZE, class_ids=class_ids, enrolled=True
+                    )
+                )
+                return streaming_response(entries, query['stream'], 'studentID')
+            
+            summary = get_student_class_summary(student_ids, emotions, class_ids, enrolled=True)
+            students_detail = self.get_data(summary, rosters, total_classes, query)
             
+            if paginator is not None:
+                return paginator.get_paginated_response(students_detail)
+            return Response(students_detail, status=status.HTTP_200_OK)
+        
+        except InvalidQuery as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response(
                 {'error': f'Error retrieving students detail status: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+    
+    def needs_emotions(self, query):
+        """Whether the requested fields and depth include emotion sums"""
+        return 'classBreakdown' in query['fields'] and query['depth'] == FULL_DEPTH
+    
+    def get_data(self, summary, rosters, total_classes, query):
+        """Detail map of the summarized students"""
+        return {
+            student_id: self.get_entry(class_breakdown, rosters.get(student_id), total_classes, query)
+            for student_id, class_breakdown in summary.items()
+        }
+    
+    def get_entry(self, class_breakdown, roster, total_classes, query):
+        """
+        Detail entry of one student, limited to the requested fields and depth
+        
+        A student with enrollments is measured against the classes they are
+        enrolled in, any other student against every known class.
+        """
+        if roster is not None:
+            total_classes, classes_attended = roster
+        else:
+            classes_attended = len(class_breakdown)
+        
+        # Calculate overall attendance percentage
+        overall_attendance_percentage = attendance_rate(classes_attended, total_classes)
+        
+        student_detail = {}
+        if 'overallAttendance' in query['fields']:
+            student_detail['overallAttendance'] = {
+                'overallAttendance': overall_attendance_percentage,
+                'classesAttended': classes_attended
+            }
+        if 'classMentioned' in query['fields']:
+            student_detail['classMentioned'] = list(class_breakdown.keys())
+        if 'classBreakdown' in query['fields'] and query['depth'] > 0:
+            student_detail['classBreakdown'] = class_breakdown
+        return student_detail
 
 
-class GetClassDetailStatus(APIView):
+class GetClassDetailStatus(VersionedCacheMixin, StatementTimeoutMixin, APIView):
     """
     API endpoint to get detailed status for all classes
     Returns a map where key is classID and value is attendance rate, present students, emotion distribution and student breakdown
+    Supports the classID/studentID/from/to filters, fields/depth selection, cursor pagination
+    and streaming described in query_params
     """
+    fields = ('attendanceRate', 'presentStudents', 'emotionDistribution', 'studentBreakdown')
     
     def get(self, request):
         """
@@ -225,69 +252,87 @@ class GetClassDetailStatus(APIView):
             Response: Map of class details with attendance, emotions and student breakdown
         """
         try:
-            # Get all unique class IDs
-            class_ids = StudentData.objects.values_list('ClassID', flat=True).distinct()
+            query = parse_detail_query(request.query_params, self.fields)
+            paginator = None
+            class_ids = None
+            if query['paginate']:
+                paginator = SummaryCursorPagination('ClassID')
+                keys = get_summary_keys('ClassID', **filters_of(query))
+                class_ids = [row['ClassID'] for row in paginator.paginate_queryset(keys, request, view=self)]
+            elif is_filtered(query):
+                class_ids = get_summary_keys('ClassID', **filters_of(query))
             
-            total_students = StudentData.objects.values('studentID').distinct().count()
+            emotions = self.needs_emotions(query)
             
-            class_detail = {}
-            for class_id in class_ids:
-                # Get all records for this class
-                class_records = StudentData.objects.filter(ClassID=class_id)
-                
-                # Get unique students in this class
-                unique_students_in_class = class_records.values('studentID').distinct()
-                total_students_in_class = unique_students_in_class.count()
-                
-                # Calculate attendance rate
-                attendance_rate = 0.0
-                if total_students > 0:
-                    # Count students who have any records (attended)
-                    attended_students = total_students_in_class
-                    attendance_rate = (attended_students / total_students) * 100
-                
-                # Aggregate emotion distribution across all students in class
-                emotion_distribution = {}
-                for record in class_records:
-                    if isinstance(record.Emotion, dict):
-                        for emotion, value in record.Emotion.items():
-                            if emotion in emotion_distribution:
-                                emotion_distribution[emotion] += value
-                            else:
-                                emotion_distribution[emotion] = value
-                
-                # Get student breakdown data
-                student_breakdown = {}
-                for student_data in unique_students_in_class:
-                    student_id = student_data['studentID']
-                    student_records = class_records.filter(studentID=student_id)
-                    
-                    # Calculate student's emotion summary for this class
-                    student_emotion_summary = {}
-                    for record in student_records:
-                        if isinstance(record.Emotion, dict):
-                            for emotion, value in record.Emotion.items():
-                                if emotion in student_emotion_summary:
-                                    student_emotion_summary[emotion] += value
-                                else:
-                                    student_emotion_summary[emotion] = value
-                    
-                    student_breakdown[student_id] = {
-                        'framesAttended': student_records.count(),
-                        'emotionSummary': student_emotion_summary
-                    }
-                
-                class_detail[class_id] = {
-                    'attendanceRate': round(attendance_rate, 2),
-                    'presentStudents': total_students_in_class,
-                    'emotionDistribution': emotion_distribution,
-                    'studentBreakdown': student_breakdown
-                }
+            rosters = get_rosters('ClassID')
+            total_students = count_known('studentID')
             
-            return Response(class_detail, status=status.HTTP_200_OK)
+            if query['stream']:
+                entries = (
+                    (class_id, self.get_entry(class_data, rosters.get(class_id), total_students, query))
+                    for class_id, class_data in iter_class_student_summary(
+                        class_ids, emotions, chunk_size=STREAM_CHUNK_SIZE, enrolled=True
+                    )
+                )
+                return streaming_response(entries, query['stream'], 'classID')
+            
+            summary = get_class_student_summary(class_ids, emotions, enrolled=True)
+            class_detail = self.get_data(summary, rosters, total_students, query)
             
+            if paginator is not None:
+                return paginator.get_paginated_response(class_detail)
+            return Response(class_detail, status=status.HTTP_200_OK)
+        
+        except InvalidQuery as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response(
                 {'error': f'Error retrieving class detail status: {str(e)}'},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
+    
+    def needs_emotions(self, query):
+        """Whether the requested fields and depth include emotion sums"""
+        return 'emotionDistribution' in query['fields'] or (
+            'studentBreakdown' in query['fields'] and query['depth'] == FULL_DEPTH
+        )
+    
+    def get_data(self, summary, rosters, total_students, query):
+        """Detail map of the summarized classes"""
+        return {
+            class_id: self.get_entry(class_data, rosters.get(class_id), total_students, query)
+            for class_id, class_data in summary.items()
+        }
+    
+    def get_entry(self, class_data, roster, total_students, query):
+        """
+        Detail entry of one class, limited to the requested fields and depth
+        
+        A class with a roster is measured against its enrolled students, any
+        other class against every known student.
+        """
+        student_breakdown = class_data['students']
+        total_students_in_class = len(student_breakdown)
+        
+        # Calculate attendance rate
+        if roster is not None:
+            class_attendance_rate = attendance_rate(roster[1], roster[0])
+        else:
+            class_attendance_rate = attendance_rate(total_students_in_class, total_students)
+        
+        class_entry = {}
+        if 'attendanceRate' in query['fields']:
+            class_entry['attendanceRate'] = class_attendance_rate
+        if 'presentStudents' in query['fields']:
+            class_entry['presentStudents'] = total_students_in_class
+        if 'emotionDistribution' in query['fields']:
+            class_entry['emotionDistribution'] = class_data['emotionSummary']
+        if 'studentBreakdown' in query['fields']:
+            if query['depth'] == 1:
+                class_entry['studentBreakdown'] = {
+                    student_id: {'framesAttended': student_data['framesAttended']}
+                    for student_id, student_data in student_breakdown.items()
+                }
+            elif query['depth'] == FULL_DEPTH:
+                class_entry['studentBreakdown'] = student_breakdown
+        return class_entry
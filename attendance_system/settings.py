@@ -4,6 +4,7 @@ Django settings for attendance_system project.
 
 from pathlib import Path
 from decouple import config
+from django.core.exceptions import ImproperlyConfigured
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -36,6 +37,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'attendance.instrumentation.RequestTimingMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -70,6 +72,52 @@ WSGI_APPLICATION = 'attendance_system.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
+# Connections are kept open for DB_CONN_MAX_AGE seconds and checked before
+# reuse. Under ASGI every request runs in a thread of its own, so persistent
+# connections are never reused there; use DB_POOL (psycopg 3) instead, which
+# keeps DB_POOL_MIN_SIZE to DB_POOL_MAX_SIZE connections per worker process.
+# DB_PGBOUNCER is for a PgBouncer in transaction pooling mode in front of
+# the database: it disables server-side cursors and startup options, so set
+# the default statement timeout on the database role instead.
+# DB_STATEMENT_TIMEOUT_MS cancels any statement running longer (0 is off);
+# DB_VIEW_STATEMENT_TIMEOUTS overrides it per endpoint, e.g.
+# "class-detail-status=30000,students-detail-status=30000" (see
+# attendance/database.py).
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+DB_PGBOUNCER = config('DB_PGBOUNCER', default=False, cast=bool)
+DB_CONN_HEALTH_CHECKS = config('DB_CONN_HEALTH_CHECKS', default=True, cast=bool)
+DB_STATEMENT_TIMEOUT_MS = config('DB_STATEMENT_TIMEOUT_MS', default=0, cast=int)
+
+
+def parse_view_timeouts(value):
+    """Parse DB_VIEW_STATEMENT_TIMEOUTS, "name=ms,name=ms", into {url name: milliseconds}"""
+    timeouts = {}
+    for item in value.split(','):
+        if not item.strip():
+            continue
+        name, _, milliseconds = item.partition('=')
+        if not name.strip() or not milliseconds.strip().isdigit():
+            raise ImproperlyConfigured(
+                f'DB_VIEW_STATEMENT_TIMEOUTS: expected <url name>=<milliseconds>, got {item.strip()!r}'
+            )
+        timeouts[name.strip()] = int(milliseconds)
+    return timeouts
+
+
+DB_VIEW_STATEMENT_TIMEOUTS = config('DB_VIEW_STATEMENT_TIMEOUTS', default='', cast=parse_view_timeouts)
+
+DB_OPTIONS = {}
+if DB_STATEMENT_TIMEOUT_MS and not DB_PGBOUNCER:
+    DB_OPTIONS['options'] = f'-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}'
+if DB_POOL:
+    # Pooled connections are checked before use with CONN_HEALTH_CHECKS
+    DB_OPTIONS['pool'] = {
+        'min_size': config('DB_POOL_MIN_SIZE', default=2, cast=int),
+        'max_size': config('DB_POOL_MAX_SIZE', default=10, cast=int),
+        # Seconds a request waits for a free connection before failing
+        'timeout': config('DB_POOL_TIMEOUT', default=10, cast=float),
+    }
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -78,10 +126,36 @@ DATABASES = {
         'PASSWORD': config('DB_PASSWORD', default=''),
         'HOST': config('DB_HOST', default='localhost'),
         'PORT': config('DB_PORT', default='5432'),
+        # The pool owns the connections' lifetime
+        'CONN_MAX_AGE': 0 if DB_POOL else config('DB_CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': DB_CONN_HEALTH_CHECKS,
+        'DISABLE_SERVER_SIDE_CURSORS': DB_PGBOUNCER,
+        'OPTIONS': DB_OPTIONS,
     }
 }
 
 
+# Cache
+# API responses are cached per data version (see attendance/response_cache.py),
+# so entries never expire by age; the least recently used ones are culled
+# once MAX_ENTRIES is reached.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'responses': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'attendance-responses',
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_ENTRIES': config('RESPONSE_CACHE_MAX_ENTRIES', default=256, cast=int),
+            'CULL_FREQUENCY': 4,
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -126,7 +200,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'attendance.instrumentation.TimedJSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
         'rest_framework.parsers.JSONParser',
@@ -154,4 +228,45 @@ CORS_ALLOW_HEADERS = [
     'user-agent',
     'x-csrftoken',
     'x-requested-with',
+    'if-none-match',
+    'if-modified-since',
+]
+CORS_EXPOSE_HEADERS = [
+    'etag',
+    'last-modified',
+    'server-timing',
 ]
+
+
+# Request instrumentation (see attendance/instrumentation.py)
+# Requests to the API taking at least SLOW_REQUEST_MS are logged with their
+# slowest SLOW_REQUEST_TOP_QUERIES queries; 0 turns the log off.
+SLOW_REQUEST_MS = config('SLOW_REQUEST_MS', default=0, cast=int)
+SLOW_REQUEST_TOP_QUERIES = config('SLOW_REQUEST_TOP_QUERIES', default=5, cast=int)
+# Serve per-view latency histograms at /api/metrics/. The endpoint has no
+# authentication, so only enable it where just the scraper can reach it.
+METRICS_ENABLED = config('METRICS_ENABLED', default=False, cast=bool)
+
+# Async read endpoints (see attendance/async_views.py), always served under
+# /api/async/. ASYNC_VIEWS serves them on the main routes instead of the sync
+# views; only worth it under ASGI. ASYNC_CONCURRENT_QUERIES runs a request's
+# independent queries at once, each on a connection of its own thread, which
+# only pays off once those connections are reused rather than opened per call.
+ASYNC_VIEWS = config('ASYNC_VIEWS', default=False, cast=bool)
+ASYNC_CONCURRENT_QUERIES = config('ASYNC_CONCURRENT_QUERIES', default=False, cast=bool)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'attendance': {
+            'handlers': ['console'],
+            'level': 'INFO',
+        },
+    },
+}